@@ -0,0 +1,10 @@
+--
+-- 002: Size and SHA-256 of uploaded documents (API 9.0 streaming upload)
+--
+-- Both are computed while the upload streams to disk, so recording them costs
+-- nothing extra. Rows uploaded before this migration keep NULL in both columns.
+--
+
+ALTER TABLE public.job_documents ADD COLUMN IF NOT EXISTS file_size bigint;
+
+ALTER TABLE public.job_documents ADD COLUMN IF NOT EXISTS content_hash character(64);
@@ -0,0 +1,26 @@
+--
+-- 004: Resumable (chunked) upload sessions (API 29.x)
+--
+-- One row per upload in progress; the data itself lives in UPLOAD_FOLDER/.partial/<upload_id>.
+-- received_chunks lists the chunk indexes written so far. Sessions untouched for
+-- UPLOAD_SESSION_TTL_HOURS are purged together with their partial files.
+--
+
+CREATE TABLE IF NOT EXISTS public.upload_sessions (
+    upload_id uuid DEFAULT gen_random_uuid() NOT NULL,
+    user_id uuid NOT NULL,
+    application_id uuid NOT NULL,
+    document_type public.document_type_enum NOT NULL,
+    original_filename character varying(255) NOT NULL,
+    total_size bigint NOT NULL,
+    chunk_size integer NOT NULL,
+    expected_hash character(64),
+    received_chunks integer[] DEFAULT '{}'::integer[] NOT NULL,
+    created_at timestamp with time zone DEFAULT now() NOT NULL,
+    updated_at timestamp with time zone DEFAULT now() NOT NULL,
+    CONSTRAINT upload_sessions_pkey PRIMARY KEY (upload_id),
+    CONSTRAINT upload_sessions_application_id_fkey FOREIGN KEY (application_id) REFERENCES public.applications(application_id) ON DELETE CASCADE,
+    CONSTRAINT chk_upload_sizes_positive CHECK (((total_size > 0) AND (chunk_size > 0)))
+);
+
+CREATE INDEX IF NOT EXISTS idx_upload_sessions_updated_at ON public.upload_sessions USING btree (updated_at);
@@ -0,0 +1,19 @@
+--
+-- 005: Extracted text and full-text search over uploaded documents (worker.py, API 30.0)
+--
+-- worker.py fills extracted_text / search_vector in the background and moves
+-- extraction_status from 'pending' to 'done', 'empty', 'unsupported' or 'failed'.
+-- Existing documents start as 'pending' and are picked up by the worker.
+--
+
+ALTER TABLE public.job_documents ADD COLUMN IF NOT EXISTS extraction_status character varying(20) DEFAULT 'pending'::character varying NOT NULL;
+
+ALTER TABLE public.job_documents ADD COLUMN IF NOT EXISTS extraction_claimed_at timestamp with time zone;
+
+ALTER TABLE public.job_documents ADD COLUMN IF NOT EXISTS extracted_text text;
+
+ALTER TABLE public.job_documents ADD COLUMN IF NOT EXISTS search_vector tsvector;
+
+CREATE INDEX IF NOT EXISTS idx_job_documents_search_vector ON public.job_documents USING gin (search_vector);
+
+CREATE INDEX IF NOT EXISTS idx_job_documents_extraction_pending ON public.job_documents USING btree (upload_timestamp) WHERE ((extraction_status)::text = ANY ((ARRAY['pending'::character varying, 'processing'::character varying])::text[]));
@@ -0,0 +1,12 @@
+--
+-- 006: Compression of stored documents (DOCUMENT_COMPRESSION, API 9.0 / 12.0)
+--
+-- storage_encoding says how the file on disk is encoded: NULL = exactly as uploaded,
+-- 'zstd' = one zstd frame. file_size and content_hash always describe the original
+-- upload. For deduplicated documents the blob's encoding is copied to every
+-- job_documents row that references it.
+--
+
+ALTER TABLE public.document_blobs ADD COLUMN IF NOT EXISTS storage_encoding character varying(16);
+
+ALTER TABLE public.job_documents ADD COLUMN IF NOT EXISTS storage_encoding character varying(16);
@@ -0,0 +1,162 @@
+--
+-- 009: Per-user and per-application storage accounting and quotas (API 9.0 / 29.x / 33.0)
+--
+-- Counters are maintained incrementally by triggers on job_documents, so every code path
+-- (uploads, deletes, cascades, the scrubber recording sizes of old rows) keeps them right
+-- and "how much does this user store" is a primary-key lookup instead of a scan.
+-- Every document counts with its full file_size, also when its content is shared with
+-- another upload (deduplication saves disk space, not quota). Rows without a file_size
+-- (uploads from before migration 002) count as files with 0 bytes until the scrubber
+-- records their size.
+-- application_storage_usage keeps the owner's user_id (no foreign key), so documents
+-- removed by a cascade after their application is gone are still subtracted from the
+-- right user.
+-- quota_bytes / file_quota: per-user overrides; NULL uses the app's defaults
+-- (USER_STORAGE_QUOTA_BYTES / USER_FILE_QUOTA).
+--
+
+CREATE TABLE IF NOT EXISTS public.user_storage_usage (
+    user_id uuid NOT NULL,
+    file_count bigint DEFAULT 0 NOT NULL,
+    total_bytes bigint DEFAULT 0 NOT NULL,
+    quota_bytes bigint,
+    file_quota bigint,
+    updated_at timestamp with time zone DEFAULT now() NOT NULL,
+    CONSTRAINT user_storage_usage_pkey PRIMARY KEY (user_id)
+);
+
+CREATE TABLE IF NOT EXISTS public.application_storage_usage (
+    application_id uuid NOT NULL,
+    user_id uuid NOT NULL,
+    file_count bigint DEFAULT 0 NOT NULL,
+    total_bytes bigint DEFAULT 0 NOT NULL,
+    CONSTRAINT application_storage_usage_pkey PRIMARY KEY (application_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_application_storage_usage_user ON public.application_storage_usage USING btree (user_id);
+
+-- INSERT / DELETE: one trigger run per statement, with the changed rows aggregated per
+-- application (a 20-file upload or an application delete updates each counter once)
+CREATE OR REPLACE FUNCTION public.job_documents_track_usage() RETURNS trigger
+    LANGUAGE plpgsql
+    AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    INSERT INTO public.application_storage_usage AS u (application_id, user_id, file_count, total_bytes)
+    SELECT n.application_id, a.user_id, count(*), COALESCE(sum(n.file_size), 0)
+    FROM new_rows n
+    JOIN public.applications a ON a.application_id = n.application_id
+    GROUP BY n.application_id, a.user_id
+    ORDER BY n.application_id
+    ON CONFLICT (application_id) DO UPDATE
+    SET file_count = u.file_count + EXCLUDED.file_count,
+        total_bytes = u.total_bytes + EXCLUDED.total_bytes;
+
+    INSERT INTO public.user_storage_usage AS u (user_id, file_count, total_bytes)
+    SELECT a.user_id, count(*), COALESCE(sum(n.file_size), 0)
+    FROM new_rows n
+    JOIN public.applications a ON a.application_id = n.application_id
+    GROUP BY a.user_id
+    ORDER BY a.user_id
+    ON CONFLICT (user_id) DO UPDATE
+    SET file_count = u.file_count + EXCLUDED.file_count,
+        total_bytes = u.total_bytes + EXCLUDED.total_bytes,
+        updated_at = NOW();
+  ELSE
+    WITH removed AS (
+      SELECT application_id, count(*) AS files, COALESCE(sum(file_size), 0) AS bytes
+      FROM old_rows
+      GROUP BY application_id
+    ),
+    per_application AS (
+      UPDATE public.application_storage_usage u
+      SET file_count = u.file_count - r.files,
+          total_bytes = u.total_bytes - r.bytes
+      FROM removed r
+      WHERE u.application_id = r.application_id
+      RETURNING u.user_id, r.files, r.bytes
+    )
+    UPDATE public.user_storage_usage u
+    SET file_count = u.file_count - d.files,
+        total_bytes = u.total_bytes - d.bytes,
+        updated_at = NOW()
+    FROM (SELECT user_id, sum(files) AS files, sum(bytes) AS bytes FROM per_application GROUP BY user_id) d
+    WHERE u.user_id = d.user_id;
+
+    DELETE FROM public.application_storage_usage
+    WHERE file_count <= 0 AND application_id IN (SELECT application_id FROM old_rows);
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+-- UPDATE: per row, and only when the size or the application changes
+CREATE OR REPLACE FUNCTION public.job_documents_track_usage_update() RETURNS trigger
+    LANGUAGE plpgsql
+    AS $$
+DECLARE
+  old_owner uuid;
+  new_owner uuid;
+BEGIN
+  UPDATE public.application_storage_usage
+  SET file_count = file_count - 1, total_bytes = total_bytes - COALESCE(OLD.file_size, 0)
+  WHERE application_id = OLD.application_id
+  RETURNING user_id INTO old_owner;
+  UPDATE public.user_storage_usage
+  SET file_count = file_count - 1, total_bytes = total_bytes - COALESCE(OLD.file_size, 0), updated_at = NOW()
+  WHERE user_id = old_owner;
+
+  SELECT user_id INTO new_owner FROM public.applications WHERE application_id = NEW.application_id;
+  INSERT INTO public.application_storage_usage AS u (application_id, user_id, file_count, total_bytes)
+  VALUES (NEW.application_id, new_owner, 1, COALESCE(NEW.file_size, 0))
+  ON CONFLICT (application_id) DO UPDATE
+  SET file_count = u.file_count + 1, total_bytes = u.total_bytes + EXCLUDED.total_bytes;
+  INSERT INTO public.user_storage_usage AS u (user_id, file_count, total_bytes)
+  VALUES (new_owner, 1, COALESCE(NEW.file_size, 0))
+  ON CONFLICT (user_id) DO UPDATE
+  SET file_count = u.file_count + 1, total_bytes = u.total_bytes + EXCLUDED.total_bytes, updated_at = NOW();
+  RETURN NULL;
+END;
+$$;
+
+-- Rebuilds every counter from job_documents (initial fill below; `maintenance.py recount-usage`
+-- if they ever drift). Blocks document inserts/deletes while it runs.
+CREATE OR REPLACE FUNCTION public.recount_storage_usage() RETURNS void
+    LANGUAGE plpgsql
+    AS $$
+BEGIN
+  LOCK TABLE public.job_documents IN SHARE ROW EXCLUSIVE MODE;
+
+  DELETE FROM public.application_storage_usage;
+  INSERT INTO public.application_storage_usage (application_id, user_id, file_count, total_bytes)
+  SELECT jd.application_id, a.user_id, count(*), COALESCE(sum(jd.file_size), 0)
+  FROM public.job_documents jd
+  JOIN public.applications a ON a.application_id = jd.application_id
+  GROUP BY jd.application_id, a.user_id;
+
+  -- Upsert (not delete + insert) keeps the per-user quota overrides
+  UPDATE public.user_storage_usage SET file_count = 0, total_bytes = 0, updated_at = NOW();
+  INSERT INTO public.user_storage_usage AS u (user_id, file_count, total_bytes)
+  SELECT user_id, sum(file_count), sum(total_bytes)
+  FROM public.application_storage_usage
+  GROUP BY user_id
+  ON CONFLICT (user_id) DO UPDATE
+  SET file_count = EXCLUDED.file_count, total_bytes = EXCLUDED.total_bytes, updated_at = NOW();
+END;
+$$;
+
+DROP TRIGGER IF EXISTS track_job_documents_usage_insert ON public.job_documents;
+CREATE TRIGGER track_job_documents_usage_insert AFTER INSERT ON public.job_documents
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION public.job_documents_track_usage();
+
+DROP TRIGGER IF EXISTS track_job_documents_usage_delete ON public.job_documents;
+CREATE TRIGGER track_job_documents_usage_delete AFTER DELETE ON public.job_documents
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION public.job_documents_track_usage();
+
+DROP TRIGGER IF EXISTS track_job_documents_usage_update ON public.job_documents;
+CREATE TRIGGER track_job_documents_usage_update AFTER UPDATE OF file_size, application_id ON public.job_documents
+    FOR EACH ROW
+    WHEN (((old.file_size IS DISTINCT FROM new.file_size) OR (old.application_id IS DISTINCT FROM new.application_id)))
+    EXECUTE FUNCTION public.job_documents_track_usage_update();
+
+SELECT public.recount_storage_usage();
@@ -0,0 +1,80 @@
+--
+-- 013: Live dashboard events (API 36.0, Server-Sent Events)
+--
+-- Changes are announced with NOTIFY on the 'dashboard_event' channel; the events
+-- service (contact_db_events.service) LISTENs once per process and pushes them to the
+-- open streams. NOTIFY is delivered on commit, and identical notifications of one
+-- transaction are folded into one.
+-- Payloads are kept compact (a type and the changed ids); clients fetch the actual
+-- data through the change feed (35.0). Above 50 ids, "ids" is null ("many changed").
+--   application / document: per user, raised for every row added to application_changes
+--   company:                no user_id (every stream), raised for companies and
+--                           company_name_mapping (a raw company name got mapped)
+--
+
+CREATE OR REPLACE FUNCTION public.notify_application_changes() RETURNS trigger
+    LANGUAGE plpgsql
+    AS $$
+BEGIN
+  PERFORM pg_notify('dashboard_event', json_build_object(
+            'type', c.entity,
+            'user_id', c.user_id,
+            'ids', CASE WHEN cardinality(c.ids) <= 50 THEN to_json(c.ids) END)::text)
+  FROM (SELECT entity, user_id, array_agg(DISTINCT entity_id) AS ids
+        FROM new_rows
+        GROUP BY entity, user_id) c;
+  RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.notify_company_changes() RETURNS trigger
+    LANGUAGE plpgsql
+    AS $$
+DECLARE
+  ids integer[];
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    SELECT array_agg(DISTINCT company_id) INTO ids FROM new_rows;
+  ELSIF TG_OP = 'UPDATE' THEN
+    SELECT array_agg(DISTINCT company_id) INTO ids
+    FROM (SELECT company_id FROM new_rows UNION SELECT company_id FROM old_rows) r;
+  ELSE
+    SELECT array_agg(DISTINCT company_id) INTO ids FROM old_rows;
+  END IF;
+  ids := array_remove(ids, NULL);
+  IF cardinality(ids) > 0 THEN
+    PERFORM pg_notify('dashboard_event', json_build_object(
+              'type', 'company',
+              'ids', CASE WHEN cardinality(ids) <= 50 THEN to_json(ids) END)::text);
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS notify_application_changes_insert ON public.application_changes;
+CREATE TRIGGER notify_application_changes_insert AFTER INSERT ON public.application_changes
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION public.notify_application_changes();
+
+DROP TRIGGER IF EXISTS notify_companies_changes_insert ON public.companies;
+CREATE TRIGGER notify_companies_changes_insert AFTER INSERT ON public.companies
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION public.notify_company_changes();
+
+DROP TRIGGER IF EXISTS notify_companies_changes_update ON public.companies;
+CREATE TRIGGER notify_companies_changes_update AFTER UPDATE ON public.companies
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION public.notify_company_changes();
+
+DROP TRIGGER IF EXISTS notify_companies_changes_delete ON public.companies;
+CREATE TRIGGER notify_companies_changes_delete AFTER DELETE ON public.companies
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION public.notify_company_changes();
+
+DROP TRIGGER IF EXISTS notify_company_name_mapping_changes_insert ON public.company_name_mapping;
+CREATE TRIGGER notify_company_name_mapping_changes_insert AFTER INSERT ON public.company_name_mapping
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION public.notify_company_changes();
+
+DROP TRIGGER IF EXISTS notify_company_name_mapping_changes_update ON public.company_name_mapping;
+CREATE TRIGGER notify_company_name_mapping_changes_update AFTER UPDATE ON public.company_name_mapping
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION public.notify_company_changes();
+
+DROP TRIGGER IF EXISTS notify_company_name_mapping_changes_delete ON public.company_name_mapping;
+CREATE TRIGGER notify_company_name_mapping_changes_delete AFTER DELETE ON public.company_name_mapping
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION public.notify_company_changes();
@@ -1 +1,7 @@
-pg_dump -U jobert contact_db > contact_db_backup_20251024.sql
+#!/bin/sh
+# Database dump + filestore snapshot, now done by maintenance.py (parallel
+# directory-format pg_dump, incremental hardlinked file snapshots).
+# Runs nightly from contact_db_backup.timer; extra arguments are passed on, e.g.
+#   backupdb.sh --dest /mnt/backup --keep 14
+cd /usr/share/jobassist || exit 1
+exec sudo -u jobert BACKUP_DIR="${BACKUP_DIR:-/var/backups/jobassist}" venv/bin/python maintenance.py backup "$@"
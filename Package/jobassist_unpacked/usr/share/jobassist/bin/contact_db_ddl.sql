@@ -22,6 +22,7 @@ SET xmloption = content;
 SET client_min_messages = warning;
 SET row_security = off;
 
+ALTER TABLE ONLY public.upload_sessions DROP CONSTRAINT upload_sessions_application_id_fkey;
 ALTER TABLE ONLY public.job_documents DROP CONSTRAINT job_documents_application_id_fkey;
 ALTER TABLE ONLY public.company_name_mapping DROP CONSTRAINT fk_mapping_company_id;
 ALTER TABLE ONLY public.job_documents DROP CONSTRAINT fk_document_application_id;
@@ -32,37 +33,103 @@ ALTER TABLE ONLY public.company_name_mapping DROP CONSTRAINT company_name_mappin
 ALTER TABLE ONLY public.applications DROP CONSTRAINT applications_job_title_id_fkey;
 ALTER TABLE ONLY public.applications DROP CONSTRAINT applications_company_id_fkey;
 DROP TRIGGER set_job_titles_timestamp ON public.job_titles;
+DROP TRIGGER track_job_documents_usage_update ON public.job_documents;
+DROP TRIGGER track_job_documents_usage_insert ON public.job_documents;
+DROP TRIGGER track_job_documents_usage_delete ON public.job_documents;
+DROP TRIGGER record_job_documents_changes_update ON public.job_documents;
+DROP TRIGGER record_job_documents_changes_insert ON public.job_documents;
+DROP TRIGGER record_job_documents_changes_delete ON public.job_documents;
+DROP TRIGGER notify_company_name_mapping_changes_update ON public.company_name_mapping;
+DROP TRIGGER notify_company_name_mapping_changes_insert ON public.company_name_mapping;
+DROP TRIGGER notify_company_name_mapping_changes_delete ON public.company_name_mapping;
+DROP TRIGGER notify_companies_changes_update ON public.companies;
+DROP TRIGGER notify_companies_changes_insert ON public.companies;
+DROP TRIGGER notify_companies_changes_delete ON public.companies;
 DROP TRIGGER set_applications_timestamp ON public.applications;
+DROP TRIGGER record_applications_changes_update ON public.applications;
+DROP TRIGGER record_applications_changes_insert ON public.applications;
+DROP TRIGGER record_applications_changes_delete ON public.applications;
+DROP TRIGGER notify_application_changes_insert ON public.application_changes;
+DROP INDEX public.idx_upload_sessions_updated_at;
+DROP INDEX public.idx_file_deletions_next_attempt_at;
 DROP INDEX public.idx_job_titles_standardized;
+DROP INDEX public.idx_contacts_company;
+DROP INDEX public.idx_company_name_mapping_company;
+DROP INDEX public.idx_job_documents_search_vector;
+DROP INDEX public.idx_job_documents_integrity_problems;
+DROP INDEX public.idx_job_documents_file_path;
+DROP INDEX public.idx_job_documents_extraction_pending;
+DROP INDEX public.idx_job_documents_content_hash;
 DROP INDEX public.idx_job_documents_application;
+DROP INDEX public.idx_background_jobs_user;
+DROP INDEX public.idx_background_jobs_running;
+DROP INDEX public.idx_background_jobs_queued;
+DROP INDEX public.idx_background_jobs_finished_at;
+DROP INDEX public.idx_background_jobs_dedupe;
 DROP INDEX public.idx_applications_user_company;
 DROP INDEX public.idx_applications_status;
+DROP INDEX public.idx_application_storage_usage_user;
+DROP INDEX public.idx_application_changes_user_txid;
+DROP INDEX public.idx_application_changes_changed_at;
 ALTER TABLE ONLY public.users DROP CONSTRAINT users_pkey;
+ALTER TABLE ONLY public.upload_sessions DROP CONSTRAINT upload_sessions_pkey;
+ALTER TABLE ONLY public.user_storage_usage DROP CONSTRAINT user_storage_usage_pkey;
 ALTER TABLE ONLY public.users DROP CONSTRAINT users_email_key;
+ALTER TABLE ONLY public.scrub_runs DROP CONSTRAINT scrub_runs_pkey;
+ALTER TABLE ONLY public.maintenance_checkpoints DROP CONSTRAINT maintenance_checkpoints_pkey;
 ALTER TABLE ONLY public.job_titles DROP CONSTRAINT job_titles_title_name_key;
 ALTER TABLE ONLY public.job_titles DROP CONSTRAINT job_titles_pkey;
 ALTER TABLE ONLY public.job_documents DROP CONSTRAINT job_documents_pkey;
-ALTER TABLE ONLY public.job_documents DROP CONSTRAINT job_documents_file_path_key;
+ALTER TABLE ONLY public.file_deletions DROP CONSTRAINT file_deletions_pkey;
+ALTER TABLE ONLY public.document_blobs DROP CONSTRAINT document_blobs_pkey;
 ALTER TABLE ONLY public.contacts DROP CONSTRAINT contacts_pkey;
 ALTER TABLE ONLY public.contacts DROP CONSTRAINT contacts_email_address_key;
 ALTER TABLE ONLY public.company_name_mapping DROP CONSTRAINT company_name_mapping_pkey;
 ALTER TABLE ONLY public.companies DROP CONSTRAINT companies_pkey;
 ALTER TABLE ONLY public.companies DROP CONSTRAINT companies_company_name_clean_key;
+ALTER TABLE ONLY public.background_jobs DROP CONSTRAINT background_jobs_pkey;
 ALTER TABLE ONLY public.applications DROP CONSTRAINT applications_pkey;
+ALTER TABLE ONLY public.application_storage_usage DROP CONSTRAINT application_storage_usage_pkey;
+ALTER TABLE ONLY public.application_changes DROP CONSTRAINT application_changes_pkey;
+ALTER TABLE ONLY public.application_change_horizon DROP CONSTRAINT application_change_horizon_pkey;
+ALTER TABLE public.scrub_runs ALTER COLUMN run_id DROP DEFAULT;
 ALTER TABLE public.job_titles ALTER COLUMN job_title_id DROP DEFAULT;
+ALTER TABLE public.file_deletions ALTER COLUMN deletion_id DROP DEFAULT;
 ALTER TABLE public.contacts ALTER COLUMN id DROP DEFAULT;
 ALTER TABLE public.companies ALTER COLUMN company_id DROP DEFAULT;
+ALTER TABLE public.background_jobs ALTER COLUMN job_id DROP DEFAULT;
+ALTER TABLE public.application_changes ALTER COLUMN change_id DROP DEFAULT;
 DROP TABLE public.users;
+DROP TABLE public.user_storage_usage;
+DROP TABLE public.upload_sessions;
+DROP SEQUENCE public.scrub_runs_run_id_seq;
+DROP TABLE public.scrub_runs;
+DROP TABLE public.maintenance_checkpoints;
 DROP SEQUENCE public.job_titles_job_title_id_seq;
 DROP TABLE public.job_titles;
 DROP TABLE public.job_documents;
+DROP SEQUENCE public.file_deletions_deletion_id_seq;
+DROP TABLE public.file_deletions;
+DROP TABLE public.document_blobs;
 DROP SEQUENCE public.contacts_id_seq;
 DROP TABLE public.contacts;
 DROP TABLE public.company_name_mapping;
 DROP SEQUENCE public.companies_company_id_seq;
 DROP TABLE public.companies;
+DROP SEQUENCE public.background_jobs_job_id_seq;
+DROP TABLE public.background_jobs;
 DROP TABLE public.applications;
+DROP TABLE public.application_storage_usage;
+DROP SEQUENCE public.application_changes_change_id_seq;
+DROP TABLE public.application_changes;
+DROP TABLE public.application_change_horizon;
 DROP FUNCTION public.trigger_set_timestamp();
+DROP FUNCTION public.recount_storage_usage();
+DROP FUNCTION public.record_application_changes();
+DROP FUNCTION public.notify_company_changes();
+DROP FUNCTION public.notify_application_changes();
+DROP FUNCTION public.job_documents_track_usage_update();
+DROP FUNCTION public.job_documents_track_usage();
 DROP TYPE public.document_type_enum;
 --
 -- Name: document_type_enum; Type: TYPE; Schema: public; Owner: -
@@ -77,6 +144,227 @@ CREATE TYPE public.document_type_enum AS ENUM (
 );
 
 
+--
+-- Name: job_documents_track_usage(); Type: FUNCTION; Schema: public; Owner: -
+--
+
+CREATE FUNCTION public.job_documents_track_usage() RETURNS trigger
+    LANGUAGE plpgsql
+    AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    INSERT INTO public.application_storage_usage AS u (application_id, user_id, file_count, total_bytes)
+    SELECT n.application_id, a.user_id, count(*), COALESCE(sum(n.file_size), 0)
+    FROM new_rows n
+    JOIN public.applications a ON a.application_id = n.application_id
+    GROUP BY n.application_id, a.user_id
+    ORDER BY n.application_id
+    ON CONFLICT (application_id) DO UPDATE
+    SET file_count = u.file_count + EXCLUDED.file_count,
+        total_bytes = u.total_bytes + EXCLUDED.total_bytes;
+
+    INSERT INTO public.user_storage_usage AS u (user_id, file_count, total_bytes)
+    SELECT a.user_id, count(*), COALESCE(sum(n.file_size), 0)
+    FROM new_rows n
+    JOIN public.applications a ON a.application_id = n.application_id
+    GROUP BY a.user_id
+    ORDER BY a.user_id
+    ON CONFLICT (user_id) DO UPDATE
+    SET file_count = u.file_count + EXCLUDED.file_count,
+        total_bytes = u.total_bytes + EXCLUDED.total_bytes,
+        updated_at = NOW();
+  ELSE
+    WITH removed AS (
+      SELECT application_id, count(*) AS files, COALESCE(sum(file_size), 0) AS bytes
+      FROM old_rows
+      GROUP BY application_id
+    ),
+    per_application AS (
+      UPDATE public.application_storage_usage u
+      SET file_count = u.file_count - r.files,
+          total_bytes = u.total_bytes - r.bytes
+      FROM removed r
+      WHERE u.application_id = r.application_id
+      RETURNING u.user_id, r.files, r.bytes
+    )
+    UPDATE public.user_storage_usage u
+    SET file_count = u.file_count - d.files,
+        total_bytes = u.total_bytes - d.bytes,
+        updated_at = NOW()
+    FROM (SELECT user_id, sum(files) AS files, sum(bytes) AS bytes FROM per_application GROUP BY user_id) d
+    WHERE u.user_id = d.user_id;
+
+    DELETE FROM public.application_storage_usage
+    WHERE file_count <= 0 AND application_id IN (SELECT application_id FROM old_rows);
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+
+--
+-- Name: job_documents_track_usage_update(); Type: FUNCTION; Schema: public; Owner: -
+--
+
+CREATE FUNCTION public.job_documents_track_usage_update() RETURNS trigger
+    LANGUAGE plpgsql
+    AS $$
+DECLARE
+  old_owner uuid;
+  new_owner uuid;
+BEGIN
+  UPDATE public.application_storage_usage
+  SET file_count = file_count - 1, total_bytes = total_bytes - COALESCE(OLD.file_size, 0)
+  WHERE application_id = OLD.application_id
+  RETURNING user_id INTO old_owner;
+  UPDATE public.user_storage_usage
+  SET file_count = file_count - 1, total_bytes = total_bytes - COALESCE(OLD.file_size, 0), updated_at = NOW()
+  WHERE user_id = old_owner;
+
+  SELECT user_id INTO new_owner FROM public.applications WHERE application_id = NEW.application_id;
+  INSERT INTO public.application_storage_usage AS u (application_id, user_id, file_count, total_bytes)
+  VALUES (NEW.application_id, new_owner, 1, COALESCE(NEW.file_size, 0))
+  ON CONFLICT (application_id) DO UPDATE
+  SET file_count = u.file_count + 1, total_bytes = u.total_bytes + EXCLUDED.total_bytes;
+  INSERT INTO public.user_storage_usage AS u (user_id, file_count, total_bytes)
+  VALUES (new_owner, 1, COALESCE(NEW.file_size, 0))
+  ON CONFLICT (user_id) DO UPDATE
+  SET file_count = u.file_count + 1, total_bytes = u.total_bytes + EXCLUDED.total_bytes, updated_at = NOW();
+  RETURN NULL;
+END;
+$$;
+
+
+--
+-- Name: notify_application_changes(); Type: FUNCTION; Schema: public; Owner: -
+--
+
+CREATE FUNCTION public.notify_application_changes() RETURNS trigger
+    LANGUAGE plpgsql
+    AS $$
+BEGIN
+  PERFORM pg_notify('dashboard_event', json_build_object(
+            'type', c.entity,
+            'user_id', c.user_id,
+            'ids', CASE WHEN cardinality(c.ids) <= 50 THEN to_json(c.ids) END)::text)
+  FROM (SELECT entity, user_id, array_agg(DISTINCT entity_id) AS ids
+        FROM new_rows
+        GROUP BY entity, user_id) c;
+  RETURN NULL;
+END;
+$$;
+
+
+--
+-- Name: notify_company_changes(); Type: FUNCTION; Schema: public; Owner: -
+--
+
+CREATE FUNCTION public.notify_company_changes() RETURNS trigger
+    LANGUAGE plpgsql
+    AS $$
+DECLARE
+  ids integer[];
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    SELECT array_agg(DISTINCT company_id) INTO ids FROM new_rows;
+  ELSIF TG_OP = 'UPDATE' THEN
+    SELECT array_agg(DISTINCT company_id) INTO ids
+    FROM (SELECT company_id FROM new_rows UNION SELECT company_id FROM old_rows) r;
+  ELSE
+    SELECT array_agg(DISTINCT company_id) INTO ids FROM old_rows;
+  END IF;
+  ids := array_remove(ids, NULL);
+  IF cardinality(ids) > 0 THEN
+    PERFORM pg_notify('dashboard_event', json_build_object(
+              'type', 'company',
+              'ids', CASE WHEN cardinality(ids) <= 50 THEN to_json(ids) END)::text);
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+
+--
+-- Name: record_application_changes(); Type: FUNCTION; Schema: public; Owner: -
+--
+
+CREATE FUNCTION public.record_application_changes() RETURNS trigger
+    LANGUAGE plpgsql
+    AS $$
+BEGIN
+  IF TG_TABLE_NAME = 'applications' THEN
+    IF TG_OP = 'INSERT' THEN
+      INSERT INTO public.application_changes (user_id, entity, entity_id, application_id)
+      SELECT n.user_id, 'application', n.application_id, n.application_id
+      FROM new_rows n;
+    ELSIF TG_OP = 'UPDATE' THEN
+      INSERT INTO public.application_changes (user_id, entity, entity_id, application_id)
+      SELECT r.user_id, 'application', r.application_id, r.application_id
+      FROM (SELECT user_id, application_id FROM new_rows
+            UNION
+            SELECT user_id, application_id FROM old_rows) r;
+    ELSE
+      INSERT INTO public.application_changes (user_id, entity, entity_id, application_id)
+      SELECT o.user_id, 'application', o.application_id, o.application_id
+      FROM old_rows o;
+    END IF;
+  ELSE
+    IF TG_OP = 'INSERT' THEN
+      INSERT INTO public.application_changes (user_id, entity, entity_id, application_id)
+      SELECT a.user_id, 'document', n.document_id, n.application_id
+      FROM new_rows n
+      JOIN public.applications a ON a.application_id = n.application_id;
+    ELSIF TG_OP = 'UPDATE' THEN
+      INSERT INTO public.application_changes (user_id, entity, entity_id, application_id)
+      SELECT DISTINCT a.user_id, 'document', r.document_id, r.application_id
+      FROM (SELECT n.document_id, n.application_id, o.application_id AS old_application_id
+            FROM new_rows n
+            JOIN old_rows o ON o.document_id = n.document_id
+            WHERE (n.document_type, n.original_filename, n.file_path, n.application_id)
+                  IS DISTINCT FROM (o.document_type, o.original_filename, o.file_path, o.application_id)) c
+      CROSS JOIN LATERAL (VALUES (c.document_id, c.application_id), (c.document_id, c.old_application_id)) r(document_id, application_id)
+      JOIN public.applications a ON a.application_id = r.application_id;
+    ELSE
+      INSERT INTO public.application_changes (user_id, entity, entity_id, application_id)
+      SELECT a.user_id, 'document', o.document_id, o.application_id
+      FROM old_rows o
+      JOIN public.applications a ON a.application_id = o.application_id;
+    END IF;
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+
+--
+-- Name: recount_storage_usage(); Type: FUNCTION; Schema: public; Owner: -
+--
+
+CREATE FUNCTION public.recount_storage_usage() RETURNS void
+    LANGUAGE plpgsql
+    AS $$
+BEGIN
+  LOCK TABLE public.job_documents IN SHARE ROW EXCLUSIVE MODE;
+
+  DELETE FROM public.application_storage_usage;
+  INSERT INTO public.application_storage_usage (application_id, user_id, file_count, total_bytes)
+  SELECT jd.application_id, a.user_id, count(*), COALESCE(sum(jd.file_size), 0)
+  FROM public.job_documents jd
+  JOIN public.applications a ON a.application_id = jd.application_id
+  GROUP BY jd.application_id, a.user_id;
+
+  -- Upsert (not delete + insert) keeps the per-user quota overrides
+  UPDATE public.user_storage_usage SET file_count = 0, total_bytes = 0, updated_at = NOW();
+  INSERT INTO public.user_storage_usage AS u (user_id, file_count, total_bytes)
+  SELECT user_id, sum(file_count), sum(total_bytes)
+  FROM public.application_storage_usage
+  GROUP BY user_id
+  ON CONFLICT (user_id) DO UPDATE
+  SET file_count = EXCLUDED.file_count, total_bytes = EXCLUDED.total_bytes, updated_at = NOW();
+END;
+$$;
+
+
 --
 -- Name: trigger_set_timestamp(); Type: FUNCTION; Schema: public; Owner: -
 --
@@ -95,6 +383,65 @@ SET default_tablespace = '';
 
 SET default_table_access_method = heap;
 
+--
+-- Name: application_change_horizon; Type: TABLE; Schema: public; Owner: -
+--
+
+CREATE TABLE public.application_change_horizon (
+    singleton boolean DEFAULT true NOT NULL,
+    purged_through xid8 NOT NULL,
+    updated_at timestamp with time zone DEFAULT now() NOT NULL,
+    CONSTRAINT chk_application_change_horizon_singleton CHECK (singleton)
+);
+
+
+--
+-- Name: application_changes; Type: TABLE; Schema: public; Owner: -
+--
+
+CREATE TABLE public.application_changes (
+    change_id bigint NOT NULL,
+    user_id uuid NOT NULL,
+    entity character varying(16) NOT NULL,
+    entity_id uuid NOT NULL,
+    application_id uuid NOT NULL,
+    txid xid8 DEFAULT pg_current_xact_id() NOT NULL,
+    changed_at timestamp with time zone DEFAULT now() NOT NULL,
+    CONSTRAINT chk_application_changes_entity CHECK (((entity)::text = ANY ((ARRAY['application'::character varying, 'document'::character varying])::text[])))
+);
+
+
+--
+-- Name: application_changes_change_id_seq; Type: SEQUENCE; Schema: public; Owner: -
+--
+
+CREATE SEQUENCE public.application_changes_change_id_seq
+    START WITH 1
+    INCREMENT BY 1
+    NO MINVALUE
+    NO MAXVALUE
+    CACHE 1;
+
+
+--
+-- Name: application_changes_change_id_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: -
+--
+
+ALTER SEQUENCE public.application_changes_change_id_seq OWNED BY public.application_changes.change_id;
+
+
+--
+-- Name: application_storage_usage; Type: TABLE; Schema: public; Owner: -
+--
+
+CREATE TABLE public.application_storage_usage (
+    application_id uuid NOT NULL,
+    user_id uuid NOT NULL,
+    file_count bigint DEFAULT 0 NOT NULL,
+    total_bytes bigint DEFAULT 0 NOT NULL
+);
+
+
 --
 -- Name: applications; Type: TABLE; Schema: public; Owner: -
 --
@@ -118,6 +465,50 @@ CREATE TABLE public.applications (
 COMMENT ON TABLE public.applications IS 'The core record for a single job application, linking a user, company, and job title.';
 
 
+--
+-- Name: background_jobs; Type: TABLE; Schema: public; Owner: -
+--
+
+CREATE TABLE public.background_jobs (
+    job_id bigint NOT NULL,
+    job_type character varying(64) NOT NULL,
+    payload jsonb DEFAULT '{}'::jsonb NOT NULL,
+    priority smallint DEFAULT 0 NOT NULL,
+    status character varying(16) DEFAULT 'queued'::character varying NOT NULL,
+    attempts integer DEFAULT 0 NOT NULL,
+    max_attempts integer DEFAULT 5 NOT NULL,
+    run_at timestamp with time zone DEFAULT now() NOT NULL,
+    created_at timestamp with time zone DEFAULT now() NOT NULL,
+    started_at timestamp with time zone,
+    heartbeat_at timestamp with time zone,
+    finished_at timestamp with time zone,
+    locked_by character varying(128),
+    last_error text,
+    result jsonb,
+    dedupe_key character varying(255),
+    user_id uuid
+);
+
+
+--
+-- Name: background_jobs_job_id_seq; Type: SEQUENCE; Schema: public; Owner: -
+--
+
+CREATE SEQUENCE public.background_jobs_job_id_seq
+    START WITH 1
+    INCREMENT BY 1
+    NO MINVALUE
+    NO MAXVALUE
+    CACHE 1;
+
+
+--
+-- Name: background_jobs_job_id_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: -
+--
+
+ALTER SEQUENCE public.background_jobs_job_id_seq OWNED BY public.background_jobs.job_id;
+
+
 --
 -- Name: companies; Type: TABLE; Schema: public; Owner: -
 --
@@ -200,6 +591,54 @@ CREATE SEQUENCE public.contacts_id_seq
 ALTER SEQUENCE public.contacts_id_seq OWNED BY public.contacts.id;
 
 
+--
+-- Name: document_blobs; Type: TABLE; Schema: public; Owner: -
+--
+
+CREATE TABLE public.document_blobs (
+    content_hash character(64) NOT NULL,
+    file_size bigint NOT NULL,
+    ref_count integer DEFAULT 0 NOT NULL,
+    created_at timestamp with time zone DEFAULT now() NOT NULL,
+    storage_encoding character varying(16),
+    CONSTRAINT chk_ref_count_not_negative CHECK ((ref_count >= 0))
+);
+
+
+--
+-- Name: file_deletions; Type: TABLE; Schema: public; Owner: -
+--
+
+CREATE TABLE public.file_deletions (
+    deletion_id bigint NOT NULL,
+    file_path character varying(512) NOT NULL,
+    content_hash character(64),
+    created_at timestamp with time zone DEFAULT now() NOT NULL,
+    attempts integer DEFAULT 0 NOT NULL,
+    next_attempt_at timestamp with time zone DEFAULT now() NOT NULL,
+    last_error text
+);
+
+
+--
+-- Name: file_deletions_deletion_id_seq; Type: SEQUENCE; Schema: public; Owner: -
+--
+
+CREATE SEQUENCE public.file_deletions_deletion_id_seq
+    START WITH 1
+    INCREMENT BY 1
+    NO MINVALUE
+    NO MAXVALUE
+    CACHE 1;
+
+
+--
+-- Name: file_deletions_deletion_id_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: -
+--
+
+ALTER SEQUENCE public.file_deletions_deletion_id_seq OWNED BY public.file_deletions.deletion_id;
+
+
 --
 -- Name: job_documents; Type: TABLE; Schema: public; Owner: -
 --
@@ -212,6 +651,15 @@ CREATE TABLE public.job_documents (
     original_filename character varying(255) NOT NULL,
     mime_type character varying(100) NOT NULL,
     upload_timestamp timestamp with time zone DEFAULT now() NOT NULL,
+    file_size bigint,
+    content_hash character(64),
+    extraction_status character varying(20) DEFAULT 'pending'::character varying NOT NULL,
+    extraction_claimed_at timestamp with time zone,
+    extracted_text text,
+    search_vector tsvector,
+    storage_encoding character varying(16),
+    integrity_status character varying(16),
+    verified_at timestamp with time zone,
     CONSTRAINT chk_file_path_not_empty CHECK (((file_path)::text <> ''::text))
 );
 
@@ -262,6 +710,89 @@ CREATE SEQUENCE public.job_titles_job_title_id_seq
 ALTER SEQUENCE public.job_titles_job_title_id_seq OWNED BY public.job_titles.job_title_id;
 
 
+--
+-- Name: maintenance_checkpoints; Type: TABLE; Schema: public; Owner: -
+--
+
+CREATE TABLE public.maintenance_checkpoints (
+    command character varying(64) NOT NULL,
+    "position" text NOT NULL,
+    items_done bigint DEFAULT 0 NOT NULL,
+    started_at timestamp with time zone DEFAULT now() NOT NULL,
+    updated_at timestamp with time zone DEFAULT now() NOT NULL
+);
+
+
+--
+-- Name: scrub_runs; Type: TABLE; Schema: public; Owner: -
+--
+
+CREATE TABLE public.scrub_runs (
+    run_id bigint NOT NULL,
+    started_at timestamp with time zone DEFAULT now() NOT NULL,
+    updated_at timestamp with time zone DEFAULT now() NOT NULL,
+    finished_at timestamp with time zone,
+    checkpoint_path character varying(512) DEFAULT ''::character varying NOT NULL,
+    files_checked integer DEFAULT 0 NOT NULL,
+    bytes_checked bigint DEFAULT 0 NOT NULL,
+    corrupt_files integer DEFAULT 0 NOT NULL,
+    missing_files integer DEFAULT 0 NOT NULL
+);
+
+
+--
+-- Name: scrub_runs_run_id_seq; Type: SEQUENCE; Schema: public; Owner: -
+--
+
+CREATE SEQUENCE public.scrub_runs_run_id_seq
+    START WITH 1
+    INCREMENT BY 1
+    NO MINVALUE
+    NO MAXVALUE
+    CACHE 1;
+
+
+--
+-- Name: scrub_runs_run_id_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: -
+--
+
+ALTER SEQUENCE public.scrub_runs_run_id_seq OWNED BY public.scrub_runs.run_id;
+
+
+--
+-- Name: upload_sessions; Type: TABLE; Schema: public; Owner: -
+--
+
+CREATE TABLE public.upload_sessions (
+    upload_id uuid DEFAULT gen_random_uuid() NOT NULL,
+    user_id uuid NOT NULL,
+    application_id uuid NOT NULL,
+    document_type public.document_type_enum NOT NULL,
+    original_filename character varying(255) NOT NULL,
+    total_size bigint NOT NULL,
+    chunk_size integer NOT NULL,
+    expected_hash character(64),
+    received_chunks integer[] DEFAULT '{}'::integer[] NOT NULL,
+    created_at timestamp with time zone DEFAULT now() NOT NULL,
+    updated_at timestamp with time zone DEFAULT now() NOT NULL,
+    CONSTRAINT chk_upload_sizes_positive CHECK (((total_size > 0) AND (chunk_size > 0)))
+);
+
+
+--
+-- Name: user_storage_usage; Type: TABLE; Schema: public; Owner: -
+--
+
+CREATE TABLE public.user_storage_usage (
+    user_id uuid NOT NULL,
+    file_count bigint DEFAULT 0 NOT NULL,
+    total_bytes bigint DEFAULT 0 NOT NULL,
+    quota_bytes bigint,
+    file_quota bigint,
+    updated_at timestamp with time zone DEFAULT now() NOT NULL
+);
+
+
 --
 -- Name: users; Type: TABLE; Schema: public; Owner: -
 --
@@ -273,6 +804,20 @@ CREATE TABLE public.users (
 );
 
 
+--
+-- Name: application_changes change_id; Type: DEFAULT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.application_changes ALTER COLUMN change_id SET DEFAULT nextval('public.application_changes_change_id_seq'::regclass);
+
+
+--
+-- Name: background_jobs job_id; Type: DEFAULT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.background_jobs ALTER COLUMN job_id SET DEFAULT nextval('public.background_jobs_job_id_seq'::regclass);
+
+
 --
 -- Name: companies company_id; Type: DEFAULT; Schema: public; Owner: -
 --
@@ -287,6 +832,13 @@ ALTER TABLE ONLY public.companies ALTER COLUMN company_id SET DEFAULT nextval('p
 ALTER TABLE ONLY public.contacts ALTER COLUMN id SET DEFAULT nextval('public.contacts_id_seq'::regclass);
 
 
+--
+-- Name: file_deletions deletion_id; Type: DEFAULT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.file_deletions ALTER COLUMN deletion_id SET DEFAULT nextval('public.file_deletions_deletion_id_seq'::regclass);
+
+
 --
 -- Name: job_titles job_title_id; Type: DEFAULT; Schema: public; Owner: -
 --
@@ -294,6 +846,37 @@ ALTER TABLE ONLY public.contacts ALTER COLUMN id SET DEFAULT nextval('public.con
 ALTER TABLE ONLY public.job_titles ALTER COLUMN job_title_id SET DEFAULT nextval('public.job_titles_job_title_id_seq'::regclass);
 
 
+--
+-- Name: scrub_runs run_id; Type: DEFAULT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.scrub_runs ALTER COLUMN run_id SET DEFAULT nextval('public.scrub_runs_run_id_seq'::regclass);
+
+
+--
+-- Name: application_change_horizon application_change_horizon_pkey; Type: CONSTRAINT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.application_change_horizon
+    ADD CONSTRAINT application_change_horizon_pkey PRIMARY KEY (singleton);
+
+
+--
+-- Name: application_changes application_changes_pkey; Type: CONSTRAINT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.application_changes
+    ADD CONSTRAINT application_changes_pkey PRIMARY KEY (change_id);
+
+
+--
+-- Name: application_storage_usage application_storage_usage_pkey; Type: CONSTRAINT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.application_storage_usage
+    ADD CONSTRAINT application_storage_usage_pkey PRIMARY KEY (application_id);
+
+
 --
 -- Name: applications applications_pkey; Type: CONSTRAINT; Schema: public; Owner: -
 --
@@ -302,6 +885,14 @@ ALTER TABLE ONLY public.applications
     ADD CONSTRAINT applications_pkey PRIMARY KEY (application_id);
 
 
+--
+-- Name: background_jobs background_jobs_pkey; Type: CONSTRAINT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.background_jobs
+    ADD CONSTRAINT background_jobs_pkey PRIMARY KEY (job_id);
+
+
 --
 -- Name: companies companies_company_name_clean_key; Type: CONSTRAINT; Schema: public; Owner: -
 --
@@ -343,11 +934,19 @@ ALTER TABLE ONLY public.contacts
 
 
 --
--- Name: job_documents job_documents_file_path_key; Type: CONSTRAINT; Schema: public; Owner: -
+-- Name: document_blobs document_blobs_pkey; Type: CONSTRAINT; Schema: public; Owner: -
 --
 
-ALTER TABLE ONLY public.job_documents
-    ADD CONSTRAINT job_documents_file_path_key UNIQUE (file_path);
+ALTER TABLE ONLY public.document_blobs
+    ADD CONSTRAINT document_blobs_pkey PRIMARY KEY (content_hash);
+
+
+--
+-- Name: file_deletions file_deletions_pkey; Type: CONSTRAINT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.file_deletions
+    ADD CONSTRAINT file_deletions_pkey PRIMARY KEY (deletion_id);
 
 
 --
@@ -374,6 +973,38 @@ ALTER TABLE ONLY public.job_titles
     ADD CONSTRAINT job_titles_title_name_key UNIQUE (title_name);
 
 
+--
+-- Name: maintenance_checkpoints maintenance_checkpoints_pkey; Type: CONSTRAINT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.maintenance_checkpoints
+    ADD CONSTRAINT maintenance_checkpoints_pkey PRIMARY KEY (command);
+
+
+--
+-- Name: scrub_runs scrub_runs_pkey; Type: CONSTRAINT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.scrub_runs
+    ADD CONSTRAINT scrub_runs_pkey PRIMARY KEY (run_id);
+
+
+--
+-- Name: upload_sessions upload_sessions_pkey; Type: CONSTRAINT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.upload_sessions
+    ADD CONSTRAINT upload_sessions_pkey PRIMARY KEY (upload_id);
+
+
+--
+-- Name: user_storage_usage user_storage_usage_pkey; Type: CONSTRAINT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.user_storage_usage
+    ADD CONSTRAINT user_storage_usage_pkey PRIMARY KEY (user_id);
+
+
 --
 -- Name: users users_email_key; Type: CONSTRAINT; Schema: public; Owner: -
 --
@@ -390,6 +1021,27 @@ ALTER TABLE ONLY public.users
     ADD CONSTRAINT users_pkey PRIMARY KEY (user_id);
 
 
+--
+-- Name: idx_application_changes_changed_at; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX idx_application_changes_changed_at ON public.application_changes USING btree (changed_at);
+
+
+--
+-- Name: idx_application_changes_user_txid; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX idx_application_changes_user_txid ON public.application_changes USING btree (user_id, txid);
+
+
+--
+-- Name: idx_application_storage_usage_user; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX idx_application_storage_usage_user ON public.application_storage_usage USING btree (user_id);
+
+
 --
 -- Name: idx_applications_status; Type: INDEX; Schema: public; Owner: -
 --
@@ -404,6 +1056,62 @@ CREATE INDEX idx_applications_status ON public.applications USING btree (current
 CREATE INDEX idx_applications_user_company ON public.applications USING btree (user_id, company_id);
 
 
+--
+-- Name: idx_background_jobs_dedupe; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE UNIQUE INDEX idx_background_jobs_dedupe ON public.background_jobs USING btree (job_type, dedupe_key) WHERE ((dedupe_key IS NOT NULL) AND ((status)::text = ANY ((ARRAY['queued'::character varying, 'running'::character varying])::text[])));
+
+
+--
+-- Name: idx_background_jobs_finished_at; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX idx_background_jobs_finished_at ON public.background_jobs USING btree (finished_at) WHERE (finished_at IS NOT NULL);
+
+
+--
+-- Name: idx_background_jobs_queued; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX idx_background_jobs_queued ON public.background_jobs USING btree (priority DESC, run_at, job_id) WHERE ((status)::text = 'queued'::text);
+
+
+--
+-- Name: idx_background_jobs_running; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX idx_background_jobs_running ON public.background_jobs USING btree (job_type, heartbeat_at) WHERE ((status)::text = 'running'::text);
+
+
+--
+-- Name: idx_background_jobs_user; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX idx_background_jobs_user ON public.background_jobs USING btree (user_id, job_id DESC) WHERE (user_id IS NOT NULL);
+
+
+--
+-- Name: idx_company_name_mapping_company; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX idx_company_name_mapping_company ON public.company_name_mapping USING btree (company_id);
+
+
+--
+-- Name: idx_contacts_company; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX idx_contacts_company ON public.contacts USING btree (company);
+
+
+--
+-- Name: idx_file_deletions_next_attempt_at; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX idx_file_deletions_next_attempt_at ON public.file_deletions USING btree (next_attempt_at);
+
+
 --
 -- Name: idx_job_documents_application; Type: INDEX; Schema: public; Owner: -
 --
@@ -411,6 +1119,41 @@ CREATE INDEX idx_applications_user_company ON public.applications USING btree (u
 CREATE INDEX idx_job_documents_application ON public.job_documents USING btree (application_id);
 
 
+--
+-- Name: idx_job_documents_content_hash; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX idx_job_documents_content_hash ON public.job_documents USING btree (content_hash);
+
+
+--
+-- Name: idx_job_documents_extraction_pending; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX idx_job_documents_extraction_pending ON public.job_documents USING btree (upload_timestamp) WHERE ((extraction_status)::text = ANY ((ARRAY['pending'::character varying, 'processing'::character varying])::text[]));
+
+
+--
+-- Name: idx_job_documents_file_path; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX idx_job_documents_file_path ON public.job_documents USING btree (file_path COLLATE "C");
+
+
+--
+-- Name: idx_job_documents_integrity_problems; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX idx_job_documents_integrity_problems ON public.job_documents USING btree (integrity_status) WHERE ((integrity_status)::text <> 'ok'::text);
+
+
+--
+-- Name: idx_job_documents_search_vector; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX idx_job_documents_search_vector ON public.job_documents USING gin (search_vector);
+
+
 --
 -- Name: idx_job_titles_standardized; Type: INDEX; Schema: public; Owner: -
 --
@@ -418,6 +1161,41 @@ CREATE INDEX idx_job_documents_application ON public.job_documents USING btree (
 CREATE INDEX idx_job_titles_standardized ON public.job_titles USING btree (standardized_title);
 
 
+--
+-- Name: idx_upload_sessions_updated_at; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX idx_upload_sessions_updated_at ON public.upload_sessions USING btree (updated_at);
+
+
+--
+-- Name: application_changes notify_application_changes_insert; Type: TRIGGER; Schema: public; Owner: -
+--
+
+CREATE TRIGGER notify_application_changes_insert AFTER INSERT ON public.application_changes REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION public.notify_application_changes();
+
+
+--
+-- Name: applications record_applications_changes_delete; Type: TRIGGER; Schema: public; Owner: -
+--
+
+CREATE TRIGGER record_applications_changes_delete AFTER DELETE ON public.applications REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION public.record_application_changes();
+
+
+--
+-- Name: applications record_applications_changes_insert; Type: TRIGGER; Schema: public; Owner: -
+--
+
+CREATE TRIGGER record_applications_changes_insert AFTER INSERT ON public.applications REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION public.record_application_changes();
+
+
+--
+-- Name: applications record_applications_changes_update; Type: TRIGGER; Schema: public; Owner: -
+--
+
+CREATE TRIGGER record_applications_changes_update AFTER UPDATE ON public.applications REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION public.record_application_changes();
+
+
 --
 -- Name: applications set_applications_timestamp; Type: TRIGGER; Schema: public; Owner: -
 --
@@ -425,6 +1203,90 @@ CREATE INDEX idx_job_titles_standardized ON public.job_titles USING btree (stand
 CREATE TRIGGER set_applications_timestamp BEFORE UPDATE ON public.applications FOR EACH ROW EXECUTE FUNCTION public.trigger_set_timestamp();
 
 
+--
+-- Name: companies notify_companies_changes_delete; Type: TRIGGER; Schema: public; Owner: -
+--
+
+CREATE TRIGGER notify_companies_changes_delete AFTER DELETE ON public.companies REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION public.notify_company_changes();
+
+
+--
+-- Name: companies notify_companies_changes_insert; Type: TRIGGER; Schema: public; Owner: -
+--
+
+CREATE TRIGGER notify_companies_changes_insert AFTER INSERT ON public.companies REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION public.notify_company_changes();
+
+
+--
+-- Name: companies notify_companies_changes_update; Type: TRIGGER; Schema: public; Owner: -
+--
+
+CREATE TRIGGER notify_companies_changes_update AFTER UPDATE ON public.companies REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION public.notify_company_changes();
+
+
+--
+-- Name: company_name_mapping notify_company_name_mapping_changes_delete; Type: TRIGGER; Schema: public; Owner: -
+--
+
+CREATE TRIGGER notify_company_name_mapping_changes_delete AFTER DELETE ON public.company_name_mapping REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION public.notify_company_changes();
+
+
+--
+-- Name: company_name_mapping notify_company_name_mapping_changes_insert; Type: TRIGGER; Schema: public; Owner: -
+--
+
+CREATE TRIGGER notify_company_name_mapping_changes_insert AFTER INSERT ON public.company_name_mapping REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION public.notify_company_changes();
+
+
+--
+-- Name: company_name_mapping notify_company_name_mapping_changes_update; Type: TRIGGER; Schema: public; Owner: -
+--
+
+CREATE TRIGGER notify_company_name_mapping_changes_update AFTER UPDATE ON public.company_name_mapping REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION public.notify_company_changes();
+
+
+--
+-- Name: job_documents record_job_documents_changes_delete; Type: TRIGGER; Schema: public; Owner: -
+--
+
+CREATE TRIGGER record_job_documents_changes_delete AFTER DELETE ON public.job_documents REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION public.record_application_changes();
+
+
+--
+-- Name: job_documents record_job_documents_changes_insert; Type: TRIGGER; Schema: public; Owner: -
+--
+
+CREATE TRIGGER record_job_documents_changes_insert AFTER INSERT ON public.job_documents REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION public.record_application_changes();
+
+
+--
+-- Name: job_documents record_job_documents_changes_update; Type: TRIGGER; Schema: public; Owner: -
+--
+
+CREATE TRIGGER record_job_documents_changes_update AFTER UPDATE ON public.job_documents REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION public.record_application_changes();
+
+
+--
+-- Name: job_documents track_job_documents_usage_delete; Type: TRIGGER; Schema: public; Owner: -
+--
+
+CREATE TRIGGER track_job_documents_usage_delete AFTER DELETE ON public.job_documents REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION public.job_documents_track_usage();
+
+
+--
+-- Name: job_documents track_job_documents_usage_insert; Type: TRIGGER; Schema: public; Owner: -
+--
+
+CREATE TRIGGER track_job_documents_usage_insert AFTER INSERT ON public.job_documents REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION public.job_documents_track_usage();
+
+
+--
+-- Name: job_documents track_job_documents_usage_update; Type: TRIGGER; Schema: public; Owner: -
+--
+
+CREATE TRIGGER track_job_documents_usage_update AFTER UPDATE OF file_size, application_id ON public.job_documents FOR EACH ROW WHEN (((old.file_size IS DISTINCT FROM new.file_size) OR (old.application_id IS DISTINCT FROM new.application_id))) EXECUTE FUNCTION public.job_documents_track_usage_update();
+
+
 --
 -- Name: job_titles set_job_titles_timestamp; Type: TRIGGER; Schema: public; Owner: -
 --
@@ -504,6 +1366,14 @@ ALTER TABLE ONLY public.job_documents
     ADD CONSTRAINT job_documents_application_id_fkey FOREIGN KEY (application_id) REFERENCES public.applications(application_id) ON DELETE CASCADE;
 
 
+--
+-- Name: upload_sessions upload_sessions_application_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.upload_sessions
+    ADD CONSTRAINT upload_sessions_application_id_fkey FOREIGN KEY (application_id) REFERENCES public.applications(application_id) ON DELETE CASCADE;
+
+
 --
 -- PostgreSQL database dump complete
 --
@@ -0,0 +1,10 @@
+--
+-- 001: Indexes for the company detail endpoint (API 28.0)
+--
+-- company_name_mapping is looked up by company_id (raw names for a company) and
+-- contacts by company (contacts for those raw names); neither column was indexed.
+--
+
+CREATE INDEX IF NOT EXISTS idx_company_name_mapping_company ON public.company_name_mapping USING btree (company_id);
+
+CREATE INDEX IF NOT EXISTS idx_contacts_company ON public.contacts USING btree (company);
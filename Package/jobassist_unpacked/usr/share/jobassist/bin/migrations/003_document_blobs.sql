@@ -0,0 +1,21 @@
+--
+-- 003: Content-addressed document store (API 9.0 / 12.0 / 20.0 / 25.0)
+--
+-- One row per distinct file content, stored at UPLOAD_FOLDER/blobs/ab/cd/<sha256>.
+-- ref_count is the number of job_documents rows whose file_path points at the blob.
+-- Existing flat files are moved into the store with: python maintenance.py dedupe-filestore
+--
+
+CREATE TABLE IF NOT EXISTS public.document_blobs (
+    content_hash character(64) NOT NULL,
+    file_size bigint NOT NULL,
+    ref_count integer DEFAULT 0 NOT NULL,
+    created_at timestamp with time zone DEFAULT now() NOT NULL,
+    CONSTRAINT document_blobs_pkey PRIMARY KEY (content_hash),
+    CONSTRAINT chk_ref_count_not_negative CHECK ((ref_count >= 0))
+);
+
+-- Deduplicated documents share a file_path, so it can no longer be unique.
+ALTER TABLE public.job_documents DROP CONSTRAINT IF EXISTS job_documents_file_path_key;
+
+CREATE INDEX IF NOT EXISTS idx_job_documents_content_hash ON public.job_documents USING btree (content_hash);
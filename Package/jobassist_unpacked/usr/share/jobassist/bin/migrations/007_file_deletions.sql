@@ -0,0 +1,22 @@
+--
+-- 007: Deferred file deletion outbox (API 20.0 / 25.0, worker.py)
+--
+-- Deleting a document (or the last reference to a shared blob) inserts a row here in
+-- the same transaction as the DELETE; worker.py unlinks the file after the commit and
+-- removes the row. Failed attempts are retried with backoff (next_attempt_at).
+-- content_hash is set for shared blobs: the worker skips the unlink if the blob was
+-- re-created by an upload in the meantime.
+--
+
+CREATE TABLE IF NOT EXISTS public.file_deletions (
+    deletion_id bigserial NOT NULL,
+    file_path character varying(512) NOT NULL,
+    content_hash character(64),
+    created_at timestamp with time zone DEFAULT now() NOT NULL,
+    attempts integer DEFAULT 0 NOT NULL,
+    next_attempt_at timestamp with time zone DEFAULT now() NOT NULL,
+    last_error text,
+    CONSTRAINT file_deletions_pkey PRIMARY KEY (deletion_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_file_deletions_next_attempt_at ON public.file_deletions USING btree (next_attempt_at);
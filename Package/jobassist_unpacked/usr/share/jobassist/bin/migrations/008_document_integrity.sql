@@ -0,0 +1,34 @@
+--
+-- 008: Filestore integrity scrubbing (maintenance.py scrub, API 32.0)
+--
+-- The scrubber re-reads every stored file in the background and compares it with
+-- the SHA-256 and size recorded at upload (migration 002); rows from before that
+-- migration get both filled in on their first successful check.
+-- integrity_status: NULL = not checked yet, 'ok', 'corrupt' (content or size differs,
+-- or the file cannot be read/decompressed) or 'missing'.
+-- scrub_runs holds one row per pass over the filestore; checkpoint_path is the last
+-- file_path verified, so an interrupted pass resumes where it stopped.
+--
+
+ALTER TABLE public.job_documents ADD COLUMN IF NOT EXISTS integrity_status character varying(16);
+
+ALTER TABLE public.job_documents ADD COLUMN IF NOT EXISTS verified_at timestamp with time zone;
+
+-- The scrubber walks documents in file_path byte order (keyset pagination)
+CREATE INDEX IF NOT EXISTS idx_job_documents_file_path ON public.job_documents USING btree (file_path COLLATE "C");
+
+CREATE INDEX IF NOT EXISTS idx_job_documents_integrity_problems ON public.job_documents USING btree (integrity_status)
+    WHERE ((integrity_status)::text <> 'ok'::text);
+
+CREATE TABLE IF NOT EXISTS public.scrub_runs (
+    run_id bigserial NOT NULL,
+    started_at timestamp with time zone DEFAULT now() NOT NULL,
+    updated_at timestamp with time zone DEFAULT now() NOT NULL,
+    finished_at timestamp with time zone,
+    checkpoint_path character varying(512) DEFAULT ''::character varying NOT NULL,
+    files_checked integer DEFAULT 0 NOT NULL,
+    bytes_checked bigint DEFAULT 0 NOT NULL,
+    corrupt_files integer DEFAULT 0 NOT NULL,
+    missing_files integer DEFAULT 0 NOT NULL,
+    CONSTRAINT scrub_runs_pkey PRIMARY KEY (run_id)
+);
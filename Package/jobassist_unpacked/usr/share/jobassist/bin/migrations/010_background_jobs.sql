@@ -0,0 +1,54 @@
+--
+-- 010: Background job queue (worker.py --jobs, API 34.x)
+--
+-- Durable queue for work that must not run inside a request (regenerating unmapped
+-- company names, re-extraction, reconcile / scrub / recount runs, ...). Jobs are
+-- inserted by enqueue_job() in the same transaction as the change that needs them,
+-- so a job exists if and only if that change committed. Job runners on any node
+-- claim the highest-priority due job with FOR UPDATE SKIP LOCKED.
+-- status: queued -> running -> done | failed; queued jobs can be cancelled.
+-- A failed attempt goes back to 'queued' with run_at pushed out (exponential backoff)
+-- until max_attempts is reached. Running jobs refresh heartbeat_at; a job whose
+-- runner stopped heartbeating is treated as a failed attempt.
+-- dedupe_key: at most one queued or running job per (job_type, dedupe_key).
+--
+
+CREATE TABLE IF NOT EXISTS public.background_jobs (
+    job_id bigserial NOT NULL,
+    job_type character varying(64) NOT NULL,
+    payload jsonb DEFAULT '{}'::jsonb NOT NULL,
+    priority smallint DEFAULT 0 NOT NULL,
+    status character varying(16) DEFAULT 'queued'::character varying NOT NULL,
+    attempts integer DEFAULT 0 NOT NULL,
+    max_attempts integer DEFAULT 5 NOT NULL,
+    run_at timestamp with time zone DEFAULT now() NOT NULL,
+    created_at timestamp with time zone DEFAULT now() NOT NULL,
+    started_at timestamp with time zone,
+    heartbeat_at timestamp with time zone,
+    finished_at timestamp with time zone,
+    locked_by character varying(128),
+    last_error text,
+    result jsonb,
+    dedupe_key character varying(255),
+    user_id uuid,
+    CONSTRAINT background_jobs_pkey PRIMARY KEY (job_id)
+);
+
+-- Claim order; only queued jobs are in the index, so it stays small however long the history is
+CREATE INDEX IF NOT EXISTS idx_background_jobs_queued ON public.background_jobs USING btree (priority DESC, run_at, job_id)
+    WHERE ((status)::text = 'queued'::text);
+
+-- Per-type concurrency counts and stale-heartbeat checks
+CREATE INDEX IF NOT EXISTS idx_background_jobs_running ON public.background_jobs USING btree (job_type, heartbeat_at)
+    WHERE ((status)::text = 'running'::text);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_background_jobs_dedupe ON public.background_jobs USING btree (job_type, dedupe_key)
+    WHERE ((dedupe_key IS NOT NULL) AND ((status)::text = ANY ((ARRAY['queued'::character varying, 'running'::character varying])::text[])));
+
+-- Status API (34.x): a user's recent jobs
+CREATE INDEX IF NOT EXISTS idx_background_jobs_user ON public.background_jobs USING btree (user_id, job_id DESC)
+    WHERE (user_id IS NOT NULL);
+
+-- Retention purge of finished jobs
+CREATE INDEX IF NOT EXISTS idx_background_jobs_finished_at ON public.background_jobs USING btree (finished_at)
+    WHERE (finished_at IS NOT NULL);
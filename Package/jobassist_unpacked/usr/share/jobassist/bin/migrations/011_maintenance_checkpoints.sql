@@ -0,0 +1,18 @@
+--
+-- 011: Resumable bulk maintenance commands (maintenance.py)
+--
+-- import-contacts, regenerate-mappings, rebuild-search, reindex and warm-cache work
+-- through their input in batches on several connections at once. After every batch
+-- the position up to which all work is finished is stored here; an interrupted
+-- command continues from it on the next run (--restart starts over). The row is
+-- removed when the command completes.
+--
+
+CREATE TABLE IF NOT EXISTS public.maintenance_checkpoints (
+    command character varying(64) NOT NULL,
+    "position" text NOT NULL,
+    items_done bigint DEFAULT 0 NOT NULL,
+    started_at timestamp with time zone DEFAULT now() NOT NULL,
+    updated_at timestamp with time zone DEFAULT now() NOT NULL,
+    CONSTRAINT maintenance_checkpoints_pkey PRIMARY KEY (command)
+);
@@ -0,0 +1,125 @@
+--
+-- 012: Application change feed for incremental client sync (API 35.0)
+--
+-- Triggers on applications and job_documents append one row per changed entity to
+-- application_changes, in the same transaction as the change. Rows carry the id of
+-- the writing transaction (txid), which is what the sync cursor is compared against:
+-- the cursor handed to a client is the xmin of the snapshot it was read under, so
+-- every transaction that was still running (or not yet started) then has a txid at
+-- or above the cursor and is returned by the next ?since=<cursor> call, however late
+-- it commits. A sequence value would not work here: a lower change_id can commit
+-- after a higher one has already been read.
+-- Only columns the clients display are tracked for job_documents; the worker's
+-- extraction / integrity updates do not produce changes. (The filter is in the
+-- function: statement triggers with transition tables cannot have a column list.)
+-- Changes are purged after CHANGE_FEED_RETENTION_DAYS by the job runner
+-- (worker.py --jobs). application_change_horizon records the highest purged txid;
+-- a cursor at or below it may have missed changes and gets a full resync instead.
+--
+
+CREATE TABLE IF NOT EXISTS public.application_changes (
+    change_id bigserial NOT NULL,
+    user_id uuid NOT NULL,
+    entity character varying(16) NOT NULL,
+    entity_id uuid NOT NULL,
+    application_id uuid NOT NULL,
+    txid xid8 DEFAULT pg_current_xact_id() NOT NULL,
+    changed_at timestamp with time zone DEFAULT now() NOT NULL,
+    CONSTRAINT application_changes_pkey PRIMARY KEY (change_id),
+    CONSTRAINT chk_application_changes_entity CHECK (((entity)::text = ANY ((ARRAY['application'::character varying, 'document'::character varying])::text[])))
+);
+
+-- Delta query (35.0): one user's changes since a cursor
+CREATE INDEX IF NOT EXISTS idx_application_changes_user_txid ON public.application_changes USING btree (user_id, txid);
+
+-- Retention purge
+CREATE INDEX IF NOT EXISTS idx_application_changes_changed_at ON public.application_changes USING btree (changed_at);
+
+CREATE TABLE IF NOT EXISTS public.application_change_horizon (
+    singleton boolean DEFAULT true NOT NULL,
+    purged_through xid8 NOT NULL,
+    updated_at timestamp with time zone DEFAULT now() NOT NULL,
+    CONSTRAINT application_change_horizon_pkey PRIMARY KEY (singleton),
+    CONSTRAINT chk_application_change_horizon_singleton CHECK (singleton)
+);
+
+-- No cursor handed out before this migration can be valid: they all start at or after it
+INSERT INTO public.application_change_horizon (purged_through)
+VALUES (pg_snapshot_xmin(pg_current_snapshot()))
+ON CONFLICT (singleton) DO NOTHING;
+
+-- One trigger run per statement, for both tables. The owner is looked up through
+-- applications; for an application update both the old and the new owner get a row,
+-- so a reassigned application shows up as a tombstone for its previous owner.
+-- Documents removed by the cascade of an application delete find no application any
+-- more and are skipped: the application's own tombstone covers them.
+CREATE OR REPLACE FUNCTION public.record_application_changes() RETURNS trigger
+    LANGUAGE plpgsql
+    AS $$
+BEGIN
+  IF TG_TABLE_NAME = 'applications' THEN
+    IF TG_OP = 'INSERT' THEN
+      INSERT INTO public.application_changes (user_id, entity, entity_id, application_id)
+      SELECT n.user_id, 'application', n.application_id, n.application_id
+      FROM new_rows n;
+    ELSIF TG_OP = 'UPDATE' THEN
+      INSERT INTO public.application_changes (user_id, entity, entity_id, application_id)
+      SELECT r.user_id, 'application', r.application_id, r.application_id
+      FROM (SELECT user_id, application_id FROM new_rows
+            UNION
+            SELECT user_id, application_id FROM old_rows) r;
+    ELSE
+      INSERT INTO public.application_changes (user_id, entity, entity_id, application_id)
+      SELECT o.user_id, 'application', o.application_id, o.application_id
+      FROM old_rows o;
+    END IF;
+  ELSE
+    IF TG_OP = 'INSERT' THEN
+      INSERT INTO public.application_changes (user_id, entity, entity_id, application_id)
+      SELECT a.user_id, 'document', n.document_id, n.application_id
+      FROM new_rows n
+      JOIN public.applications a ON a.application_id = n.application_id;
+    ELSIF TG_OP = 'UPDATE' THEN
+      INSERT INTO public.application_changes (user_id, entity, entity_id, application_id)
+      SELECT DISTINCT a.user_id, 'document', r.document_id, r.application_id
+      FROM (SELECT n.document_id, n.application_id, o.application_id AS old_application_id
+            FROM new_rows n
+            JOIN old_rows o ON o.document_id = n.document_id
+            WHERE (n.document_type, n.original_filename, n.file_path, n.application_id)
+                  IS DISTINCT FROM (o.document_type, o.original_filename, o.file_path, o.application_id)) c
+      CROSS JOIN LATERAL (VALUES (c.document_id, c.application_id), (c.document_id, c.old_application_id)) r(document_id, application_id)
+      JOIN public.applications a ON a.application_id = r.application_id;
+    ELSE
+      INSERT INTO public.application_changes (user_id, entity, entity_id, application_id)
+      SELECT a.user_id, 'document', o.document_id, o.application_id
+      FROM old_rows o
+      JOIN public.applications a ON a.application_id = o.application_id;
+    END IF;
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS record_applications_changes_insert ON public.applications;
+CREATE TRIGGER record_applications_changes_insert AFTER INSERT ON public.applications
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION public.record_application_changes();
+
+DROP TRIGGER IF EXISTS record_applications_changes_update ON public.applications;
+CREATE TRIGGER record_applications_changes_update AFTER UPDATE ON public.applications
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION public.record_application_changes();
+
+DROP TRIGGER IF EXISTS record_applications_changes_delete ON public.applications;
+CREATE TRIGGER record_applications_changes_delete AFTER DELETE ON public.applications
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION public.record_application_changes();
+
+DROP TRIGGER IF EXISTS record_job_documents_changes_insert ON public.job_documents;
+CREATE TRIGGER record_job_documents_changes_insert AFTER INSERT ON public.job_documents
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION public.record_application_changes();
+
+DROP TRIGGER IF EXISTS record_job_documents_changes_update ON public.job_documents;
+CREATE TRIGGER record_job_documents_changes_update AFTER UPDATE ON public.job_documents
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION public.record_application_changes();
+
+DROP TRIGGER IF EXISTS record_job_documents_changes_delete ON public.job_documents;
+CREATE TRIGGER record_job_documents_changes_delete AFTER DELETE ON public.job_documents
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION public.record_application_changes();
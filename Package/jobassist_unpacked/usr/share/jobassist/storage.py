@@ -0,0 +1,260 @@
+# FILENAME: storage.py
+# Where document files live. app.py, worker.py and maintenance.py address files by
+# their job_documents.file_path ("key", e.g. blobs/ab/cd/<sha256>) and only talk to
+# a StorageBackend:
+#   LocalStorage -> a directory on this host (UPLOAD_FOLDER, the original layout)
+#   S3Storage    -> a bucket on any S3-compatible object store (AWS S3, MinIO, Ceph
+#                   RGW, ...), so several API nodes can serve the same documents
+# Every transfer is streamed in chunks; no file is ever read into memory whole.
+# Selected with STORAGE_BACKEND (see app.py, "Document Storage Backend").
+import os
+import shutil
+from abc import ABC, abstractmethod
+
+# Optional: only needed for STORAGE_BACKEND=s3
+try:
+    import boto3
+    from boto3.s3.transfer import TransferConfig
+    from botocore.exceptions import ClientError
+except ImportError:
+    boto3 = None
+    TransferConfig = None
+    ClientError = None
+
+# Multipart threshold / part size for S3 uploads (parts are read from disk one by one)
+S3_MULTIPART_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+class RangeReader:
+    """Read-only file-like view of `length` bytes of an open file, from its current position."""
+
+    def __init__(self, f, length):
+        self._file = f
+        self._remaining = length
+
+    def read(self, size=-1):
+        if self._remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._file.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RemoteObjectBody:
+    """
+    Seekable WSGI response body for a stored object of known size. Werkzeug's Range
+    handling (make_conditional with accept_ranges) seeks before the first chunk, so
+    the object is only fetched from the requested offset on.
+    """
+
+    def __init__(self, storage, key, size, chunk_size):
+        self.storage = storage
+        self.key = key
+        self.size = size
+        self.chunk_size = chunk_size
+        self._offset = 0
+        self._stream = None
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset):
+        self._offset = offset
+
+    def tell(self):
+        return self._offset
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._stream is None:
+            if self._offset >= self.size:
+                raise StopIteration
+            self._stream = self.storage.open_range(self.key, self._offset, self.size - 1)
+        chunk = self._stream.read(self.chunk_size)
+        if not chunk:
+            self.close()
+            raise StopIteration
+        return chunk
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
+
+class StorageBackend(ABC):
+    """
+    Interface of a document store. Keys are relative, '/'-separated paths.
+    Missing objects raise FileNotFoundError from open()/open_range().
+    """
+
+    @abstractmethod
+    def put_file(self, key, src_path):
+        """Stores the local file src_path under key and consumes it (src_path is gone afterwards).
+        The object only becomes visible under key once it is complete."""
+
+    @abstractmethod
+    def open(self, key):
+        """Readable binary stream of the whole object (use as a context manager)."""
+
+    @abstractmethod
+    def open_range(self, key, start, end):
+        """Readable binary stream of bytes start..end (inclusive) of the object."""
+
+    @abstractmethod
+    def stat(self, key):
+        """Size of the object in bytes, or None if it does not exist."""
+
+    def exists(self, key):
+        return self.stat(key) is not None
+
+    @abstractmethod
+    def delete(self, key):
+        """Removes the object. Deleting a missing object is not an error."""
+
+    @abstractmethod
+    def delete_prefix(self, prefix):
+        """Removes every object under prefix (a '/'-terminated "directory"). Nothing there is not an error."""
+
+    def redirect_url(self, key, expires, content_type=None, content_disposition=None, content_encoding=None):
+        """A time-limited URL the client can fetch the object from directly, or None if not supported."""
+        return None
+
+    def local_path(self, key):
+        """Path of the object on this host's filesystem, or None for remote stores."""
+        return None
+
+
+class LocalStorage(StorageBackend):
+    """Files under one directory on the local filesystem."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def local_path(self, key):
+        return os.path.join(self.root, key)
+
+    def put_file(self, key, src_path):
+        dest_path = self.local_path(key)
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        # Durable before it becomes visible; the rename is atomic on the same filesystem
+        fd = os.open(src_path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.replace(src_path, dest_path)
+
+    def open(self, key):
+        return open(self.local_path(key), 'rb')
+
+    def open_range(self, key, start, end):
+        f = open(self.local_path(key), 'rb')
+        f.seek(start)
+        return RangeReader(f, end - start + 1)
+
+    def stat(self, key):
+        try:
+            return os.stat(self.local_path(key)).st_size
+        except FileNotFoundError:
+            return None
+
+    def exists(self, key):
+        return os.path.exists(self.local_path(key))
+
+    def delete(self, key):
+        try:
+            os.remove(self.local_path(key))
+        except FileNotFoundError:
+            pass
+
+    def delete_prefix(self, prefix):
+        shutil.rmtree(self.local_path(prefix.rstrip('/')), ignore_errors=True)
+
+
+class S3Storage(StorageBackend):
+    """
+    Objects in an S3-compatible bucket. endpoint_url points it at MinIO or another
+    S3-compatible server; credentials come from the usual boto3 sources
+    (AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY, ~/.aws, instance role).
+    """
+
+    def __init__(self, bucket, prefix='', endpoint_url=None, region=None):
+        if boto3 is None:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires the boto3 package.")
+        self.bucket = bucket
+        self.prefix = prefix.strip('/') + '/' if prefix.strip('/') else ''
+        self.client = boto3.client('s3', endpoint_url=endpoint_url or None, region_name=region or None)
+        self.transfer_config = TransferConfig(
+            multipart_threshold=S3_MULTIPART_CHUNK_SIZE, multipart_chunksize=S3_MULTIPART_CHUNK_SIZE
+        )
+
+    def object_key(self, key):
+        return self.prefix + key.replace(os.sep, '/')
+
+    @staticmethod
+    def _is_not_found(error):
+        return error.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound')
+
+    def put_file(self, key, src_path):
+        # upload_file streams from disk (multipart above the threshold); S3 only shows
+        # the object once the upload is complete
+        self.client.upload_file(src_path, self.bucket, self.object_key(key), Config=self.transfer_config)
+        os.remove(src_path)
+
+    def _get(self, key, **kwargs):
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self.object_key(key), **kwargs)['Body']
+        except ClientError as e:
+            if self._is_not_found(e):
+                raise FileNotFoundError(f"Object {key} not found in bucket {self.bucket}.") from e
+            raise
+
+    def open(self, key):
+        return self._get(key)
+
+    def open_range(self, key, start, end):
+        return self._get(key, Range=f"bytes={start}-{end}")
+
+    def stat(self, key):
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self.object_key(key))['ContentLength']
+        except ClientError as e:
+            if self._is_not_found(e):
+                return None
+            raise
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self.object_key(key))
+
+    def delete_prefix(self, prefix):
+        # list_objects_v2 pages hold up to 1000 keys, the most one delete_objects call takes
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.object_key(prefix)):
+            objects = [{'Key': item['Key']} for item in page.get('Contents', [])]
+            if objects:
+                self.client.delete_objects(Bucket=self.bucket, Delete={'Objects': objects, 'Quiet': True})
+
+    def redirect_url(self, key, expires, content_type=None, content_disposition=None, content_encoding=None):
+        params = {'Bucket': self.bucket, 'Key': self.object_key(key)}
+        # Response header overrides, signed into the URL
+        if content_type:
+            params['ResponseContentType'] = content_type
+        if content_disposition:
+            params['ResponseContentDisposition'] = content_disposition
+        if content_encoding:
+            params['ResponseContentEncoding'] = content_encoding
+        return self.client.generate_presigned_url('get_object', Params=params, ExpiresIn=expires)
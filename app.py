@@ -1,22 +1,53 @@
 # FILENAME: app.py | LAST EDITED: 2025-10-27 (DictCursor fix)
 # FILENAME: app.py | LAST EDITED: 2025-11-17 ( added error logging )
-from flask import Flask, g, jsonify, request, send_file, send_from_directory # Added send_from_directory
+from flask import Flask, Request, g, jsonify, redirect, request, send_file, send_from_directory, has_request_context # Added send_from_directory
 import psycopg2
 import psycopg2.extras # Needed for dictionary cursor
+from psycopg2 import pool as pg_pool # Per-worker connection pool
 from psycopg2 import sql # <-- CRITICAL: This line is necessary for sql.SQL()
 import os
 import uuid
+import hashlib
+import tempfile
+import shutil # Joins the chunk objects of an s3 resumable upload
+import time # Compression throughput logging
+import zipfile # Streamed document archives (API 31)
 from datetime import datetime
 from werkzeug.utils import secure_filename
 from werkzeug.exceptions import BadRequest # <-- IMPORTANT NEW IMPORT
+from werkzeug.exceptions import RequestEntityTooLarge # Raised by the streaming upload size limit
+from werkzeug.exceptions import RequestedRangeNotSatisfiable # Bad Range on a streamed remote document
+from werkzeug.http import dump_options_header # Content-Disposition for presigned download URLs
+from werkzeug.test import EnvironBuilder # Builds WSGI environs for /api/batch sub-requests
 import io # Used in download_document logic (not strictly needed if using send_file)
 import mimetypes # <--- endpoint 9: Required for guess_extension (fixes NameError)
+from urllib.parse import quote as url_quote # X-Accel-Redirect URIs
+import unicodedata
+import html # Escapes search snippets
 from functools import wraps
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import logging
 import traceback # <--- CRITICAL FIX 2: Ensure traceback is imported
 import sys # <-- NEW: Import sys for robust error logging
 from datetime import date
 from magic import Magic
+import zlib
+import json # Live event payloads (API 36.0)
+import queue
+import select
+from storage import LocalStorage, S3Storage, RemoteObjectBody # Document storage backends (STORAGE_BACKEND)
+
+# Optional encoders for response compression. gzip (stdlib) is always available;
+# brotli and zstd are only offered to clients when the packages are installed.
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 
 app = Flask(__name__)
@@ -28,6 +59,11 @@ DB_CONFIG = {
     'password': 'linkedin',  # CHANGE THIS TO JOBERT'S PASSWORD
     'host': 'localhost'
 }
+# --- Connection Pool Configuration ---
+# Each gunicorn worker process keeps up to DB_POOL_MIN idle connections and never
+# opens more than DB_POOL_MAX at once (the batch endpoint borrows several in parallel).
+DB_POOL_MIN = int(os.environ.get('DB_POOL_MIN', 2))
+DB_POOL_MAX = int(os.environ.get('DB_POOL_MAX', 10))
 # --- File Upload Configuration (NEW) ---
 UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', '/home/jobert/webapp/contact_app/filestore') 
 ALLOWED_MIME_TYPES = {
@@ -47,11 +83,142 @@ DOCUMENT_TYPE_MAP = {
     'other': 'OTHER'
 }
 
+# Per-file upload limit, enforced while the body streams to disk (nginx caps the whole request at 50M)
+MAX_UPLOAD_SIZE = int(os.environ.get('MAX_UPLOAD_SIZE', 25 * 1024 * 1024))
+# Only the first bytes of an upload are kept in memory for libmagic to sniff the MIME type
+MIME_SNIFF_BYTES = 64 * 1024
+# Resumable (chunked) uploads, API 29.x: chunks are written into UPLOAD_FOLDER/.partial/<upload_id>
+# (local backend) or stored as objects under .partial/<upload_id>/ (s3, see below)
+UPLOAD_CHUNK_SIZE = int(os.environ.get('UPLOAD_CHUNK_SIZE', 5 * 1024 * 1024))  # default offered to clients
+UPLOAD_CHUNK_SIZE_MAX = 16 * 1024 * 1024  # largest chunk size a client may choose
+UPLOAD_SESSION_TTL_HOURS = int(os.environ.get('UPLOAD_SESSION_TTL_HOURS', 24))  # untouched sessions are purged after this
+PARTIAL_UPLOAD_FOLDER = os.path.join(UPLOAD_FOLDER, '.partial')
+# Text extraction / full-text search (worker.py, API 30.0)
+EXTRACTION_NOTIFY_CHANNEL = 'document_extraction'  # NOTIFY'd when new job_documents rows are committed
+SEARCH_TEXT_CONFIG = 'english'  # PostgreSQL text search configuration for search_vector and queries
+SEARCH_MAX_RESULTS = 50
+# Deferred file deletion (API 20.0 / 25.0): files are unlinked by worker.py after the DELETE commits
+FILE_DELETION_NOTIFY_CHANNEL = 'file_deletion'
+BACKUP_LOCK_KEY = 'jobassist-backup'  # advisory lock held by `maintenance.py backup`: deletions wait while it copies files
+# Storage quotas (migration 009), checked on upload against counters kept by triggers.
+# Per-user overrides live in user_storage_usage.quota_bytes / file_quota. 0 = unlimited.
+USER_STORAGE_QUOTA_BYTES = int(os.environ.get('USER_STORAGE_QUOTA_BYTES', 1024 * 1024 * 1024))
+USER_FILE_QUOTA = int(os.environ.get('USER_FILE_QUOTA', 0))
+# Background job queue (migration 010): run by `worker.py --jobs`, status in API 34.x
+BACKGROUND_JOB_NOTIFY_CHANNEL = 'background_job'  # NOTIFY'd when a job is enqueued or a running job ends
+JOB_MAX_ATTEMPTS = 5  # default per job; failed attempts are retried with exponential backoff
+# Job types a user may start with POST /api/jobs, and their max_attempts. The filestore- and
+# database-wide runs (recount_usage takes table locks, scrub/reconcile read every file) are not
+# offered here: there are no admin accounts, so they stay with `maintenance.py` and its timers.
+API_JOB_TYPES = {
+    'regenerate_unmapped': JOB_MAX_ATTEMPTS,
+    'reextract_documents': JOB_MAX_ATTEMPTS,
+}
+JOB_PRIORITY_MIN, JOB_PRIORITY_MAX = -100, 100  # higher runs first
+JOB_LIST_LIMIT = 50
+# Application change feed (migration 012, API 35.0). Changes are kept this long; a client
+# whose cursor is older gets a full resync.
+CHANGE_FEED_RETENTION_DAYS = int(os.environ.get('CHANGE_FEED_RETENTION_DAYS', 30))
+# Live dashboard events (migration 013, API 36.0). The stream is served by the gevent
+# instance (contact_db_events.service); the sync gunicorn workers set LIVE_EVENTS_ENABLED=0
+# so a stream can never pin one of them.
+LIVE_EVENTS_ENABLED = os.environ.get('LIVE_EVENTS_ENABLED', '1') == '1'
+DASHBOARD_EVENT_CHANNEL = 'dashboard_event'  # NOTIFY'd by the triggers of migration 013
+LIVE_EVENT_KEEPALIVE_SECONDS = 25  # comment line on idle streams (below nginx's proxy_read_timeout)
+LIVE_EVENT_RETRY_MS = 5000         # EventSource reconnect delay
+LIVE_EVENT_QUEUE_SIZE = 100        # events buffered per stream before it is told to resync
+
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['ALLOWED_MIME_TYPES'] = ALLOWED_MIME_TYPES
+app.config['MAX_UPLOAD_SIZE'] = MAX_UPLOAD_SIZE
+
+# Storage layout for new uploads:
+#   'cas'  -> content-addressed, deduplicated blobs under UPLOAD_FOLDER/blobs/ (default)
+#   'flat' -> one uuid4-named file per upload under UPLOAD_FOLDER/files/ab/cd/<uuid>
+# Both layouts shard by the first two hex-digit pairs of the name, so no directory ever holds
+# more than a few thousand entries. Uploads from before sharding sit directly in UPLOAD_FOLDER
+# (file_path = document_id) until `maintenance.py shard-filestore` moves them.
+# Existing rows keep working in either mode; job_documents.file_path says where each file lives.
+DOCUMENT_STORAGE_MODE = os.environ.get('DOCUMENT_STORAGE_MODE', 'cas')
+app.config['DOCUMENT_STORAGE_MODE'] = DOCUMENT_STORAGE_MODE
+
+# --- Document Compression at Rest ---
+#   'off'  -> new files are stored exactly as uploaded (default)
+#   'zstd' -> new files are zstd-compressed on disk when that saves at least
+#             DOCUMENT_COMPRESSION_MIN_SAVING (text and most PDFs; DOCX is already a zip)
+# job_documents.storage_encoding records how each file is stored, so the setting can be
+# changed at any time. Downloads pass the compressed bytes straight through to clients
+# that accept zstd (Content-Encoding) and decompress on the fly for the rest.
+# `python maintenance.py bench-codec` measures ratio and throughput on real documents.
+DOCUMENT_COMPRESSION = os.environ.get('DOCUMENT_COMPRESSION', 'off')
+DOCUMENT_COMPRESSION_LEVEL = int(os.environ.get('DOCUMENT_COMPRESSION_LEVEL', 3))  # 1-22
+DOCUMENT_COMPRESSION_MIN_SAVING = 0.10  # keep the compressed copy only if it is at least 10% smaller
+DOCUMENT_COMPRESSION_SKIP_MIME_TYPES = {
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'application/zip',
+}
+DOCUMENT_READ_CHUNK_SIZE = 256 * 1024
+if DOCUMENT_COMPRESSION == 'zstd' and zstandard is None:
+    print("WARNING: DOCUMENT_COMPRESSION=zstd but the zstandard package is not installed; storing uploads uncompressed.")
+    DOCUMENT_COMPRESSION = 'off'
+app.config['DOCUMENT_COMPRESSION'] = DOCUMENT_COMPRESSION
+
+# --- Document Storage Backend (storage.py) ---
+#   'local' -> document files live under UPLOAD_FOLDER on this host (default)
+#   's3'    -> document files live in S3_BUCKET on an S3-compatible object store
+#              (AWS S3, or MinIO etc. via S3_ENDPOINT_URL); credentials come from the
+#              standard AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY environment variables
+# job_documents.file_path is the key in either backend. UPLOAD_FOLDER is still needed
+# with 's3': uploads stream to temp files there before they are put into the store.
+# Resumable uploads keep each chunk as its own object under .partial/<upload_id>/ in the
+# bucket, so the chunks of one session may reach any API node, and so may its finalize.
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'local')
+S3_BUCKET = os.environ.get('S3_BUCKET', 'jobassist-documents')
+S3_PREFIX = os.environ.get('S3_PREFIX', '')  # key prefix inside the bucket, e.g. 'prod/'
+S3_ENDPOINT_URL = os.environ.get('S3_ENDPOINT_URL')  # e.g. http://127.0.0.1:9000 for MinIO; unset for AWS
+S3_REGION = os.environ.get('S3_REGION')
+S3_PRESIGN_EXPIRES = int(os.environ.get('S3_PRESIGN_EXPIRES', 300))  # seconds a download redirect stays valid
+app.config['STORAGE_BACKEND'] = STORAGE_BACKEND
+
+# --- Document Download Configuration ---
+#   'x-accel'  -> the app only checks ownership and answers with an X-Accel-Redirect header;
+#                 nginx then sends the file itself (sendfile) from its internal /documents/ location,
+#                 so a gunicorn worker is not tied up for the whole transfer (local backend only)
+#   'redirect' -> the app answers with a 302 to a short-lived presigned URL and the client
+#                 downloads straight from the object store (s3 backend only)
+#   'direct'   -> the app streams the file (deployments without nginx, e.g. the Flask dev server)
+# The nginx /documents/ alias must point at UPLOAD_FOLDER.
+DOCUMENT_SERVE_MODE = os.environ.get('DOCUMENT_SERVE_MODE', 'direct')
+DOCUMENT_ACCEL_PREFIX = os.environ.get('DOCUMENT_ACCEL_PREFIX', '/documents/')
+if (DOCUMENT_SERVE_MODE == 'x-accel' and STORAGE_BACKEND != 'local') or \
+        (DOCUMENT_SERVE_MODE == 'redirect' and STORAGE_BACKEND == 'local'):
+    print(f"WARNING: DOCUMENT_SERVE_MODE={DOCUMENT_SERVE_MODE} does not work with STORAGE_BACKEND={STORAGE_BACKEND}; "
+          "streaming documents through the app.")
+    DOCUMENT_SERVE_MODE = 'direct'
+app.config['DOCUMENT_SERVE_MODE'] = DOCUMENT_SERVE_MODE
+app.config['DOCUMENT_ACCEL_PREFIX'] = DOCUMENT_ACCEL_PREFIX
 
 # Ensure the upload directory exists
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+os.makedirs(PARTIAL_UPLOAD_FOLDER, exist_ok=True)
+
+# --- Response Compression Configuration ---
+# The list endpoints (/api/contacts/all, /api/documents/all, /api/applications/all,
+# /api/companies) return multi-megabyte JSON bodies. They are compressed here, in the
+# app, because nginx only proxies /api/ and does not gzip it.
+# Levels trade CPU for bandwidth: lower = faster, higher = smaller.
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))  # bytes; smaller bodies are sent as-is
+COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', 6))  # 1-9
+COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 4))  # 0-11
+COMPRESSION_ZSTD_LEVEL = int(os.environ.get('COMPRESSION_ZSTD_LEVEL', 3))  # 1-22
+COMPRESSIBLE_MIME_TYPES = {
+    'application/json',
+    'text/plain',
+    'text/html',
+    'text/csv',
+}
+
+app.config['COMPRESSION_MIN_SIZE'] = COMPRESSION_MIN_SIZE
 
 ## HELPERS
 #
@@ -131,15 +298,70 @@ def _insert_document_metadata(conn, user_id, application_id, secure_filename, or
         conn.rollback()
         raise
 
+class PooledConnection(psycopg2.extensions.connection):
+    """
+    Connection handed out by the per-worker pool. close() resets the session and
+    returns it to the pool instead of tearing it down, so the existing
+    'finally: conn.close()' blocks in every endpoint keep working unchanged.
+    """
+    _owner_pool = None
+    _lease = None
+
+    def close(self):
+        owner = self._owner_pool
+        if owner is None or self.closed:
+            return super().close()
+        self._owner_pool = None
+        self._lease = None
+        try:
+            # Roll back anything left open and undo autocommit/readonly/isolation changes
+            self.reset()
+            self.autocommit = False
+            self.set_session(isolation_level='DEFAULT', readonly='DEFAULT', deferrable='DEFAULT')
+        except psycopg2.Error:
+            super().close()  # Broken connection: the pool discards closed connections
+        owner.putconn(self)
+
+_db_pool = None
+_db_pool_pid = None
+_db_pool_lock = threading.Lock()
+
+def get_db_pool():
+    """Returns this process's connection pool, creating it on first use (after the gunicorn fork)."""
+    global _db_pool, _db_pool_pid
+    if _db_pool is None or _db_pool_pid != os.getpid():
+        with _db_pool_lock:
+            if _db_pool is None or _db_pool_pid != os.getpid():
+                _db_pool = pg_pool.ThreadedConnectionPool(
+                    DB_POOL_MIN, DB_POOL_MAX,
+                    connection_factory=PooledConnection,
+                    **DB_CONFIG
+                )
+                _db_pool_pid = os.getpid()
+    return _db_pool
+
 def get_db_connection():
-    """Returns a connection object."""
+    """Returns a connection object (borrowed from the pool; conn.close() gives it back)."""
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
+        db_pool = get_db_pool()
+        conn = db_pool.getconn()
+        conn._owner_pool = db_pool
+        conn._lease = object()
+        # Remember the lease so teardown can return connections an endpoint forgot to close
+        if has_request_context():
+            g.setdefault('_db_leases', []).append((conn, conn._lease))
         return conn
     except psycopg2.Error as e:
         print(f"Database connection failed: {e}")
         return None
 
+@app.teardown_request
+def release_db_connections(exc):
+    """Safety net: returns any connection still borrowed by this request to the pool."""
+    for conn, lease in g.pop('_db_leases', []):
+        if conn._lease is lease:
+            conn.close()
+
 def get_db_cursor(conn, cursor_factory=psycopg2.extras.DictCursor):
     """Returns a cursor object with the specified factory."""
     return conn.cursor(cursor_factory=cursor_factory)
@@ -373,6 +595,125 @@ def requires_auth(f):
     return decorated
 # --- END OF CORRECTED AUTHENTICATION BLOCK ---
 
+# ----------------------------------------------------------------------
+# RESPONSE COMPRESSION (after_request hook)
+# Negotiates zstd / br / gzip from Accept-Encoding. Buffered responses are
+# compressed in one shot once they pass COMPRESSION_MIN_SIZE; streamed
+# responses are compressed chunk by chunk and flushed so they stay incremental.
+# ----------------------------------------------------------------------
+
+def get_available_encodings():
+    """Returns the encodings this worker can produce, in server preference order."""
+    encodings = []
+    if zstandard is not None:
+        encodings.append('zstd')
+    if brotli is not None:
+        encodings.append('br')
+    encodings.append('gzip')
+    return encodings
+
+def choose_response_encoding():
+    """
+    Picks the best encoding the client accepts (highest q-value wins, ties go to
+    the server preference order). Returns None if nothing acceptable is available.
+    """
+    accepted = request.accept_encodings
+    if not accepted:
+        return None
+    encoding = accepted.best_match(get_available_encodings())
+    if encoding and accepted[encoding] > 0:
+        return encoding
+    return None
+
+def get_compressor(encoding):
+    """
+    Returns a (compress, flush, finish) triple for streaming compression.
+    compress(data) -> bytes, flush() -> bytes emitted so far, finish() -> trailing bytes.
+    """
+    if encoding == 'zstd':
+        cobj = zstandard.ZstdCompressor(level=COMPRESSION_ZSTD_LEVEL).compressobj()
+        return (
+            cobj.compress,
+            lambda: cobj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK),
+            cobj.flush,
+        )
+    if encoding == 'br':
+        cobj = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+        return (cobj.process, cobj.flush, cobj.finish)
+    # wbits=31 -> gzip container (header + CRC trailer)
+    cobj = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+    return (
+        cobj.compress,
+        lambda: cobj.flush(zlib.Z_SYNC_FLUSH),
+        cobj.flush,
+    )
+
+def compress_body(data, encoding):
+    """One-shot compression of a fully buffered body."""
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=COMPRESSION_ZSTD_LEVEL).compress(data)
+    if encoding == 'br':
+        return brotli.compress(data, quality=COMPRESSION_BROTLI_QUALITY)
+    cobj = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+    return cobj.compress(data) + cobj.flush()
+
+def compress_stream(chunks, encoding):
+    """Wraps a response iterable, compressing and flushing each chunk as it is produced."""
+    compress, flush, finish = get_compressor(encoding)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            if not chunk:
+                continue
+            out = compress(chunk) + flush()
+            if out:
+                yield out
+        tail = finish()
+        if tail:
+            yield tail
+    finally:
+        # Preserve the WSGI close() contract of the wrapped iterable
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+@app.after_request
+def compress_response(response):
+    """Compresses JSON/text API responses when the client accepts it."""
+    # Only touch successful, not-yet-encoded, compressible bodies
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return response
+    if response.direct_passthrough or 'Content-Encoding' in response.headers:
+        return response
+    # Document downloads (12.0, 31.x) are never re-encoded here: their strong ETag
+    # (content_hash) and Content-Length describe exactly the bytes the endpoint chose
+    # to send, e.g. a zstd-at-rest text/csv decompressed for a client without zstd.
+    if response.headers.get('Content-Disposition', '').startswith('attachment'):
+        return response
+    if response.mimetype not in COMPRESSIBLE_MIME_TYPES:
+        return response
+
+    response.vary.add('Accept-Encoding')
+
+    encoding = choose_response_encoding()
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        # Streaming-compatible mode: length is unknown up front
+        response.response = compress_stream(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    body = response.get_data()
+    if len(body) < COMPRESSION_MIN_SIZE:
+        return response
+
+    response.set_data(compress_body(body, encoding))  # also resets Content-Length
+    response.headers['Content-Encoding'] = encoding
+    return response
+
 @app.route('/api/db_test', methods=['GET'])
 def db_test():
     """Checks database connection health."""
@@ -397,6 +738,545 @@ def db_test():
         traceback.print_exc()
         if conn: conn.close()
         return jsonify({"status": "error", "message": f"DB Connection Failed. Check server logs."}), 500
+# ----------------------------------------------------------------------
+# STREAMING UPLOADS
+# Werkzeug asks the request for a writable stream for every file part of a
+# multipart body. We hand it a HashingUploadStream, so while the body is being
+# parsed each chunk is written once to a temp file inside UPLOAD_FOLDER (same
+# filesystem as the local store, so the final os.replace() is atomic; the s3
+# backend uploads it from there), hashed with SHA-256, counted
+# against MAX_UPLOAD_SIZE, and the first MIME_SNIFF_BYTES are kept for libmagic.
+# Memory use is constant regardless of file size and the file is never re-read.
+# ----------------------------------------------------------------------
+
+class HashingUploadStream:
+    """Write-through temp file that hashes, counts and keeps the head of an upload."""
+
+    def __init__(self, directory, max_size):
+        self._file = tempfile.NamedTemporaryFile(dir=directory, prefix='.upload-', delete=False)
+        self.temp_path = self._file.name
+        self.max_size = max_size
+        self.size = 0
+        self.head = bytearray()
+        self._sha256 = hashlib.sha256()
+        self.committed = False
+
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.max_size:
+            raise RequestEntityTooLarge(f"File exceeds the maximum upload size of {self.max_size} bytes.")
+        self._sha256.update(data)
+        if len(self.head) < MIME_SNIFF_BYTES:
+            self.head += data[:MIME_SNIFF_BYTES - len(self.head)]
+        return self._file.write(data)
+
+    def __getattr__(self, name):
+        # seek/read/close etc. go to the underlying temp file (FileStorage expects a file object)
+        return getattr(self._file, name)
+
+    @property
+    def content_hash(self):
+        return self._sha256.hexdigest()
+
+    def sniff_mime_type(self):
+        return get_mime_detector().from_buffer(bytes(self.head))
+
+    def commit(self, key, mime_type=None):
+        """Puts the finished temp file into the document store under key (see store_local_file)."""
+        self._file.flush()
+        self._file.close()
+        storage_encoding = store_local_file(key, self.temp_path, mime_type)
+        self.committed = True
+        return storage_encoding
+
+    def discard(self):
+        """Removes the temp file unless it was committed. Safe to call more than once."""
+        if not self._file.closed:
+            self._file.close()
+        if not self.committed and os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+
+class UploadRequest(Request):
+    """Request class that streams multipart file parts through HashingUploadStream."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        stream = HashingUploadStream(app.config['UPLOAD_FOLDER'], app.config['MAX_UPLOAD_SIZE'])
+        self.__dict__.setdefault('_upload_streams', []).append(stream)
+        return stream
+
+app.request_class = UploadRequest
+
+# libmagic loads its whole database when a Magic object is created, so each
+# thread keeps one (Magic objects are not safe to share between threads).
+_mime_detector_local = threading.local()
+
+def get_mime_detector():
+    detector = getattr(_mime_detector_local, 'detector', None)
+    if detector is None:
+        detector = Magic(mime=True)
+        _mime_detector_local.detector = detector
+    return detector
+
+def ingest_upload(file_storage):
+    """
+    Returns the HashingUploadStream behind a FileStorage. Uploads parsed by
+    UploadRequest already have one; anything else is copied through a new one.
+    """
+    stream = file_storage.stream
+    if isinstance(stream, HashingUploadStream):
+        return stream
+    upload = HashingUploadStream(app.config['UPLOAD_FOLDER'], app.config['MAX_UPLOAD_SIZE'])
+    if has_request_context():
+        request.__dict__.setdefault('_upload_streams', []).append(upload)
+    while True:
+        chunk = stream.read(MIME_SNIFF_BYTES)
+        if not chunk:
+            break
+        upload.write(chunk)
+    return upload
+
+@app.teardown_request
+def discard_upload_temp_files(exc):
+    """Deletes temp files of uploads that were rejected or never committed."""
+    for upload in request.__dict__.pop('_upload_streams', []):
+        try:
+            upload.discard()
+        except OSError as e:
+            print(f"WARNING: Could not remove upload temp file {upload.temp_path}: {e}")
+
+# ----------------------------------------------------------------------
+# CONTENT-ADDRESSED DOCUMENT STORE
+# Blobs are stored once per SHA-256 at blobs/ab/cd/<hash> and reference-counted
+# in document_blobs (one reference per job_documents row).
+# Every change to a blob's row or file happens under a transaction-scoped
+# advisory lock on the hash, so an upload can never race the deletion of the
+# last reference to the same content.
+# Files are read, written and deleted through get_storage() (storage.py), never
+# with direct filesystem calls, so the same code runs on local disk and on S3.
+# ----------------------------------------------------------------------
+
+def blob_relative_path(content_hash):
+    """file_path (storage key) of the blob for a SHA-256 hex digest."""
+    return os.path.join('blobs', content_hash[:2], content_hash[2:4], content_hash)
+
+def flat_relative_path(document_id):
+    """file_path (storage key) of a private, non-deduplicated upload."""
+    document_id = str(document_id)
+    return os.path.join('files', document_id[:2], document_id[2:4], document_id)
+
+_storage = None
+_storage_pid = None
+
+def get_storage():
+    """
+    The document store for this process (STORAGE_BACKEND). Created lazily and again
+    after a fork, since boto3 clients must not be shared between gunicorn workers.
+    """
+    global _storage, _storage_pid
+    if _storage is None or _storage_pid != os.getpid():
+        if app.config['STORAGE_BACKEND'] == 's3':
+            _storage = S3Storage(S3_BUCKET, S3_PREFIX, S3_ENDPOINT_URL, S3_REGION)
+        else:
+            _storage = LocalStorage(app.config['UPLOAD_FOLDER'])
+        _storage_pid = os.getpid()
+    return _storage
+
+def document_disk_path(file_path):
+    """Absolute path on disk for a job_documents.file_path value (local backend)."""
+    return os.path.join(app.config['UPLOAD_FOLDER'], file_path)
+
+def resolve_stored_path(file_path):
+    """
+    Where a job_documents.file_path value currently lives in the store.
+    Every read or delete of a document file goes through here: a legacy top-level
+    file (file_path = document_id) may have been moved into the sharded layout by
+    `maintenance.py shard-filestore` after this request read its row. Legacy files
+    only exist on local disk, so remote stores are used as is.
+    """
+    storage = get_storage()
+    if storage.local_path(file_path) is None or storage.exists(file_path):
+        return file_path
+    if os.sep not in file_path:
+        sharded_path = flat_relative_path(file_path)
+        if storage.exists(sharded_path):
+            return sharded_path
+    return file_path
+
+def resolve_disk_path(file_path):
+    """Absolute counterpart of resolve_stored_path() (local backend)."""
+    return document_disk_path(resolve_stored_path(file_path))
+
+def compress_local_file(full_path, mime_type):
+    """
+    Writes a zstd-compressed copy of a finished upload next to it (DOCUMENT_COMPRESSION)
+    if that saves enough space. Returns the path of the copy, or None to store the
+    file as is. The original is left untouched either way.
+    """
+    if app.config['DOCUMENT_COMPRESSION'] != 'zstd' or mime_type in DOCUMENT_COMPRESSION_SKIP_MIME_TYPES:
+        return None
+
+    tmp_path = f"{full_path}.zst-tmp"
+    started = time.monotonic()
+    try:
+        with open(full_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+            compressor = zstandard.ZstdCompressor(level=DOCUMENT_COMPRESSION_LEVEL)
+            original_size, compressed_size = compressor.copy_stream(
+                src, dst, size=os.fstat(src.fileno()).st_size, write_size=DOCUMENT_READ_CHUNK_SIZE
+            )
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    elapsed = max(time.monotonic() - started, 1e-6)
+
+    if compressed_size > original_size * (1 - DOCUMENT_COMPRESSION_MIN_SAVING):
+        os.remove(tmp_path)
+        print(f"DEBUG: Storing {full_path} uncompressed (zstd only reached {compressed_size}/{original_size} bytes).")
+        return None
+    print(f"DEBUG: Storing {full_path} zstd-compressed: {original_size} -> {compressed_size} bytes "
+          f"at {original_size / elapsed / 1048576:.1f} MiB/s")
+    return tmp_path
+
+def store_local_file(key, src_path, mime_type=None):
+    """
+    Puts a finished local file (upload temp file, assembled resumable upload) into the
+    document store under key, compressed per DOCUMENT_COMPRESSION. src_path is consumed
+    on success and left in place on failure. Returns the storage_encoding ('zstd' or None).
+    """
+    compressed_path = compress_local_file(src_path, mime_type)
+    try:
+        if compressed_path:
+            get_storage().put_file(key, compressed_path)
+            os.remove(src_path)
+            return 'zstd'
+        get_storage().put_file(key, src_path)
+        return None
+    finally:
+        if compressed_path and os.path.exists(compressed_path):
+            os.remove(compressed_path)
+
+def delete_stored_file(file_path):
+    """
+    Removes a file queued in file_deletions. A resumable-upload partial is one file in
+    UPLOAD_FOLDER/.partial/ with the local backend, and a "directory" of chunk objects in
+    the store otherwise (see partial_chunk_key). A file that is already gone is not an error.
+    """
+    if file_path.split(os.sep, 1)[0] == os.path.basename(PARTIAL_UPLOAD_FOLDER):
+        if app.config['STORAGE_BACKEND'] != 'local':
+            get_storage().delete_prefix(file_path + '/')
+            return
+        try:
+            os.remove(os.path.join(app.config['UPLOAD_FOLDER'], file_path))
+        except FileNotFoundError:
+            pass
+        return
+    get_storage().delete(resolve_stored_path(file_path))
+
+def open_document_file(file_path, storage_encoding):
+    """Opens a stored document for reading. Always yields the original bytes, whatever the storage_encoding."""
+    source = get_storage().open(resolve_stored_path(file_path))
+    if storage_encoding == 'zstd':
+        if zstandard is None:
+            source.close()
+            raise RuntimeError("Document is stored zstd-compressed but the zstandard package is not installed.")
+        return zstandard.ZstdDecompressor().stream_reader(source, read_size=DOCUMENT_READ_CHUNK_SIZE)
+    return source
+
+def iter_stream(source):
+    """Response body generator over an open stream; closes it when done (or when the client goes away)."""
+    with source:
+        while True:
+            chunk = source.read(DOCUMENT_READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+def iter_document_file(file_path, storage_encoding):
+    """Response body generator: the original bytes of a stored document, decompressed on the fly."""
+    return iter_stream(open_document_file(file_path, storage_encoding))
+
+def client_accepts_encoding(encoding):
+    """True if the request's Accept-Encoding allows the given content coding."""
+    return request.accept_encodings[encoding] > 0
+
+def is_blob_path(file_path, content_hash):
+    """True if a job_documents row points at a shared blob rather than a private flat file."""
+    return bool(content_hash) and file_path == blob_relative_path(content_hash)
+
+def lock_blob(cur, content_hash):
+    cur.execute("SELECT pg_advisory_xact_lock(hashtextextended(%s, 0));", (content_hash,))
+
+def try_lock_blob(cur, content_hash):
+    """Non-blocking lock_blob(); returns False if another transaction holds the lock."""
+    cur.execute("SELECT pg_try_advisory_xact_lock(hashtextextended(%s, 0));", (content_hash,))
+    return cur.fetchone()[0]
+
+def acquire_blob(cur, content_hash, file_size, write_blob):
+    """
+    Takes one reference on the blob for content_hash inside the caller's transaction.
+    write_blob(file_path) is only called if the content is not stored yet, so
+    re-uploads of existing content skip the write entirely. It puts the content into
+    the store under file_path and returns the storage_encoding of what it wrote.
+    Returns (file_path, is_new_blob, storage_encoding).
+    """
+    lock_blob(cur, content_hash)
+    cur.execute("""
+        INSERT INTO document_blobs (content_hash, file_size, ref_count)
+        VALUES (%s, %s, 1)
+        ON CONFLICT (content_hash) DO UPDATE SET ref_count = document_blobs.ref_count + 1
+        RETURNING (xmax = 0) AS is_new_blob, storage_encoding;
+    """, (content_hash, file_size))
+    is_new_blob, storage_encoding = cur.fetchone()
+
+    file_path = blob_relative_path(content_hash)
+    # Also rewrite if the row existed but the file went missing (self-healing)
+    if is_new_blob or not get_storage().exists(file_path):
+        written_encoding = write_blob(file_path)
+        if not is_new_blob:
+            # Repaired: an earlier scrub result ('missing') no longer applies
+            cur.execute("UPDATE job_documents SET integrity_status = NULL WHERE file_path = %s AND integrity_status IS NOT NULL;",
+                        (file_path,))
+        if written_encoding != storage_encoding:
+            # Keep the blob row and every document already sharing it in step with the new file
+            cur.execute("UPDATE document_blobs SET storage_encoding = %s WHERE content_hash = %s;",
+                        (written_encoding, content_hash))
+            cur.execute("UPDATE job_documents SET storage_encoding = %s WHERE content_hash = %s AND file_path = %s;",
+                        (written_encoding, content_hash, file_path))
+            storage_encoding = written_encoding
+    return file_path, is_new_blob, storage_encoding
+
+def release_blob(cur, content_hash):
+    """
+    Drops one reference inside the caller's transaction. When it was the last one
+    the row is deleted and the file queued for deletion (see queue_file_deletions);
+    worker.py re-checks under the blob lock that no upload re-created the blob
+    before it unlinks the file.
+    Returns True if the blob file was queued for deletion.
+    """
+    lock_blob(cur, content_hash)
+    cur.execute("""
+        UPDATE document_blobs SET ref_count = ref_count - 1
+        WHERE content_hash = %s
+        RETURNING ref_count;
+    """, (content_hash,))
+    row = cur.fetchone()
+    if row is None or row[0] > 0:
+        return False
+
+    cur.execute("DELETE FROM document_blobs WHERE content_hash = %s;", (content_hash,))
+    queue_file_deletions(cur, [(blob_relative_path(content_hash), content_hash)])
+    return True
+
+def queue_file_deletions(cur, entries):
+    """
+    Records files to remove in the file_deletions outbox, inside the caller's transaction:
+    they are deleted (by worker.py) if and only if the transaction commits, so a crash
+    can neither lose a file that is still referenced nor leave one behind.
+    entries: (file_path, content_hash) tuples; content_hash only for shared blobs.
+    Returns the number of files queued.
+    """
+    if not entries:
+        return 0
+    psycopg2.extras.execute_values(
+        cur,
+        "INSERT INTO file_deletions (file_path, content_hash) VALUES %s",
+        entries
+    )
+    # Wake the worker; delivered only if the transaction commits
+    cur.execute(f"NOTIFY {FILE_DELETION_NOTIFY_CHANNEL};")
+    return len(entries)
+
+def place_document_file(cur, document_id, file_size, content_hash, write_file):
+    """
+    Puts a finished upload in place (shared blob or flat file, per DOCUMENT_STORAGE_MODE)
+    inside the caller's transaction. write_file(file_path) puts the upload into the store
+    under file_path and returns its storage_encoding (see store_local_file).
+    Returns (file_path, flat_path, storage_encoding); flat_path is None for shared
+    blobs, otherwise it is the private file to delete if the transaction fails.
+    """
+    if app.config['DOCUMENT_STORAGE_MODE'] == 'cas':
+        # Content-addressed: take a reference on the blob in this transaction. The
+        # temp file is only stored if this content is not stored yet.
+        # A blob written here is never removed on error; an unreferenced blob is
+        # harmless and is simply reused by the next upload of the same content.
+        file_path, is_new_blob, storage_encoding = acquire_blob(cur, content_hash, file_size, write_file)
+        print(f"DEBUG: Blob {file_path} ({'new' if is_new_blob else 'deduplicated'}, {file_size} bytes)")
+        return file_path, None, storage_encoding
+
+    # Flat: use the document UUID as the unique filename in the store, in its shard directory
+    file_path = flat_relative_path(document_id)
+    storage_encoding = write_file(file_path)
+    print(f"DEBUG: File stored: {file_path} ({file_size} bytes, sha256 {content_hash})")
+    return file_path, file_path, storage_encoding
+
+def insert_document_rows(cur, rows):
+    """
+    Inserts job_documents rows with ONE multi-row INSERT in the caller's transaction.
+    rows: tuples of (document_id, application_id, document_type, original_filename,
+    file_path, mime_type, file_size, content_hash, storage_encoding).
+    """
+    # SQL Query based STRICTLY on the provided schema:
+    # file_path is relative to UPLOAD_FOLDER (blobs/ab/cd/<hash>, or files/ab/cd/<uuid> in flat mode);
+    # file_size / content_hash are counted and hashed while streaming (migration 002).
+    psycopg2.extras.execute_values(
+        cur,
+        """
+        INSERT INTO job_documents (
+            document_id, application_id, document_type, original_filename,
+            file_path, mime_type, file_size, content_hash, storage_encoding, upload_timestamp
+        ) VALUES %s
+        """,
+        rows,
+        template="(%s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())"
+    )
+    # Wake the text extraction worker (worker.py); delivered only if the transaction commits
+    cur.execute(f"NOTIFY {EXTRACTION_NOTIFY_CHANNEL};")
+
+def store_document(cur, document_id, application_id, document_type, original_filename,
+                   mime_type, file_size, content_hash, write_file):
+    """
+    Single-document shortcut: place_document_file() + insert_document_rows().
+    Returns the job_documents.file_path.
+    """
+    file_path, flat_path, storage_encoding = place_document_file(
+        cur, document_id, file_size, content_hash, write_file
+    )
+    try:
+        insert_document_rows(cur, [(document_id, application_id, document_type, original_filename,
+                                    file_path, mime_type, file_size, content_hash, storage_encoding)])
+    except Exception:
+        # Clean up the flat file if the insert fails (shared blobs are left, see above)
+        if flat_path:
+            get_storage().delete(flat_path)
+        raise
+    return file_path
+
+# ----------------------------------------------------------------------
+# STORAGE QUOTAS
+# user_storage_usage / application_storage_usage are kept current by triggers on
+# job_documents (migration 009), so a quota check is one primary-key lookup.
+# Lock order: a request that changes documents locks the user's usage row before
+# any blob lock (uploads here, deletes in 20.0 / via the DELETE trigger in 25.0).
+# ----------------------------------------------------------------------
+
+def fetch_storage_usage(cur, user_id, for_update=False):
+    """
+    The user's counters and effective limits (0 = unlimited) as a dict.
+    for_update=True locks the row until the transaction ends: concurrent uploads of
+    the same user are then checked one after another and cannot overshoot together.
+    """
+    if for_update:
+        # The row must exist to be locked (first upload of a new user)
+        cur.execute("INSERT INTO user_storage_usage (user_id) VALUES (%s) ON CONFLICT (user_id) DO NOTHING;", (user_id,))
+    cur.execute(f"""
+        SELECT file_count, total_bytes, quota_bytes, file_quota
+        FROM user_storage_usage
+        WHERE user_id = %s
+        {'FOR UPDATE' if for_update else ''};
+    """, (user_id,))
+    row = cur.fetchone()
+    file_count, total_bytes, quota_bytes, file_quota = row if row else (0, 0, None, None)
+    return {
+        "file_count": file_count,
+        "total_bytes": total_bytes,
+        "quota_bytes": USER_STORAGE_QUOTA_BYTES if quota_bytes is None else quota_bytes,
+        "file_quota": USER_FILE_QUOTA if file_quota is None else file_quota,
+    }
+
+def storage_quota_error(usage, file_size, file_count=1):
+    """Error message if adding the files would exceed the user's quota, otherwise None."""
+    if usage['quota_bytes'] and usage['total_bytes'] + file_size > usage['quota_bytes']:
+        return (f"Storage quota exceeded: {usage['total_bytes']} of {usage['quota_bytes']} bytes used, "
+                f"this upload needs {file_size} more.")
+    if usage['file_quota'] and usage['file_count'] + file_count > usage['file_quota']:
+        return f"Storage quota exceeded: {usage['file_count']} of {usage['file_quota']} documents stored."
+    return None
+
+# ----------------------------------------------------------------------
+# BACKGROUND JOBS
+# Work that is too slow for a request is queued in background_jobs (migration 010)
+# and run by `worker.py --jobs` on any node. enqueue_job() writes the row in the
+# caller's transaction, so the job exists if and only if the change that needs it
+# commits; the NOTIFY wakes the runners at the same moment.
+# Today the only producer is POST /api/jobs (34.1): no request handler writes contacts
+# or removes company_name_mapping rows (the only changes regenerate_unmapped follows up
+# on), and new documents reach the extraction queue through extraction_status instead.
+# ----------------------------------------------------------------------
+
+def enqueue_job(cur, job_type, payload=None, priority=0, max_attempts=JOB_MAX_ATTEMPTS,
+                delay_seconds=0, dedupe_key=None, user_id=None):
+    """
+    Queues a job inside the caller's transaction and returns (job_id, created).
+    With a dedupe_key, a job of the same type and key that is still queued or
+    running is returned instead of adding another one (created=False).
+    """
+    while True:
+        # ON CONFLICT waits for a concurrent insert of the same key to commit or roll back
+        cur.execute("""
+            INSERT INTO background_jobs (job_type, payload, priority, max_attempts, run_at, dedupe_key, user_id)
+            VALUES (%s, %s, %s, %s, NOW() + make_interval(secs => %s), %s, %s)
+            ON CONFLICT (job_type, dedupe_key)
+                WHERE dedupe_key IS NOT NULL AND status IN ('queued', 'running')
+            DO NOTHING
+            RETURNING job_id;
+        """, (job_type, psycopg2.extras.Json(payload or {}), priority, max_attempts,
+              delay_seconds, dedupe_key, user_id))
+        row = cur.fetchone()
+        if row:
+            # Wake the job runners; delivered only if the transaction commits
+            cur.execute(f"NOTIFY {BACKGROUND_JOB_NOTIFY_CHANNEL};")
+            return row[0], True
+
+        cur.execute("""
+            SELECT job_id FROM background_jobs
+            WHERE job_type = %s AND dedupe_key = %s AND status IN ('queued', 'running');
+        """, (job_type, dedupe_key))
+        row = cur.fetchone()
+        if row:
+            return row[0], False
+        # The conflicting job finished in between: try the insert again
+
+def accel_redirect_response(stored_path, download_name, mime_type):
+    """
+    Empty response telling nginx to serve UPLOAD_FOLDER/<stored_path> from its internal
+    /documents/ location. nginx keeps our Content-Type and Content-Disposition headers.
+    """
+    response = app.response_class(status=200, mimetype=mime_type or 'application/octet-stream')
+    response.headers['X-Accel-Redirect'] = app.config['DOCUMENT_ACCEL_PREFIX'] + url_quote(stored_path)
+    return set_attachment_disposition(response, download_name)
+
+def attachment_disposition(download_name):
+    """Same Content-Disposition format send_file() uses (RFC 6266 filename* for non-ASCII names)."""
+    try:
+        download_name.encode('ascii')
+        names = {'filename': download_name}
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize('NFKD', download_name).encode('ascii', 'ignore').decode('ascii')
+        names = {'filename': simple, 'filename*': "UTF-8''" + url_quote(download_name, safe="!#$&+^`|~")}
+    return dump_options_header('attachment', names)
+
+def set_attachment_disposition(response, download_name):
+    response.headers['Content-Disposition'] = attachment_disposition(download_name)
+    return response
+
+def set_document_validators(response, content_hash, upload_timestamp, content_encoding=None):
+    """
+    Caching headers for a private document: the browser may keep a copy but must
+    revalidate it (If-None-Match / If-Modified-Since) before every reuse.
+    content_encoding: the Content-Encoding the body is sent with, if any (each
+    encoded representation needs its own strong ETag).
+    """
+    if content_hash:
+        response.set_etag(f"{content_hash}-{content_encoding}" if content_encoding else content_hash)
+    if upload_timestamp:
+        response.last_modified = upload_timestamp
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.cache_control.public = False
+    response.cache_control.max_age = None
+    return response
+
 # --- API Endpoints ---
 
 @app.route('/')
@@ -404,6 +1284,363 @@ def index():
     # Simple endpoint for health check
     return "JobAssist Backend is running."
 
+# ----------------------------------------------------------------------
+# SHARED LIST QUERIES
+# Used by the individual list endpoints (1, 14, 22, 23) and by the composite
+# dashboard endpoint (26), which runs several of them on one cursor.
+#
+# The list endpoints accept sparse fieldsets:
+#   ?fields=a,b   -> which plain columns to return (id columns are always returned)
+#   ?include=x,y  -> which derived parts to compute (counts, nested documents, joins)
+# Leaving a parameter out means "everything" (the original response shape).
+# Unrequested parts are removed from the SQL itself, not just from the JSON.
+# ----------------------------------------------------------------------
+
+def parse_list_param(name, allowed):
+    """
+    Parses a comma-separated query parameter against a whitelist.
+    Returns None if the parameter is absent (caller falls back to everything),
+    otherwise a set of names (possibly empty). Raises BadRequest on unknown names.
+    """
+    raw = request.args.get(name)
+    if raw is None:
+        return None
+    values = {v.strip() for v in raw.split(',') if v.strip()}
+    unknown = values - set(allowed)
+    if unknown:
+        raise BadRequest(f"Unknown {name} value(s): {', '.join(sorted(unknown))}. Allowed: {', '.join(allowed)}.")
+    return values
+
+def fetch_sidebar_companies(cur):
+    """Minimal company list for the sidebar (id, clean name, target flag)."""
+    cur.execute("""
+        SELECT
+            company_id,
+            company_name_clean,
+            target_interest AS is_target
+        FROM
+            companies
+        ORDER BY
+            company_name_clean ASC;
+    """)
+    return [dict(row) for row in cur.fetchall()]
+
+# Plain columns selectable with ?fields= on /api/companies (company_id is always returned)
+COMPANY_LIST_FIELDS = {
+    'company_name_clean': 'c.company_name_clean',
+    'headquarters': 'c.headquarters',
+    'size_employees': 'c.size_employees',
+    'target_interest': 'c.target_interest',
+    'annual_revenue': 'c.annual_revenue',
+}
+# Derived counts selectable with ?include= on /api/companies
+COMPANY_LIST_INCLUDES = ('application_count', 'contact_count')
+
+def fetch_company_list(cur, user_id, fields=None, include=None):
+    """
+    Company list with the user's application count and the global contact count.
+    Counts are aggregated once per table (GROUP BY) instead of one correlated
+    subquery per company row, and each count's CTE is only emitted if included.
+    fields / include of None mean all columns / all counts.
+    """
+    fields = set(COMPANY_LIST_FIELDS) if fields is None else fields
+    include = set(COMPANY_LIST_INCLUDES) if include is None else include
+
+    ctes = []
+    joins = []
+    params = []
+    columns = ['c.company_id'] + [expr for name, expr in COMPANY_LIST_FIELDS.items() if name in fields]
+
+    if 'application_count' in include:
+        ctes.append("""
+        app_counts AS (
+            SELECT a.company_id, COUNT(*) AS application_count
+            FROM applications a
+            WHERE a.user_id = %s
+            GROUP BY a.company_id
+        )""")
+        params.append(user_id)
+        joins.append("LEFT JOIN app_counts ac ON ac.company_id = c.company_id")
+        columns.append("COALESCE(ac.application_count, 0) AS application_count")
+
+    if 'contact_count' in include:
+        # NOTE: The 'contacts' table currently lacks a 'user_id' column, so this count is global.
+        ctes.append("""
+        contact_counts AS (
+            SELECT t2.company_id, COUNT(t1.id) AS contact_count
+            FROM contacts t1
+            JOIN company_name_mapping t2 ON t1.company = t2.raw_name
+            WHERE t2.company_id IS NOT NULL
+            GROUP BY t2.company_id
+        )""")
+        joins.append("LEFT JOIN contact_counts cc ON cc.company_id = c.company_id")
+        columns.append("COALESCE(cc.contact_count, 0) AS contact_count")
+
+    sql_query = (
+        ("WITH " + ",".join(ctes) + "\n" if ctes else "")
+        + "SELECT " + ", ".join(columns) + "\n"
+        + "FROM companies c\n"
+        + "".join(join + "\n" for join in joins)
+        + "ORDER BY c.company_name_clean;"
+    )
+    cur.execute(sql_query, params)
+
+    # Convert DictRow objects to standard dictionaries for JSON serialization
+    # and ensure counts are explicitly integers
+    companies_data = []
+    for row in cur.fetchall():
+        data = dict(row)
+        for count_key in COMPANY_LIST_INCLUDES:
+            if count_key in data:
+                data[count_key] = int(data[count_key] or 0)
+        companies_data.append(data)
+    return companies_data
+
+# Plain columns selectable with ?fields= on /api/applications/all.
+# application_id and company_id are always returned. The second element is the
+# join the column needs, so unrequested joins are dropped from the query.
+APPLICATION_LIST_FIELDS = {
+    'date_applied': ('a.date_applied', None),
+    'current_status': ('a.current_status', None),
+    'job_title_id': ('jt.job_title_id', 'jt'),
+    'title_name': ('jt.title_name', 'jt'),
+    'company_name_clean': ('c.company_name_clean', 'c'),
+}
+APPLICATION_LIST_JOINS = {
+    'jt': "LEFT JOIN job_titles jt ON a.job_title_id = jt.job_title_id",
+    'c': "LEFT JOIN companies c ON a.company_id = c.company_id",
+}
+# Derived parts selectable with ?include= on /api/applications/all
+APPLICATION_LIST_INCLUDES = ('documents', 'contact_count')
+
+def fetch_user_applications(cur, user_id, contact_counts=None, fields=None, include=None, application_ids=None):
+    """
+    All applications for the user with nested documents and the company's contact count.
+    If contact_counts ({company_id: count}) is supplied, e.g. from fetch_company_list()
+    in the same snapshot, the per-row contact count subquery is skipped.
+    fields / include of None mean all columns / all derived parts; excluding
+    'documents' also drops the job_documents join (one row per application).
+    application_ids limits the result to those applications (change feed, 35.0).
+    """
+    fields = set(APPLICATION_LIST_FIELDS) if fields is None else fields
+    include = set(APPLICATION_LIST_INCLUDES) if include is None else include
+
+    columns = ['a.application_id', 'a.company_id']
+    needed_joins = set()
+    for name, (expr, join) in APPLICATION_LIST_FIELDS.items():
+        if name in fields:
+            columns.append(expr)
+            if join:
+                needed_joins.add(join)
+    joins = [APPLICATION_LIST_JOINS[key] for key in ('jt', 'c') if key in needed_joins]
+
+    if 'documents' in include:
+        columns += ['jd.document_id', 'jd.document_type', 'jd.file_path', 'jd.original_filename']
+        joins.append("LEFT JOIN job_documents jd ON a.application_id = jd.application_id")
+
+    if 'contact_count' in include and contact_counts is None:
+        # Subquery to count the number of contacts associated with the company_id
+        columns.append("""(
+                    SELECT COUNT(t1.id)
+                    FROM contacts t1
+                    JOIN company_name_mapping t2 ON t1.company = t2.raw_name
+                    WHERE t2.company_id = a.company_id
+                ) AS contact_count""")
+
+    where = "WHERE a.user_id = %s\n"
+    params = [user_id]
+    if application_ids is not None:
+        where += "AND a.application_id = ANY(%s::uuid[])\n"
+        params.append(list(application_ids))
+
+    # SQL Query to JOIN applications with only the tables the selection needs
+    sql_query = (
+        "SELECT " + ", ".join(columns) + "\n"
+        + "FROM applications a\n"
+        + "".join(join + "\n" for join in joins)
+        + where
+        + "ORDER BY a.date_applied DESC;"
+    )
+
+    cur.execute(sql_query, params)
+    records = cur.fetchall()
+
+    # Group records by application_id since there will be duplicate rows for each document
+    applications_map = {}
+    for record in records:
+        app_id = str(record['application_id'])
+        
+        # Application-level data (only needs to be added once)
+        if app_id not in applications_map:
+            # Convert DictRow to standard dict and ensure type safety for JSON
+            app_data = dict(record)
+
+            # Explicitly cast UUID and Date objects to strings
+            app_data['application_id'] = app_id
+            if isinstance(app_data.get('date_applied'), date):
+                app_data['date_applied'] = app_data['date_applied'].isoformat()
+
+            if 'contact_count' in include:
+                if contact_counts is not None:
+                    app_data['contact_count'] = contact_counts.get(app_data['company_id'], 0)
+                if app_data['company_id'] is None:
+                    app_data['contact_count'] = 0 # No company, no contacts
+                # Ensure contact_count is an integer
+                app_data['contact_count'] = int(app_data['contact_count'])
+            
+            # Use 'Unknown' for company_id if the join failed (LEFT JOIN)
+            if 'company_name_clean' in fields and app_data['company_id'] is None:
+                app_data['company_name_clean'] = 'Unknown/Unstandardized Company'
+
+            if 'documents' in include:
+                # Initialize documents list
+                app_data['documents'] = []
+
+            applications_map[app_id] = app_data
+        
+        # Document-level data (append only if document_id is not null)
+        if 'documents' in include and record['document_id']:
+            doc_id_str = str(record['document_id'])
+            
+            # Prevent duplicate documents if the same document_id is in the same list 
+            # (although the query structure should mostly prevent this, it's safer)
+            is_duplicate = any(doc_id_str == str(d['document_id']) for d in applications_map[app_id]['documents'])
+
+            if not is_duplicate:
+                applications_map[app_id]['documents'].append({
+                    "document_id": doc_id_str,
+                    "document_type": record['document_type'],
+                    "file_path": record['file_path'], # Secure filename
+                    "original_filename": record['original_filename']
+                })
+
+    # Convert the dictionary values (applications) back into a final response list
+    return list(applications_map.values())
+
+
+# Plain columns selectable with ?fields= on /api/contacts/all (contact_id is always returned)
+CONTACT_LIST_FIELDS = {
+    'first_name': 't1.first_name',
+    'last_name': 't1.last_name',
+    'url': 't1.url',
+    'email_address': 't1.email_address',
+    'raw_company_name': 't1.company AS raw_company_name', # Original name from contacts table
+    'position': 't1.position',
+    'connected_on': 't1.connected_on',
+}
+# ?include=company adds the standardized company_id / company_name_clean (mapping + companies joins)
+CONTACT_LIST_INCLUDES = ('company',)
+
+def fetch_contact_list(cur, fields=None, include=None):
+    """
+    All contacts, optionally enriched with the standardized company via the mapping table.
+    fields / include of None mean all columns / the company enrichment.
+    NOTE: Data is GLOBAL as the contacts table currently lacks a user_id.
+    """
+    fields = set(CONTACT_LIST_FIELDS) if fields is None else fields
+    include = set(CONTACT_LIST_INCLUDES) if include is None else include
+
+    columns = ['t1.id AS contact_id'] + [expr for name, expr in CONTACT_LIST_FIELDS.items() if name in fields]
+    joins = []
+    if 'company' in include:
+        # The complex three-table join: contacts -> mapping -> companies
+        columns += ['t3.company_id', 't3.company_name_clean']
+        joins = [
+            "LEFT JOIN company_name_mapping t2 ON t1.company = t2.raw_name",
+            "LEFT JOIN companies t3 ON t2.company_id = t3.company_id",
+        ]
+
+    sql_query = (
+        "SELECT " + ", ".join(columns) + "\n"
+        + "FROM contacts t1\n"
+        + "".join(join + "\n" for join in joins)
+        + "ORDER BY t1.last_name, t1.first_name;"
+    )
+    cur.execute(sql_query)
+
+    contacts_data = []
+    for row in cur.fetchall():
+        data = dict(row)
+        
+        # Convert Python date objects to ISO string format for JSON
+        if isinstance(data.get('connected_on'), date):
+            data['connected_on'] = data['connected_on'].isoformat()
+        
+        contacts_data.append(data)
+    return contacts_data
+
+
+def fetch_company_applications(cur, company_id, user_id):
+    """
+    All of the user's applications for one company, with job title and nested documents.
+    Used by endpoint 11 and the company detail endpoint (28).
+    """
+    sql_query = """
+        SELECT
+            a.application_id,
+            a.date_applied,
+            a.current_status,
+            jt.job_title_id,
+            jt.title_name,
+            c.company_id,
+            c.company_name_clean,
+            jd.document_id,
+            jd.document_type,
+            jd.file_path,
+            jd.original_filename
+        FROM applications a
+        LEFT JOIN job_titles jt ON a.job_title_id = jt.job_title_id
+        LEFT JOIN job_documents jd ON a.application_id = jd.application_id
+        LEFT JOIN companies c ON a.company_id = c.company_id
+        -- Enforce user authentication using MOCK_USER_ID
+        WHERE a.company_id = %s AND a.user_id = %s
+        ORDER BY a.date_applied DESC, a.application_id;
+    """
+    cur.execute(sql_query, (company_id, user_id))
+    records = cur.fetchall()
+
+    if not records:
+        # If no records exist for the company/user combo, return empty list
+        return []
+
+    # --- Data Restructuring Logic ---
+    applications_map = {}
+    company_info = None # Capture company info from the first record
+
+    for record in records:
+        app_id = str(record['application_id'])
+
+        if not company_info:
+            company_info = {
+                "company_id": record['company_id'],
+                "company_name_clean": record['company_name_clean']
+            }
+
+        if app_id not in applications_map:
+            # Initialize new application record
+            applications_map[app_id] = {
+                "application_id": app_id,
+                "date_applied": str(record['date_applied']),
+                "current_status": record['current_status'],
+                "company_info": company_info,
+                "job_title_info": {
+                    "job_title_id": record['job_title_id'],
+                    "title_name": record['title_name']
+                },
+                "documents": []
+            }
+
+        # Add document if it exists (check for NULL document_id due to LEFT JOIN)
+        if record['document_id'] is not None:
+            applications_map[app_id]['documents'].append({
+                "document_id": str(record['document_id']),
+                "document_type": record['document_type'],
+                "file_path": record['file_path'], # This is the secure filename
+                "original_filename": record['original_filename']
+            })
+    
+    # Convert the dictionary values (applications) back into a list
+    return list(applications_map.values())
 
 # ----------------------------------------------------------------------
 # 1. GET ALL COMPANIES (Dashboard List View) - Handles /api/companies (NO ID)
@@ -415,6 +1652,7 @@ def get_companies():
     """
     Endpoint 1.0: Retrieves all standardized company profiles, 
     including user-specific application count and global contact count for the dashboard view.
+    Supports ?fields= (COMPANY_LIST_FIELDS) and ?include= (COMPANY_LIST_INCLUDES).
     """
     user_id = g.user_id # Get the authenticated user ID
     conn = None
@@ -422,47 +1660,13 @@ def get_companies():
         conn = get_db_connection()
         cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
         
-        # Select key fields and include subqueries for counts
-        sql = """
-            SELECT 
-                c.company_id, 
-                c.company_name_clean, 
-                c.headquarters, 
-                c.size_employees, 
-                c.target_interest, 
-                c.annual_revenue,
-                
-                -- 1. Get total applications for this company by the authenticated user
-                (
-                    SELECT COUNT(a.application_id)
-                    FROM applications a
-                    WHERE a.company_id = c.company_id
-                    AND a.user_id = %s 
-                ) AS application_count,
-                
-                -- 2. Get total contacts associated with this company (globally/across all users).
-                -- NOTE: The 'contacts' table currently lacks a 'user_id' column, so this count is global.
-                (
-                    SELECT COUNT(t1.id)
-                    FROM contacts t1
-                    JOIN company_name_mapping t2 ON t1.company = t2.raw_name
-                    WHERE t2.company_id = c.company_id
-                ) AS contact_count
-                
-            FROM companies c
-            ORDER BY c.company_name_clean;
-        """
-        # Execute the query, passing user_id for the application count subquery
-        cur.execute(sql, (user_id,))
-        
-        # Convert DictRow objects to standard dictionaries for JSON serialization
-        # and ensure counts are explicitly integers
-        companies_data = []
-        for row in cur.fetchall():
-            data = dict(row)
-            data['application_count'] = int(data.get('application_count', 0))
-            data['contact_count'] = int(data.get('contact_count', 0))
-            companies_data.append(data)
+        # Counts are aggregated in the shared helper (see SHARED LIST QUERIES).
+        # Sparse fieldsets: ?fields=company_name_clean&include=application_count
+        companies_data = fetch_company_list(
+            cur, user_id,
+            fields=parse_list_param('fields', tuple(COMPANY_LIST_FIELDS)),
+            include=parse_list_param('include', COMPANY_LIST_INCLUDES),
+        )
         
         return jsonify({
             "status": "success",
@@ -473,6 +1677,8 @@ def get_companies():
         db_error_detail = getattr(e.diag, 'message_primary', 'N/A')
         print(f"PostgreSQL Error in get_companies: {db_error_detail}")
         return jsonify({"status": "error", "message": "Database error retrieving company list."}), 500
+    except BadRequest as e:
+        return jsonify({"status": "error", "message": e.description}), 400
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -1015,13 +2221,17 @@ def map_to_self():
 # 9. DOCUMENT UPLOAD API: POST /api/application/<uuid:application_id>/documents
 # FIX: Using standardized two-step database access (get_db_connection then get_db_cursor(conn, ...))
 # ----------------------------------------------------------------------
-## ENDPOINT 9.0: Upload Document
+## ENDPOINT 9.0: Upload Document(s)
+# Accepts one or more 'file' parts. 'document_type' is given once per file (same
+# order as the files) or once for all of them. Every file streams to disk while the
+# body is parsed; all accepted files are then inserted with ONE multi-row INSERT in
+# ONE transaction, and the response reports a result per file.
 @app.route('/api/application/<uuid:application_id>/documents', methods=['POST'])
 @authenticate_request()
 def upload_document(application_id):
     conn = None
     cur = None
-    save_path = None
+    flat_paths = [] # Private files placed by this request: removed again if the transaction fails
     
     # 1. Input Validation and Accessing Auth User
     user_id = g.user_id 
@@ -1032,40 +2242,60 @@ def upload_document(application_id):
     print(f"Application ID (string): {application_id_str}")
 
     # --- REQUIRED FIELD: document_type ---
-    document_type = request.form.get('document_type')
+    # Accessing request.form parses the multipart body; the file parts are streamed
+    # to temp files by UploadRequest and can trip the per-file size limit here.
+    try:
+        document_types = request.form.getlist('document_type')
+    except RequestEntityTooLarge as e:
+        return jsonify({"status": "error", "message": e.description}), 413
     
-    if not document_type:
+    if not document_types or not all(document_types):
          return jsonify({"status": "error", "message": "Missing required field: document_type"}), 400
 
-    # Safety check: Ensure the provided document_type is a valid ENUM value
-    document_type_upper = document_type.upper()
-    if document_type_upper not in ['RESUME', 'COVER_LETTER', 'JOB_DESCRIPTION', 'CERTIFICATE', 'OTHER']:
-         return jsonify({"status": "error", "message": f"Invalid document_type: {document_type}. Must be a valid ENUM value."}), 400
-
     # 3. File Handling and Saving
-    if 'file' not in request.files:
+    uploaded_files = request.files.getlist('file')
+    if not uploaded_files:
         return jsonify({"status": "error", "message": "Missing file part in request."}), 400
 
-    uploaded_file = request.files['file']
-    if uploaded_file.filename == '':
-        return jsonify({"status": "error", "message": "No selected file."}), 400
+    if len(document_types) == 1:
+        document_types = document_types * len(uploaded_files)
+    elif len(document_types) != len(uploaded_files):
+        return jsonify({"status": "error", "message": "Provide one document_type per file, or a single document_type for all files."}), 400
+
+    # Per-file validation. Rejected files get an error result; their temp files are
+    # removed by the discard_upload_temp_files teardown hook.
+    results = []   # One entry per file part, in request order
+    accepted = []  # (result, upload, row) for files that passed validation
+    for uploaded_file, document_type in zip(uploaded_files, document_types):
+        result = {"filename": uploaded_file.filename}
+        results.append(result)
+
+        # Safety check: Ensure the provided document_type is a valid ENUM value
+        document_type_upper = document_type.upper()
+        if uploaded_file.filename == '':
+            result.update(status="error", message="No selected file.")
+            continue
+        if document_type_upper not in ['RESUME', 'COVER_LETTER', 'JOB_DESCRIPTION', 'CERTIFICATE', 'OTHER']:
+            result.update(status="error", message=f"Invalid document_type: {document_type}. Must be a valid ENUM value.")
+            continue
+
+        # The body was already streamed to a temp file, hashed and size-checked while
+        # parsing (see STREAMING UPLOADS); sniff the MIME type from the buffered head.
+        upload = ingest_upload(uploaded_file)
+        mime_type = upload.sniff_mime_type()
+        # Generate UUID for the document ID (and filename on disk in flat mode)
+        file_uuid = str(uuid.uuid4())
+        print(f"DEBUG 9.0: {uploaded_file.filename}: {mime_type}, {upload.size} bytes")
+
+        row = [file_uuid, application_id_str, document_type_upper, secure_filename(uploaded_file.filename),
+               None, mime_type, upload.size, upload.content_hash, None] # file_path / storage_encoding are filled in once placed
+        accepted.append((result, upload, row))
+
+    if not accepted:
+        first_error = results[0]["message"]
+        return jsonify({"status": "error", "message": first_error, "results": results}), 400
 
-    original_filename = secure_filename(uploaded_file.filename)
-    # Generate UUID for the document ID and filename on disk
-    file_uuid = str(uuid.uuid4())
-    
-    # Use the UUID as the unique filename on the disk (this is the value for file_path)
-    save_path = os.path.join(UPLOAD_FOLDER, file_uuid)
-    
     try:
-        # Save the file to the file system
-        uploaded_file.save(save_path)
-        print(f"DEBUG 9.0: File saved to disk: {save_path}")
-
-        # Determine Mime Type using python-magic (Assumed to be imported)
-        mime_type = Magic(mime=True).from_file(save_path)
-        print(f"DEBUG 9.0: Mime Type determined: {mime_type}")
-
         # 4. Database Insertion
         # *** CRITICAL FIX: Use the standardized two-step connection pattern ***
         conn = get_db_connection()
@@ -1077,59 +2307,82 @@ def upload_document(application_id):
         cur = get_db_cursor(conn, cursor_factory=psycopg2.extras.DictCursor)
         # *** END CRITICAL FIX ***
 
-        # SQL Query based STRICTLY on the provided schema:
-        sql_query = """
-            INSERT INTO job_documents (
-                document_id,            -- PK is explicitly inserted (UUID)
-                application_id, 
-                document_type, 
-                original_filename, 
-                file_path,              -- Matches schema (filename on disk = file_uuid)
-                mime_type, 
-                upload_timestamp        -- Matches schema
-            ) 
-            VALUES (%s, %s, %s, %s, %s, %s, NOW()) 
-            RETURNING document_id
-            """
-        
-        # Parameters for the 6 placeholders (%s)
-        cur.execute(
-            sql_query,
-            (file_uuid, application_id_str, document_type_upper, original_filename, file_uuid, mime_type) 
-        )
-        new_document_id = cur.fetchone()[0]
+        # Ownership check on the target application. The usage counters are charged to the
+        # application's owner (migration 009), so this is also what makes the quota check
+        # below apply to the right user.
+        cur.execute("SELECT 1 FROM applications WHERE application_id = %s AND user_id = %s;", (application_id_str, user_id))
+        if cur.fetchone() is None:
+            conn.rollback()
+            return jsonify({"status": "error", "message": "Application not found or unauthorized access."}), 404
+
+        # Storage quota (see STORAGE QUOTAS): files that would exceed it are rejected
+        # one by one, like any other per-file error; the ones before them still go in.
+        usage = fetch_storage_usage(cur, user_id, for_update=True)
+        within_quota = []
+        for result, upload, row in accepted:
+            quota_error = storage_quota_error(usage, upload.size)
+            if quota_error:
+                result.update(status="error", message=quota_error)
+                continue
+            usage['total_bytes'] += upload.size
+            usage['file_count'] += 1
+            within_quota.append((result, upload, row))
+        accepted = within_quota
+        if not accepted:
+            conn.rollback()
+            return jsonify({"status": "error", "message": results[0]["message"], "results": results}), 413
+
+        # Place every file (see CONTENT-ADDRESSED DOCUMENT STORE), then one INSERT for all rows
+        for result, upload, row in accepted:
+            row[4], flat_path, row[8] = place_document_file(
+                cur, row[0], upload.size, upload.content_hash,
+                lambda key, upload=upload, mime_type=row[5]: upload.commit(key, mime_type)
+            )
+            if flat_path:
+                flat_paths.append(flat_path)
+        insert_document_rows(cur, [tuple(row) for _, _, row in accepted])
         conn.commit()
-        print(f"DEBUG 9.0: Document metadata saved to DB: {new_document_id}")
 
-        return jsonify({
-            "status": "success", 
-            "message": "Document uploaded successfully.", 
-            "document_id": str(new_document_id)
-        }), 201
+        for result, upload, row in accepted:
+            result.update(status="success", document_id=row[0])
+        print(f"DEBUG 9.0: {len(accepted)} document(s) saved to DB in one transaction.")
 
     except psycopg2.Error as e:
         if conn:
             conn.rollback()
-        # Clean up file if database insert fails
-        if save_path and os.path.exists(save_path):
-             os.remove(save_path)
+        # Clean up files if database insert fails
+        for path in flat_paths:
+            get_storage().delete(path)
         # Extract specific DB error detail
         db_error_detail = getattr(e.diag, 'message_primary', 'N/A')
         print(f"PostgreSQL Error in upload_document: {e}") 
         return jsonify({"status": "error", "message": f"Database error during document save: {db_error_detail}"}), 500
         
     except Exception as e:
+        if conn:
+            conn.rollback()
         # Catch file system errors or other exceptions
         print(f"General Error in upload_document: {e}")
         error_detail = str(e)
-        # Attempt to clean up the file if it was saved before the exception
-        if save_path and os.path.exists(save_path):
-             os.remove(save_path)
+        # Attempt to clean up the files if they were saved before the exception
+        for path in flat_paths:
+            get_storage().delete(path)
         return jsonify({"status": "error", "message": "Processing error during file upload.", "detail": error_detail}), 500
         
     finally:
         if cur: cur.close()
         if conn: conn.close()
+
+    succeeded = len(accepted)
+    response_data = {
+        "status": "success" if succeeded == len(results) else "partial",
+        "message": "Document uploaded successfully." if len(results) == 1 else f"{succeeded} of {len(results)} document(s) uploaded successfully.",
+        "results": results,
+    }
+    if len(results) == 1:
+        response_data["document_id"] = results[0]["document_id"] # Single-file callers read this key
+    # 207 Multi-Status when only some of the files were accepted
+    return jsonify(response_data), 201 if succeeded == len(results) else 207
 # ----------------------------------------------------------------------
 # 10. APPLICATION CREATION API: POST /api/application
 # ----------------------------------------------------------------------
@@ -1266,72 +2519,8 @@ def get_applications_by_company():
         # Use DictCursor for easy access to column names
         cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
 
-        sql_query = """
-            SELECT
-                a.application_id,
-                a.date_applied,
-                a.current_status,
-                jt.job_title_id,
-                jt.title_name,
-                c.company_id,
-                c.company_name_clean,
-                jd.document_id,
-                jd.document_type,
-                jd.file_path,
-                jd.original_filename
-            FROM applications a
-            LEFT JOIN job_titles jt ON a.job_title_id = jt.job_title_id
-            LEFT JOIN job_documents jd ON a.application_id = jd.application_id
-            LEFT JOIN companies c ON a.company_id = c.company_id
-            -- Enforce user authentication using MOCK_USER_ID
-            WHERE a.company_id = %s AND a.user_id = %s
-            ORDER BY a.date_applied DESC, a.application_id;
-        """
-        cur.execute(sql_query, (company_id, MOCK_USER_ID))
-        records = cur.fetchall()
-
-        if not records:
-            # If no records exist for the company/user combo, return empty list
-            return jsonify({"status": "success", "applications": []}), 200
-
-        # --- Data Restructuring Logic ---
-        applications_map = {}
-        company_info = None # Capture company info from the first record
-
-        for record in records:
-            app_id = str(record['application_id'])
-
-            if not company_info:
-                company_info = {
-                    "company_id": record['company_id'],
-                    "company_name_clean": record['company_name_clean']
-                }
-
-            if app_id not in applications_map:
-                # Initialize new application record
-                applications_map[app_id] = {
-                    "application_id": app_id,
-                    "date_applied": str(record['date_applied']),
-                    "current_status": record['current_status'],
-                    "company_info": company_info,
-                    "job_title_info": {
-                        "job_title_id": record['job_title_id'],
-                        "title_name": record['title_name']
-                    },
-                    "documents": []
-                }
-
-            # Add document if it exists (check for NULL document_id due to LEFT JOIN)
-            if record['document_id'] is not None:
-                applications_map[app_id]['documents'].append({
-                    "document_id": str(record['document_id']),
-                    "document_type": record['document_type'],
-                    "file_path": record['file_path'], # This is the secure filename
-                    "original_filename": record['original_filename']
-                })
-        
-        # Convert the dictionary values (applications) back into a list
-        final_response = list(applications_map.values())
+        # Query and restructuring live in the shared helper (see SHARED LIST QUERIES)
+        final_response = fetch_company_applications(cur, company_id, MOCK_USER_ID)
         
         return jsonify({"status": "success", "applications": final_response}), 200
 
@@ -1459,7 +2648,8 @@ def download_document(file_path):
         # 2. Security Check: Retrieve Document Metadata and Verify Ownership
         # We join job_documents with applications to ensure the document belongs to an application owned by the user.
         sql_check = """
-            SELECT jd.original_filename
+            SELECT jd.original_filename, jd.file_path, jd.mime_type, jd.content_hash, jd.upload_timestamp,
+                   jd.storage_encoding, jd.file_size
             FROM job_documents jd
             JOIN applications a ON jd.application_id = a.application_id
             WHERE jd.document_id = %s AND a.user_id = %s
@@ -1474,21 +2664,114 @@ def download_document(file_path):
             return jsonify({"status": "error", "message": "File not found or unauthorized access."}), 404
         
         original_filename = document_data[0]
+        # Where the file lives: blobs/ab/cd/<hash> for deduplicated uploads, files/ab/cd/<uuid>
+        # for flat ones (or just the document_id for legacy files not yet moved into shards)
+        stored_path = resolve_stored_path(document_data[1])
         print(f"DEBUG 12.0: Document ownership verified. Original filename: {original_filename}")
 
+        # Validators: a strong ETag from the SHA-256 of the content (uploads older than
+        # migration 002 have none and fall back to Werkzeug's file-based ETag) and
+        # Last-Modified from the upload time. Repeat views become 304s.
+        content_hash = document_data[3]
+        upload_timestamp = document_data[4]
+
+        # Files compressed at rest (DOCUMENT_COMPRESSION): clients that accept the coding get
+        # the stored bytes as-is with Content-Encoding (no CPU spent, fewer bytes on the wire);
+        # the others get the original bytes, decompressed here while streaming.
+        storage_encoding = document_data[5]
+        content_encoding = None
+        if storage_encoding:
+            if not client_accepts_encoding(storage_encoding):
+                if not get_storage().exists(stored_path):
+                    raise FileNotFoundError(f"File {stored_path} is missing from the store.")
+                # No byte ranges on this path (the full document is sent, as RFC 9110 allows)
+                response = app.response_class(
+                    iter_document_file(stored_path, storage_encoding),
+                    mimetype=document_data[2] or 'application/octet-stream'
+                )
+                set_attachment_disposition(response, original_filename)
+                if document_data[6] is not None:
+                    response.content_length = document_data[6]
+                response.vary.add('Accept-Encoding')
+                set_document_validators(response, content_hash, upload_timestamp)
+                response.make_conditional(request)
+                return response
+            content_encoding = storage_encoding
+
+        storage = get_storage()
+        if storage.local_path(stored_path) is None:
+            # Remote store (STORAGE_BACKEND=s3)
+            if app.config['DOCUMENT_SERVE_MODE'] == 'redirect':
+                # 3. Send the client to a short-lived presigned URL; the object store does the
+                # transfer (and Range requests). The URL itself must not be cached.
+                response = redirect(storage.redirect_url(
+                    stored_path, S3_PRESIGN_EXPIRES,
+                    content_type=document_data[2] or 'application/octet-stream',
+                    content_disposition=attachment_disposition(original_filename),
+                    content_encoding=content_encoding
+                ), code=302)
+                response.cache_control.no_store = True
+                return response
+
+            # 3. Stream the object through this worker. RemoteObjectBody is seekable, so for a
+            # Range request make_conditional() fetches just that part of the object.
+            stored_size = storage.stat(stored_path)
+            if stored_size is None:
+                raise FileNotFoundError(f"File {stored_path} is missing from the store.")
+            response = app.response_class(
+                RemoteObjectBody(storage, stored_path, stored_size, DOCUMENT_READ_CHUNK_SIZE),
+                mimetype=document_data[2] or 'application/octet-stream'
+            )
+            set_attachment_disposition(response, original_filename)
+            response.content_length = stored_size
+            if content_encoding:
+                response.headers['Content-Encoding'] = content_encoding
+                response.vary.add('Accept-Encoding')
+            set_document_validators(response, content_hash, upload_timestamp, content_encoding)
+            try:
+                response.make_conditional(request, accept_ranges=True, complete_length=stored_size)
+            except RequestedRangeNotSatisfiable as e:
+                return e.get_response()
+            return response
+
+        if app.config['DOCUMENT_SERVE_MODE'] == 'x-accel':
+            # 3. Hand the transfer to nginx (zero-copy sendfile). The ownership check above
+            # is the only work this worker does; nginx returns 404 if the file is missing
+            # and answers Range requests itself. Conditional requests are answered here,
+            # without involving nginx at all.
+            response = accel_redirect_response(stored_path, original_filename, document_data[2])
+            if content_encoding:
+                response.headers['Content-Encoding'] = content_encoding
+                response.vary.add('Accept-Encoding')
+            set_document_validators(response, content_hash, upload_timestamp, content_encoding)
+            response.make_conditional(request)
+            if response.status_code == 304:
+                del response.headers['X-Accel-Redirect']
+            return response
+
         # 3. Serve the file securely using Flask's send_from_directory
         # Check if file exists on disk before serving (Crucial for FileNotFoundError handling)
-        full_path = os.path.join(app.config['UPLOAD_FOLDER'], document_id)
+        full_path = document_disk_path(stored_path)
         if not os.path.exists(full_path):
              # Explicitly raise FileNotFoundError if the file is missing from disk
-             raise FileNotFoundError(f"File {document_id} is missing on disk.")
+             raise FileNotFoundError(f"File {stored_path} is missing on disk.")
 
-        return send_from_directory(
+        # conditional=True gives 304 handling and single byte-range (206) support;
+        # multi-range requests are answered with the full file, as RFC 9110 allows.
+        response = send_from_directory(
             app.config['UPLOAD_FOLDER'], 
-            document_id, # This is the secure filename on disk
+            stored_path, # This is the secure path on disk (relative to UPLOAD_FOLDER)
             as_attachment=True, # Forces a download dialog
-            download_name=original_filename # Uses the user's original file name
+            download_name=original_filename, # Uses the user's original file name
+            conditional=True,
+            etag=(f"{content_hash}-{content_encoding}" if content_encoding else content_hash) or True,
+            last_modified=upload_timestamp
         )
+        if content_encoding:
+            response.headers['Content-Encoding'] = content_encoding
+            response.vary.add('Accept-Encoding')
+        set_document_validators(response, content_hash, upload_timestamp, content_encoding)
+        return response
 
     except psycopg2.Error as e:
         if conn: conn.rollback()
@@ -1606,22 +2889,7 @@ def get_sidebar_summary():
 
         # FIX: Query is corrected to retrieve all companies since the 'companies' table 
         # is a global standardized list and lacks a user_id filter column.
-        sql_query = """
-            SELECT
-                company_id,
-                company_name_clean,
-                target_interest AS is_target
-            FROM
-                companies
-            ORDER BY
-                company_name_clean ASC;
-        """
-        
-        # Execute query without any parameters
-        cur.execute(sql_query)
-        
-        # Fetch all results and convert DictRows to standard dictionaries
-        companies_summary = [dict(row) for row in cur.fetchall()]
+        companies_summary = fetch_sidebar_companies(cur)
 
         # Return the summary list
         return jsonify({
@@ -2187,6 +3455,8 @@ def delete_application(application_id):
     """
     Endpoint 20: Permanently deletes a job application, its document metadata, 
     and all associated physical files from the UPLOAD_FOLDER.
+    The files are queued in the file_deletions outbox in the same transaction and
+    removed by worker.py after the commit, so the request does no file I/O.
     """
     user_id = g.user_id
     application_id_str = str(application_id)
@@ -2199,9 +3469,9 @@ def delete_application(application_id):
         cur = conn.cursor()
 
         # 1. Ownership Check and Document Retrieval
-        # We need the document_id (which serves as the secure filename) to delete the physical files.
+        # We need each document's file_path (and content_hash for shared blobs) to delete the physical files.
         sql_select_documents = """
-            SELECT jd.document_id 
+            SELECT jd.document_id, jd.file_path, jd.content_hash
             FROM applications a
             LEFT JOIN job_documents jd ON a.application_id = jd.application_id
             WHERE a.application_id = %s AND a.user_id = %s;
@@ -2225,21 +3495,30 @@ def delete_application(application_id):
             
             # If the app exists but has no documents, we continue to step 4 (delete application record).
 
-        # 2. Delete Physical Files (CRITICAL ACTION)
+        # 2. Queue the Physical Files for deletion (CRITICAL ACTION)
+        # Nothing is removed from disk here: if this transaction rolls back, every file stays.
+        # Usage row first: release_blob() below takes blob locks (lock order, see STORAGE QUOTAS)
+        fetch_storage_usage(cur, user_id, for_update=True)
+        files_to_delete = []
         for record in document_records:
-            document_id = str(record[0]) # document_id is the secure filename
-            file_to_delete = os.path.join(UPLOAD_FOLDER, document_id)
-            
-            try:
-                if os.path.exists(file_to_delete):
-                    os.remove(file_to_delete)
+            if record[0] is None:
+                continue # LEFT JOIN row of an application without documents
+            file_path, content_hash = record[1], record[2]
+
+            if is_blob_path(file_path, content_hash):
+                # Shared blob: drop this document's reference; the file only goes with the last one
+                if release_blob(cur, content_hash):
                     files_deleted_count += 1
-                else:
-                    # Log a warning but proceed with DB cleanup
-                    print(f"WARNING 20.0: File not found on disk: {file_to_delete}")
-            except Exception as file_e:
-                print(f"FILE SYSTEM ERROR 20.0: Could not delete file {file_to_delete}: {file_e}")
-                # Log the error but continue DB cleanup, as the file may be externally locked
+                continue
+
+            files_to_delete.append((file_path, None))
+
+        # Partial files of resumable uploads in progress (their sessions go with the application, ON DELETE CASCADE)
+        cur.execute("SELECT upload_id FROM upload_sessions WHERE application_id = %s;", (application_id_str,))
+        for (upload_id,) in cur.fetchall():
+            files_to_delete.append((partial_upload_key(upload_id), None))
+
+        files_deleted_count += queue_file_deletions(cur, files_to_delete)
 
         # 3. Delete linked records from job_documents
         sql_delete_docs = """
@@ -2265,7 +3544,7 @@ def delete_application(application_id):
 
         return jsonify({
             "status": "success",
-            "message": f"Application {application_id_str} deleted successfully. {files_deleted_count} associated file(s) removed."
+            "message": f"Application {application_id_str} deleted successfully. {files_deleted_count} associated file(s) queued for removal."
         }), 200
 
     except psycopg2.Error as e:
@@ -2404,6 +3683,7 @@ def get_all_user_applications():
     Endpoint 22.0: Retrieves a complete, aggregated list of all job applications
     for the authenticated user, including nested document information and 
     the total contact count for the associated company.
+    Supports ?fields= (APPLICATION_LIST_FIELDS) and ?include= (APPLICATION_LIST_INCLUDES).
     """
     user_id = g.user_id
     conn = None
@@ -2418,86 +3698,15 @@ def get_all_user_applications():
         # Use the explicit keyword argument
         cur = get_db_cursor(conn, cursor_factory=psycopg2.extras.DictCursor)
 
-        # SQL Query to JOIN applications with job_titles, companies, and 
-        # a subquery to COUNT the contacts for the company.
-        sql_query = """
-            SELECT
-                a.application_id,
-                a.date_applied,
-                a.current_status,
-                jt.job_title_id,
-                jt.title_name,
-                c.company_name_clean,
-                c.company_id,
-                jd.document_id,
-                jd.document_type,
-                jd.file_path,
-                jd.original_filename,
-                -- NEW: Subquery to count the number of contacts associated with the company_id
-                (
-                    SELECT COUNT(t1.id)
-                    FROM contacts t1
-                    JOIN company_name_mapping t2 ON t1.company = t2.raw_name
-                    WHERE t2.company_id = c.company_id
-                ) AS contact_count
-            FROM applications a
-            LEFT JOIN job_titles jt ON a.job_title_id = jt.job_title_id
-            LEFT JOIN companies c ON a.company_id = c.company_id
-            LEFT JOIN job_documents jd ON a.application_id = jd.application_id
-            WHERE a.user_id = %s
-            ORDER BY a.date_applied DESC;
-        """
-
-        cur.execute(sql_query, (user_id,))
-        records = cur.fetchall()
-
-        # Group records by application_id since there will be duplicate rows for each document
-        applications_map = {}
-        for record in records:
-            app_id = str(record['application_id'])
-            
-            # Application-level data (only needs to be added once)
-            if app_id not in applications_map:
-                # Convert DictRow to standard dict and ensure type safety for JSON
-                app_data = dict(record)
-
-                # Explicitly cast UUID and Date objects to strings
-                app_data['application_id'] = app_id
-                if isinstance(app_data['date_applied'], date):
-                    app_data['date_applied'] = app_data['date_applied'].isoformat()
-                
-                # Use 'Unknown' for company_id if the join failed (LEFT JOIN)
-                if app_data['company_id'] is None:
-                    app_data['company_name_clean'] = 'Unknown/Unstandardized Company'
-                    app_data['contact_count'] = 0 # No company, no contacts
-
-                # Initialize documents list
-                app_data['documents'] = []
-                # Ensure contact_count is an integer
-                app_data['contact_count'] = int(app_data['contact_count'])
-
-                applications_map[app_id] = app_data
-            
-            # Document-level data (append only if document_id is not null)
-            if record['document_id']:
-                doc_id_str = str(record['document_id'])
-                
-                # Prevent duplicate documents if the same document_id is in the same list 
-                # (although the query structure should mostly prevent this, it's safer)
-                is_duplicate = any(doc_id_str == str(d['document_id']) for d in applications_map[app_id]['documents'])
-
-                if not is_duplicate:
-                    applications_map[app_id]['documents'].append({
-                        "document_id": doc_id_str,
-                        "document_type": record['document_type'],
-                        "file_path": record['file_path'], # Secure filename
-                        "original_filename": record['original_filename']
-                    })
-
-        # Convert the dictionary values (applications) back into a final response list
-        applications_list = list(applications_map.values())
+        # Query and grouping live in the shared helper (see SHARED LIST QUERIES).
+        # Sparse fieldsets: ?fields=current_status,title_name&include=documents
+        applications_list = fetch_user_applications(
+            cur, user_id,
+            fields=parse_list_param('fields', tuple(APPLICATION_LIST_FIELDS)),
+            include=parse_list_param('include', APPLICATION_LIST_INCLUDES),
+        )
 
-        print(f"DEBUG 22.0: Successfully retrieved {len(applications_list)} applications with documents and contact count.")
+        print(f"DEBUG 22.0: Successfully retrieved {len(applications_list)} applications.")
 
         return jsonify({
             "status": "success",
@@ -2510,6 +3719,9 @@ def get_all_user_applications():
         print(f"[DB ERROR] PostgreSQL Error in get_all_user_applications: {db_error_detail}")
         return jsonify({"status": "error", "message": "Database error retrieving applications."}), 500
 
+    except BadRequest as e:
+        return jsonify({"status": "error", "message": e.description}), 400
+
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -2529,6 +3741,7 @@ def get_all_contacts():
     """
     Endpoint 23.0: Retrieves a list of all contacts, enriching them with 
     standardized company_id and company_name_clean via the mapping table.
+    Supports ?fields= (CONTACT_LIST_FIELDS) and ?include=company.
     NOTE: Data is GLOBAL as the contacts table currently lacks a user_id.
     """
     conn = None
@@ -2536,38 +3749,12 @@ def get_all_contacts():
         conn = get_db_connection()
         cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
         
-        # This query performs the complex three-table join: contacts -> mapping -> companies
-        sql_query = """
-            SELECT
-                t1.id AS contact_id,
-                t1.first_name,
-                t1.last_name,
-                t1.url,
-                t1.email_address,
-                t1.company AS raw_company_name, -- Original name from contacts table
-                t1.position,
-                t1.connected_on,
-                
-                -- Standardized Company Info (via joins)
-                t3.company_id,
-                t3.company_name_clean
-                
-            FROM contacts t1
-            LEFT JOIN company_name_mapping t2 ON t1.company = t2.raw_name
-            LEFT JOIN companies t3 ON t2.company_id = t3.company_id
-            ORDER BY t1.last_name, t1.first_name;
-        """
-        cur.execute(sql_query)
-        
-        contacts_data = []
-        for row in cur.fetchall():
-            data = dict(row)
-            
-            # Convert Python date objects to ISO string format for JSON
-            if isinstance(data.get('connected_on'), date):
-                data['connected_on'] = data['connected_on'].isoformat()
-            
-            contacts_data.append(data)
+        # Sparse fieldsets: ?fields=first_name,last_name&include= (see SHARED LIST QUERIES)
+        contacts_data = fetch_contact_list(
+            cur,
+            fields=parse_list_param('fields', tuple(CONTACT_LIST_FIELDS)),
+            include=parse_list_param('include', CONTACT_LIST_INCLUDES),
+        )
         
         return jsonify({
             "status": "success",
@@ -2578,6 +3765,8 @@ def get_all_contacts():
         db_error_detail = getattr(e.diag, 'message_primary', 'N/A')
         print(f"PostgreSQL Error in get_all_contacts: {db_error_detail}")
         return jsonify({"status": "error", "message": "Database error retrieving contacts list."}), 500
+    except BadRequest as e:
+        return jsonify({"status": "error", "message": e.description}), 400
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -2613,7 +3802,6 @@ def delete_document(document_id):
         if not upload_folder:
             raise Exception("UPLOAD_FOLDER is not configured in app.config")
         
-        file_path_on_disk = os.path.join(upload_folder, document_id)
         print(f"DEBUG 25.0: Resolved UPLOAD_FOLDER to: {upload_folder}")
 
         # B. Establish Database connection (Step 1 of fix)
@@ -2630,35 +3818,38 @@ def delete_document(document_id):
 
         # 2. Security Check: Verify Document Ownership
         sql_check = """
-            SELECT 1 
+            SELECT jd.file_path, jd.content_hash
             FROM job_documents jd
             JOIN applications a ON jd.application_id = a.application_id
             WHERE jd.document_id = %s AND a.user_id = %s;
         """
         cur.execute(sql_check, (document_id, user_id))
+        document_data = cur.fetchone()
         
-        if cur.rowcount == 0:
+        if document_data is None:
             conn.rollback()
             print(f"DEBUG 25.0: Authorization failed for document ID: {document_id}")
             return jsonify({"status": "error", "message": "Document not found or unauthorized access."}), 404
         
         print(f"DEBUG 25.0: Document ownership verified. Proceeding to deletion.")
+        stored_path, content_hash = document_data['file_path'], document_data['content_hash']
 
         # 3. Delete the Database Record
         sql_delete_db = "DELETE FROM job_documents WHERE document_id = %s;"
         cur.execute(sql_delete_db, (document_id,))
-        
-        # 4. Commit the DB change
-        conn.commit()
-        print(f"DEBUG 25.0: Database record deleted successfully.")
 
-        # 5. Delete the file from the filesystem (Atomic check after DB commit)
-        if os.path.exists(file_path_on_disk):
-            os.remove(file_path_on_disk)
-            print(f"DEBUG 25.0: File deleted from disk: {document_id}")
+        # 4. Queue the file for deletion in the same transaction (worker.py unlinks it after commit)
+        if is_blob_path(stored_path, content_hash):
+            # Shared blob: drop the reference; the file is only queued when this was the
+            # last document using it.
+            file_queued = release_blob(cur, content_hash)
         else:
-            print(f"WARNING 25.0: Database record deleted, but file was not found on disk at {file_path_on_disk}.")
-            
+            file_queued = queue_file_deletions(cur, [(stored_path, None)]) > 0
+
+        # 5. Commit the DB change
+        conn.commit()
+        print(f"DEBUG 25.0: Database record deleted successfully. File {'queued for removal' if file_queued else 'still referenced'}.")
+
         # 6. Success Response
         return jsonify({
             "status": "success", 
@@ -2695,6 +3886,1736 @@ def delete_document(document_id):
             conn.autocommit = True
             if cur: cur.close()
             conn.close()
+# ----------------------------------------------------------------------
+# 26. DASHBOARD COMPOSITE API: GET /api/dashboard?include=sidebar,companies,applications
+# Collapses the page-load waterfall (/api/sidebar, /api/companies, /api/applications/all)
+# into one request, one connection and one read-only snapshot.
+# ----------------------------------------------------------------------
+DASHBOARD_RESOURCES = ('sidebar', 'companies', 'applications')
+
+@app.route('/api/dashboard', methods=['GET'])
+@authenticate_request()
+def get_dashboard():
+    """
+    Endpoint 26.0: Returns the requested combination of dashboard resources.
+    ?include= is a comma-separated list of sidebar, companies, applications
+    (default: all three). Each resource is returned under its own key.
+    """
+    user_id = g.user_id
+    conn = None
+    cur = None
+
+    # 1. Parse the resources the page declares
+    include_param = request.args.get('include', '')
+    requested = [r.strip() for r in include_param.split(',') if r.strip()] or list(DASHBOARD_RESOURCES)
+    unknown = [r for r in requested if r not in DASHBOARD_RESOURCES]
+    if unknown:
+        return jsonify({
+            "status": "error",
+            "message": f"Unknown include value(s): {', '.join(unknown)}. Allowed: {', '.join(DASHBOARD_RESOURCES)}."
+        }), 400
+    requested = set(requested)
+
+    try:
+        conn = get_db_connection()
+        if conn is None:
+            return jsonify({"status": "error", "message": "Database connection failed."}), 500
+
+        # 2. One REPEATABLE READ, READ ONLY transaction: every query below sees the same snapshot
+        conn.set_session(isolation_level=psycopg2.extensions.ISOLATION_LEVEL_REPEATABLE_READ, readonly=True)
+        cur = get_db_cursor(conn, cursor_factory=psycopg2.extras.DictCursor)
+
+        response_data = {"status": "success"}
+        contact_counts = None
+
+        # 3. Companies (with counts) also feed the sidebar and the applications' contact counts,
+        #    so those don't need statements of their own.
+        if 'companies' in requested:
+            companies = fetch_company_list(cur, user_id)
+            response_data['companies'] = companies
+            contact_counts = {c['company_id']: c['contact_count'] for c in companies}
+            if 'sidebar' in requested:
+                response_data['sidebar'] = [
+                    {
+                        "company_id": c['company_id'],
+                        "company_name_clean": c['company_name_clean'],
+                        "is_target": c['target_interest']
+                    }
+                    for c in companies
+                ]
+        elif 'sidebar' in requested:
+            response_data['sidebar'] = fetch_sidebar_companies(cur)
+
+        if 'applications' in requested:
+            response_data['applications'] = fetch_user_applications(cur, user_id, contact_counts=contact_counts)
+
+        conn.commit()  # Ends the read-only snapshot
+        return jsonify(response_data), 200
+
+    except psycopg2.Error as e:
+        if conn: conn.rollback()
+        db_error_detail = getattr(e.diag, 'message_primary', 'N/A')
+        print(f"PostgreSQL Error in get_dashboard: {db_error_detail}")
+        return jsonify({"status": "error", "message": "Database error retrieving dashboard data."}), 500
+
+    except Exception as e:
+        if conn: conn.rollback()
+        traceback.print_exc()
+        print(f"General Error in get_dashboard: {e}")
+        return jsonify({"status": "error", "message": "Processing error retrieving dashboard data."}), 500
+
+    finally:
+        if cur: cur.close()
+        if conn: conn.close()
+
+# ----------------------------------------------------------------------
+# 27. BATCH API: POST /api/batch
+# Multiplexes several API calls into one HTTP round trip. Sub-requests are
+# dispatched in-process through the Flask routing table and borrow pooled
+# connections; runs of consecutive GETs execute concurrently, while writes
+# run one at a time, in order, and act as barriers between read runs.
+# ----------------------------------------------------------------------
+BATCH_MAX_REQUESTS = int(os.environ.get('BATCH_MAX_REQUESTS', 20))
+BATCH_MAX_WORKERS = int(os.environ.get('BATCH_MAX_WORKERS', 4))
+BATCH_ALLOWED_METHODS = {'GET', 'POST', 'PUT', 'DELETE'}
+BATCH_FORWARDED_HEADERS = ('Authorization', 'Cookie')
+
+def dispatch_sub_request(method, path, body, headers):
+    """
+    Runs one sub-request through the full Flask dispatch (before/after hooks,
+    error handlers, teardown) in its own app and request context.
+    Returns a dict with the sub-request's status code and parsed body.
+    """
+    builder = EnvironBuilder(
+        path=path,
+        method=method,
+        json=body if body is not None and method != 'GET' else None,
+        headers=headers
+    )
+    try:
+        environ = builder.get_environ()
+    finally:
+        builder.close()
+
+    try:
+        with app.app_context(), app.request_context(environ):
+            response = app.full_dispatch_request()
+            if response.is_json:
+                response_body = response.get_json(silent=True)
+            else:
+                # Binary/file responses are not inlined into the batch envelope
+                response_body = None
+            return {"status": response.status_code, "body": response_body}
+    except Exception as e:
+        traceback.print_exc()
+        print(f"General Error in batch sub-request {method} {path}: {e}")
+        return {"status": 500, "body": {"status": "error", "message": "An unexpected server error occurred."}}
+
+@app.route('/api/batch', methods=['POST'])
+@authenticate_request()
+def batch_requests():
+    """
+    Endpoint 27.0: Executes an array of sub-requests and returns their results in order.
+
+    Expected JSON Payload:
+    {
+        "requests": [
+            {"id": "app", "method": "GET", "path": "/api/application/<uuid>"},
+            {"id": "docs", "method": "GET", "path": "/api/documents/all"}
+        ]
+    }
+    """
+    try:
+        data = request.get_json(silent=False)
+    except BadRequest:
+        return jsonify({"status": "error", "message": "Request body must be valid JSON."}), 400
+
+    sub_requests = data.get('requests') if isinstance(data, dict) else None
+    if not isinstance(sub_requests, list) or not sub_requests:
+        return jsonify({"status": "error", "message": "Field 'requests' must be a non-empty array."}), 400
+    if len(sub_requests) > BATCH_MAX_REQUESTS:
+        return jsonify({"status": "error", "message": f"A batch may contain at most {BATCH_MAX_REQUESTS} requests."}), 400
+
+    # 1. Validate every sub-request up front so a bad entry fails the batch before anything runs
+    normalized = []
+    for index, item in enumerate(sub_requests):
+        if not isinstance(item, dict):
+            return jsonify({"status": "error", "message": f"Request #{index} must be an object."}), 400
+        method = str(item.get('method', 'GET')).upper()
+        path = item.get('path')
+        if method not in BATCH_ALLOWED_METHODS:
+            return jsonify({"status": "error", "message": f"Request #{index}: unsupported method '{method}'."}), 400
+        if not isinstance(path, str) or not path.startswith('/api/') or path.split('?')[0].rstrip('/') == '/api/batch':
+            return jsonify({"status": "error", "message": f"Request #{index}: 'path' must be an /api/ path other than /api/batch."}), 400
+        normalized.append({
+            "id": item.get('id', index),
+            "method": method,
+            "path": path,
+            "body": item.get('body')
+        })
+
+    headers = {name: request.headers[name] for name in BATCH_FORWARDED_HEADERS if name in request.headers}
+
+    # 2. Execute: consecutive GETs form a concurrent run; any write flushes the run and executes alone
+    results = [None] * len(normalized)
+
+    def run_one(index):
+        sub = normalized[index]
+        results[index] = dispatch_sub_request(sub['method'], sub['path'], sub['body'], headers)
+
+    with ThreadPoolExecutor(max_workers=min(BATCH_MAX_WORKERS, DB_POOL_MAX)) as executor:
+        def flush_reads(run):
+            if len(run) == 1:
+                run_one(run[0])  # No point handing a lone read to another thread
+            elif run:
+                list(executor.map(run_one, run))
+
+        read_run = []
+        for index, sub in enumerate(normalized):
+            if sub['method'] == 'GET':
+                read_run.append(index)
+                continue
+            flush_reads(read_run)
+            read_run = []
+            run_one(index)
+        flush_reads(read_run)
+
+    responses = [
+        {"id": sub['id'], "status": result['status'], "body": result['body']}
+        for sub, result in zip(normalized, results)
+    ]
+    return jsonify({"status": "success", "responses": responses}), 200
+
+# ----------------------------------------------------------------------
+# 28. COMPANY DETAIL COMPOSITE API: GET /api/companies/<int:company_id>/detail
+# Replaces the 4-call fan-out (endpoints 3, 5, 13, 11) when opening a company.
+# Profile and raw names come from one statement; contacts are then looked up by
+# the already-known raw names (indexed equality on contacts.company) instead of
+# re-joining company_name_mapping on the varchar key.
+# ----------------------------------------------------------------------
+COMPANY_DETAIL_SECTIONS = ('profile', 'raw_names', 'contacts', 'applications')
+
+@app.route('/api/companies/<int:company_id>/detail', methods=['GET'])
+@authenticate_request()
+def get_company_detail(company_id):
+    """
+    Endpoint 28.0: Returns the company profile, mapped raw names, contacts and the
+    user's applications for one company. ?include= selects a subset of
+    profile, raw_names, contacts, applications (default: all four).
+    The response carries a weak ETag, so an unchanged company costs a 304.
+    """
+    user_id = g.user_id
+    conn = None
+    cur = None
+
+    if company_id <= 0:
+        return jsonify({"status": "error", "message": "Invalid company ID format."}), 400
+
+    include_param = request.args.get('include', '')
+    requested = [s.strip() for s in include_param.split(',') if s.strip()] or list(COMPANY_DETAIL_SECTIONS)
+    unknown = [s for s in requested if s not in COMPANY_DETAIL_SECTIONS]
+    if unknown:
+        return jsonify({
+            "status": "error",
+            "message": f"Unknown include value(s): {', '.join(unknown)}. Allowed: {', '.join(COMPANY_DETAIL_SECTIONS)}."
+        }), 400
+    requested = set(requested)
+
+    try:
+        conn = get_db_connection()
+        if conn is None:
+            return jsonify({"status": "error", "message": "Database connection failed."}), 500
+
+        # All sections are read from one consistent snapshot so they can be cached as a unit
+        conn.set_session(isolation_level=psycopg2.extensions.ISOLATION_LEVEL_REPEATABLE_READ, readonly=True)
+        cur = get_db_cursor(conn, cursor_factory=psycopg2.extras.DictCursor)
+
+        # 1. Profile + raw names in one statement (also serves as the existence check)
+        cur.execute(
+            """
+            SELECT
+                c.company_id, c.company_name_clean, c.target_interest, c.size_employees,
+                c.annual_revenue, c.revenue_scale, c.headquarters, c.notes,
+                ARRAY(
+                    SELECT cnm.raw_name
+                    FROM company_name_mapping cnm
+                    WHERE cnm.company_id = c.company_id
+                    ORDER BY cnm.raw_name ASC
+                ) AS raw_names
+            FROM companies c
+            WHERE c.company_id = %s;
+            """,
+            (company_id,)
+        )
+        company_row = cur.fetchone()
+        if company_row is None:
+            conn.rollback()
+            return jsonify({"status": "error", "message": f"Company ID {company_id} not found."}), 404
+
+        company = dict(company_row)
+        raw_names = company.pop('raw_names') or []
+
+        response_data = {"status": "success", "company_id": company_id}
+        if 'profile' in requested:
+            response_data['company'] = company
+        if 'raw_names' in requested:
+            response_data['raw_names'] = raw_names
+
+        # 2. Contacts by raw name (skipped entirely when nothing is mapped)
+        if 'contacts' in requested:
+            contacts = []
+            if raw_names:
+                cur.execute(
+                    """
+                    SELECT
+                        t1.id AS contact_id,
+                        t1.first_name,
+                        t1.last_name,
+                        t1.email_address,
+                        t1.position,
+                        t1.connected_on,
+                        t1.url as linkedIn_url,
+                        t1.company AS associated_raw_name
+                    FROM contacts t1
+                    WHERE t1.company = ANY(%s);
+                    """,
+                    (raw_names,)
+                )
+                contacts = [dict(row) for row in cur.fetchall()]
+            response_data['contacts'] = contacts
+
+        # 3. The user's applications for this company
+        if 'applications' in requested:
+            response_data['applications'] = fetch_company_applications(cur, company_id, user_id)
+
+        conn.commit()  # Ends the read-only snapshot
+
+        # 4. Conditional response: identical content -> 304 Not Modified
+        response = jsonify(response_data)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        response.add_etag(weak=True)
+        return response.make_conditional(request)
+
+    except psycopg2.Error as e:
+        if conn: conn.rollback()
+        db_error_detail = getattr(e.diag, 'message_primary', 'N/A')
+        print(f"PostgreSQL Error in get_company_detail: {db_error_detail}")
+        return jsonify({"status": "error", "message": f"Database error retrieving company detail: {db_error_detail}"}), 500
+
+    except Exception as e:
+        if conn: conn.rollback()
+        traceback.print_exc()
+        print(f"General Error in get_company_detail: {e}")
+        return jsonify({"status": "error", "message": "Processing error retrieving company detail."}), 500
+
+    finally:
+        if cur: cur.close()
+        if conn: conn.close()
+
+# ----------------------------------------------------------------------
+# 29. RESUMABLE UPLOAD API (chunked)
+#   29.1 POST /api/application/<uuid>/uploads             -> start a session
+#   29.2 PUT  /api/uploads/<uuid>/chunks/<int:index>       -> write one chunk (raw body)
+#   29.3 GET  /api/uploads/<uuid>                          -> received / missing chunks
+#   29.4 POST /api/uploads/<uuid>/finalize                 -> verify and create the document
+# A dropped connection only loses the chunk in flight: the client asks 29.3 which
+# chunks are missing and re-sends just those. Each chunk is one short request, so
+# no worker is held for the whole transfer. With the local backend chunks are written
+# with pwrite() at index * chunk_size into one sparse file, so they may arrive in any
+# order (or in parallel). With s3 every chunk is its own object (partial_chunk_key), so
+# no node has to see more than the chunks it received; finalize downloads and joins them.
+# ----------------------------------------------------------------------
+
+def partial_upload_path(upload_id):
+    return os.path.join(PARTIAL_UPLOAD_FOLDER, str(upload_id))
+
+def partial_upload_key(upload_id):
+    """file_deletions path of a partial file (relative to UPLOAD_FOLDER, see delete_stored_file)."""
+    return os.path.relpath(partial_upload_path(upload_id), app.config['UPLOAD_FOLDER'])
+
+def partial_chunk_key(upload_id, index):
+    """Store key of one chunk of a resumable upload (non-local backends)."""
+    return f"{partial_upload_key(upload_id)}/{index:05d}"
+
+def assemble_partial_upload(session):
+    """
+    Path of the assembled file of a complete upload session. With s3 the chunk objects are
+    joined into a new temp file in UPLOAD_FOLDER (store_local_file consumes it like the
+    local partial file).
+    """
+    if app.config['STORAGE_BACKEND'] == 'local':
+        return partial_upload_path(session['upload_id'])
+    storage = get_storage()
+    with tempfile.NamedTemporaryFile(dir=app.config['UPLOAD_FOLDER'], prefix='.upload-', delete=False) as dest:
+        try:
+            for index in range(upload_chunk_count(session['total_size'], session['chunk_size'])):
+                with storage.open(partial_chunk_key(session['upload_id'], index)) as source:
+                    shutil.copyfileobj(source, dest, DOCUMENT_READ_CHUNK_SIZE)
+        except BaseException:
+            dest.close()
+            os.remove(dest.name)
+            raise
+    return dest.name
+
+def upload_chunk_count(total_size, chunk_size):
+    return max(1, -(-total_size // chunk_size))
+
+def upload_session_status(session):
+    """JSON-ready progress of an upload_sessions row."""
+    total_chunks = upload_chunk_count(session['total_size'], session['chunk_size'])
+    received = sorted(session['received_chunks'] or [])
+    received_set = set(received)
+    return {
+        "upload_id": str(session['upload_id']),
+        "application_id": str(session['application_id']),
+        "original_filename": session['original_filename'],
+        "total_size": session['total_size'],
+        "chunk_size": session['chunk_size'],
+        "total_chunks": total_chunks,
+        "received_chunks": received,
+        "missing_chunks": [i for i in range(total_chunks) if i not in received_set],
+    }
+
+def purge_stale_upload_sessions(cur):
+    """
+    Deletes upload sessions untouched for UPLOAD_SESSION_TTL_HOURS and queues their
+    partial files in the file_deletions outbox, so the files only go if the caller's
+    transaction commits. Called when a new session starts and by 'maintenance.py gc-uploads'.
+    Returns the number of sessions removed (the caller commits).
+    """
+    cur.execute("""
+        DELETE FROM upload_sessions
+        WHERE updated_at < NOW() - make_interval(hours => %s)
+        RETURNING upload_id;
+    """, (UPLOAD_SESSION_TTL_HOURS,))
+    stale_ids = [row[0] for row in cur.fetchall()]
+    queue_file_deletions(cur, [(partial_upload_key(upload_id), None) for upload_id in stale_ids])
+    return len(stale_ids)
+
+def fetch_upload_session(cur, upload_id, user_id, lock=None):
+    """
+    The user's upload session, or None. lock: None, 'KEY SHARE' (held while a chunk is
+    written, 29.2) or 'UPDATE' (finalize, 29.4, which therefore waits for chunk writes).
+    """
+    cur.execute(
+        "SELECT * FROM upload_sessions WHERE upload_id = %s AND user_id = %s" + (f" FOR {lock};" if lock else ";"),
+        (str(upload_id), user_id)
+    )
+    return cur.fetchone()
+
+## ENDPOINT 29.1: Start a resumable upload
+@app.route('/api/application/<uuid:application_id>/uploads', methods=['POST'])
+@authenticate_request()
+def create_upload_session(application_id):
+    """
+    Endpoint 29.1: Starts a resumable upload.
+    JSON body: filename, document_type, total_size (bytes), sha256 (hex digest of the
+    whole file, verified on finalize) and optional chunk_size.
+    """
+    user_id = g.user_id
+    application_id_str = str(application_id)
+    conn = None
+    cur = None
+
+    data = request.get_json(silent=True) or {}
+    filename = secure_filename(data.get('filename') or '')
+    document_type = str(data.get('document_type') or '').upper()
+    total_size = data.get('total_size')
+    chunk_size = data.get('chunk_size') or UPLOAD_CHUNK_SIZE
+    expected_hash = str(data.get('sha256') or '').lower()
+
+    if not filename:
+        return jsonify({"status": "error", "message": "Missing required field: filename"}), 400
+    if document_type not in ['RESUME', 'COVER_LETTER', 'JOB_DESCRIPTION', 'CERTIFICATE', 'OTHER']:
+        return jsonify({"status": "error", "message": f"Invalid document_type: {data.get('document_type')}. Must be a valid ENUM value."}), 400
+    if not isinstance(total_size, int) or total_size <= 0:
+        return jsonify({"status": "error", "message": "total_size must be a positive integer (bytes)."}), 400
+    if total_size > app.config['MAX_UPLOAD_SIZE']:
+        return jsonify({"status": "error", "message": f"File exceeds the maximum upload size of {app.config['MAX_UPLOAD_SIZE']} bytes."}), 413
+    if not isinstance(chunk_size, int) or not 0 < chunk_size <= UPLOAD_CHUNK_SIZE_MAX:
+        return jsonify({"status": "error", "message": f"chunk_size must be between 1 and {UPLOAD_CHUNK_SIZE_MAX} bytes."}), 400
+    if len(expected_hash) != 64 or any(ch not in '0123456789abcdef' for ch in expected_hash):
+        return jsonify({"status": "error", "message": "sha256 (hex digest of the whole file) is required and must be 64 hex characters."}), 400
+
+    try:
+        conn = get_db_connection()
+        if conn is None:
+            return jsonify({"status": "error", "message": "Database connection failed."}), 500
+        cur = get_db_cursor(conn, cursor_factory=psycopg2.extras.DictCursor)
+
+        # Ownership check on the target application
+        cur.execute("SELECT 1 FROM applications WHERE application_id = %s AND user_id = %s;", (application_id_str, user_id))
+        if cur.fetchone() is None:
+            return jsonify({"status": "error", "message": "Application not found or unauthorized access."}), 404
+
+        # Early quota check, so a client does not upload for minutes only to be refused on
+        # finalize (29.4 checks again, authoritatively)
+        quota_error = storage_quota_error(fetch_storage_usage(cur, user_id), total_size)
+        if quota_error:
+            return jsonify({"status": "error", "message": quota_error}), 413
+
+        # Opportunistic garbage collection of abandoned sessions
+        purged = purge_stale_upload_sessions(cur)
+        if purged:
+            print(f"DEBUG 29.1: Purged {purged} stale upload session(s).")
+
+        cur.execute("""
+            INSERT INTO upload_sessions
+                (user_id, application_id, document_type, original_filename, total_size, chunk_size, expected_hash)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            RETURNING *;
+        """, (user_id, application_id_str, document_type, filename, total_size, chunk_size, expected_hash))
+        session = cur.fetchone()
+
+        # Pre-size the (sparse) partial file so chunks can be written at any offset
+        if app.config['STORAGE_BACKEND'] == 'local':
+            with open(partial_upload_path(session['upload_id']), 'wb') as f:
+                f.truncate(total_size)
+
+        conn.commit()
+        print(f"DEBUG 29.1: Upload session {session['upload_id']} started ({total_size} bytes).")
+        return jsonify({"status": "success", **upload_session_status(session)}), 201
+
+    except psycopg2.Error as e:
+        if conn: conn.rollback()
+        db_error_detail = getattr(e.diag, 'message_primary', 'N/A')
+        print(f"PostgreSQL Error in create_upload_session: {db_error_detail}")
+        return jsonify({"status": "error", "message": f"Database error starting upload: {db_error_detail}"}), 500
+    except Exception as e:
+        if conn: conn.rollback()
+        traceback.print_exc()
+        print(f"General Error in create_upload_session: {e}")
+        return jsonify({"status": "error", "message": "Processing error starting upload."}), 500
+    finally:
+        if cur: cur.close()
+        if conn: conn.close()
+
+## ENDPOINT 29.2: Upload one chunk
+@app.route('/api/uploads/<uuid:upload_id>/chunks/<int:index>', methods=['PUT'])
+@authenticate_request()
+def upload_chunk(upload_id, index):
+    """
+    Endpoint 29.2: Writes chunk <index> (raw request body) at offset index * chunk_size.
+    Re-sending a chunk simply overwrites it, so retries are always safe.
+    """
+    user_id = g.user_id
+    conn = None
+    cur = None
+
+    try:
+        conn = get_db_connection()
+        if conn is None:
+            return jsonify({"status": "error", "message": "Database connection failed."}), 500
+        cur = get_db_cursor(conn, cursor_factory=psycopg2.extras.DictCursor)
+
+        # The row lock is held until the chunk is on disk and recorded: finalize (FOR UPDATE)
+        # waits for it, so no chunk can land in the file after it was hashed and stored.
+        # KEY SHARE rather than SHARE: chunks written in parallel each update the row,
+        # which KEY SHARE locks of the other chunks do not block (SHARE would deadlock).
+        session = fetch_upload_session(cur, upload_id, user_id, lock='KEY SHARE')
+        if session is None:
+            return jsonify({"status": "error", "message": "Upload session not found (it may have expired)."}), 404
+
+        total_chunks = upload_chunk_count(session['total_size'], session['chunk_size'])
+        if not 0 <= index < total_chunks:
+            return jsonify({"status": "error", "message": f"Chunk index must be between 0 and {total_chunks - 1}."}), 400
+        offset = index * session['chunk_size']
+        expected_length = min(session['chunk_size'], session['total_size'] - offset)
+
+        length_error = f"Chunk {index} must be exactly {expected_length} bytes."
+        if request.content_length is not None and request.content_length != expected_length:
+            return jsonify({"status": "error", "message": length_error}), 400
+
+        # Stream the body straight to its offset in the partial file (constant memory), or
+        # with s3 to a temp file that becomes the chunk's object
+        local = app.config['STORAGE_BACKEND'] == 'local'
+        written = 0
+        too_long = False
+        if local:
+            fd = os.open(partial_upload_path(upload_id), os.O_WRONLY)
+        else:
+            fd, chunk_path = tempfile.mkstemp(dir=app.config['UPLOAD_FOLDER'], prefix='.upload-')
+        try:
+            while True:
+                block = request.stream.read(MIME_SNIFF_BYTES)
+                if not block:
+                    break
+                if written + len(block) > expected_length:
+                    too_long = True
+                    break
+                os.pwrite(fd, block, (offset if local else 0) + written)
+                written += len(block)
+        finally:
+            os.close(fd)
+
+        if too_long or written != expected_length:
+            if not local:
+                os.remove(chunk_path)
+            # The chunk is not marked as received, so whatever was written gets overwritten on retry
+            return jsonify({"status": "error", "message": length_error}), 400
+        if not local:
+            # A re-sent chunk replaces its object (put_file consumes chunk_path)
+            try:
+                get_storage().put_file(partial_chunk_key(upload_id, index), chunk_path)
+            finally:
+                if os.path.exists(chunk_path):
+                    os.remove(chunk_path)
+
+        cur.execute("""
+            UPDATE upload_sessions
+            SET received_chunks = CASE WHEN %s = ANY(received_chunks) THEN received_chunks
+                                       ELSE array_append(received_chunks, %s) END,
+                updated_at = NOW()
+            WHERE upload_id = %s
+            RETURNING *;
+        """, (index, index, str(upload_id)))
+        session = cur.fetchone()
+        conn.commit()
+        if session is None:
+            # Finalized or purged while this chunk was in flight
+            return jsonify({"status": "error", "message": "Upload session not found (it may have expired)."}), 404
+
+        status = upload_session_status(session)
+        return jsonify({
+            "status": "success",
+            "upload_id": status["upload_id"],
+            "received_chunks": len(status["received_chunks"]),
+            "total_chunks": status["total_chunks"],
+        }), 200
+
+    except FileNotFoundError:
+        return jsonify({"status": "error", "message": "Upload session not found (it may have expired)."}), 404
+    except psycopg2.Error as e:
+        if conn: conn.rollback()
+        db_error_detail = getattr(e.diag, 'message_primary', 'N/A')
+        print(f"PostgreSQL Error in upload_chunk: {db_error_detail}")
+        return jsonify({"status": "error", "message": f"Database error saving chunk: {db_error_detail}"}), 500
+    except Exception as e:
+        if conn: conn.rollback()
+        traceback.print_exc()
+        print(f"General Error in upload_chunk: {e}")
+        return jsonify({"status": "error", "message": "Processing error saving chunk."}), 500
+    finally:
+        if cur: cur.close()
+        if conn: conn.close()
+
+## ENDPOINT 29.3: Upload status
+@app.route('/api/uploads/<uuid:upload_id>', methods=['GET'])
+@authenticate_request()
+def get_upload_session(upload_id):
+    """Endpoint 29.3: Lists received and missing chunks, so a client can resume."""
+    user_id = g.user_id
+    conn = None
+    cur = None
+    try:
+        conn = get_db_connection()
+        if conn is None:
+            return jsonify({"status": "error", "message": "Database connection failed."}), 500
+        cur = get_db_cursor(conn, cursor_factory=psycopg2.extras.DictCursor)
+
+        session = fetch_upload_session(cur, upload_id, user_id)
+        if session is None:
+            return jsonify({"status": "error", "message": "Upload session not found (it may have expired)."}), 404
+        return jsonify({"status": "success", **upload_session_status(session)}), 200
+
+    except psycopg2.Error as e:
+        db_error_detail = getattr(e.diag, 'message_primary', 'N/A')
+        print(f"PostgreSQL Error in get_upload_session: {db_error_detail}")
+        return jsonify({"status": "error", "message": f"Database error retrieving upload: {db_error_detail}"}), 500
+    finally:
+        if cur: cur.close()
+        if conn: conn.close()
+
+## ENDPOINT 29.4: Finalize
+@app.route('/api/uploads/<uuid:upload_id>/finalize', methods=['POST'])
+@authenticate_request()
+def finalize_upload_session(upload_id):
+    """
+    Endpoint 29.4: Checks that every chunk arrived, hashes the assembled file (verifying
+    the sha256 given at start), then stores it exactly like endpoint 9.0 and deletes
+    the session. Returns the new document_id.
+    """
+    user_id = g.user_id
+    conn = None
+    cur = None
+    partial_path = None
+    try:
+        conn = get_db_connection()
+        if conn is None:
+            return jsonify({"status": "error", "message": "Database connection failed."}), 500
+        cur = get_db_cursor(conn, cursor_factory=psycopg2.extras.DictCursor)
+
+        # Row lock: concurrent finalize calls for the same upload run one at a time
+        session = fetch_upload_session(cur, upload_id, user_id, lock='UPDATE')
+        if session is None:
+            return jsonify({"status": "error", "message": "Upload session not found (it may have expired)."}), 404
+
+        status = upload_session_status(session)
+        if status["missing_chunks"]:
+            return jsonify({
+                "status": "error",
+                "message": f"{len(status['missing_chunks'])} chunk(s) still missing.",
+                "missing_chunks": status["missing_chunks"],
+            }), 409
+
+        # One sequential read: SHA-256 of the whole file plus the head for MIME sniffing
+        partial_path = assemble_partial_upload(session)
+        sha256 = hashlib.sha256()
+        head = b''
+        size = 0
+        with open(partial_path, 'rb') as f:
+            while True:
+                block = f.read(MIME_SNIFF_BYTES)
+                if not block:
+                    break
+                if not head:
+                    head = block
+                sha256.update(block)
+                size += len(block)
+        content_hash = sha256.hexdigest()
+
+        if size != session['total_size']:
+            return jsonify({"status": "error", "message": f"Assembled file is {size} bytes, expected {session['total_size']}."}), 409
+        if session['expected_hash'] != content_hash:
+            # The data is wrong somewhere; start over rather than guess which chunk
+            cur.execute("DELETE FROM upload_sessions WHERE upload_id = %s;", (str(upload_id),))
+            queue_file_deletions(cur, [(partial_upload_key(upload_id), None)])
+            conn.commit()
+            return jsonify({"status": "error", "message": "Checksum mismatch: the upload was discarded, please upload the file again."}), 422
+
+        # Authoritative quota check (locks the usage row, see STORAGE QUOTAS). The session
+        # and its chunks are kept, so the upload can be finalized after freeing space.
+        quota_error = storage_quota_error(fetch_storage_usage(cur, user_id, for_update=True), size)
+        if quota_error:
+            conn.rollback()
+            return jsonify({"status": "error", "message": quota_error}), 413
+
+        mime_type = get_mime_detector().from_buffer(head)
+        document_id = str(uuid.uuid4())
+
+        def store_partial(key):
+            return store_local_file(key, partial_path, mime_type)
+
+        store_document(
+            cur, document_id, str(session['application_id']), session['document_type'],
+            session['original_filename'], mime_type, size, content_hash, store_partial
+        )
+        cur.execute("DELETE FROM upload_sessions WHERE upload_id = %s;", (str(upload_id),))
+        if app.config['STORAGE_BACKEND'] != 'local':
+            # The chunk objects go through the outbox; the assembled temp file is removed below
+            queue_file_deletions(cur, [(partial_upload_key(upload_id), None)])
+        conn.commit()
+
+        # Deduplicated content never consumed the partial file
+        if app.config['STORAGE_BACKEND'] == 'local' and os.path.exists(partial_path):
+            os.remove(partial_path)
+
+        print(f"DEBUG 29.4: Upload {upload_id} finalized as document {document_id}.")
+        return jsonify({
+            "status": "success",
+            "message": "Document uploaded successfully.",
+            "document_id": document_id
+        }), 201
+
+    except psycopg2.Error as e:
+        if conn: conn.rollback()
+        db_error_detail = getattr(e.diag, 'message_primary', 'N/A')
+        print(f"PostgreSQL Error in finalize_upload_session: {db_error_detail}")
+        return jsonify({"status": "error", "message": f"Database error during document save: {db_error_detail}"}), 500
+    except Exception as e:
+        if conn: conn.rollback()
+        traceback.print_exc()
+        print(f"General Error in finalize_upload_session: {e}")
+        return jsonify({"status": "error", "message": "Processing error finalizing upload."}), 500
+    finally:
+        # The assembled temp file of an s3 upload (a local partial file stays with its session)
+        if partial_path and app.config['STORAGE_BACKEND'] != 'local' and os.path.exists(partial_path):
+            os.remove(partial_path)
+        if cur: cur.close()
+        if conn: conn.close()
+
+# ----------------------------------------------------------------------
+# 30. DOCUMENT SEARCH API: GET /api/documents/search?q=...
+# Full-text search over the text worker.py extracts from the user's documents.
+# q uses web search syntax ("exact phrase", OR, -exclude). Optional filters:
+# document_type, application_id; limit (default 20, max SEARCH_MAX_RESULTS).
+# Ranking uses the GIN-indexed search_vector; snippets (ts_headline) are only
+# built for the rows actually returned.
+# ----------------------------------------------------------------------
+@app.route('/api/documents/search', methods=['GET'])
+@authenticate_request()
+def search_documents():
+    """
+    Endpoint 30.0: Ranked full-text search over the authenticated user's documents,
+    e.g. ?q=kubernetes&document_type=COVER_LETTER. Snippets are HTML-escaped, with
+    the matched words wrapped in <mark></mark>, so they can be rendered as-is.
+    """
+    user_id = g.user_id
+    conn = None
+    cur = None
+
+    query_text = (request.args.get('q') or '').strip()
+    if not query_text:
+        return jsonify({"status": "error", "message": "Missing required parameter: q"}), 400
+
+    document_type = (request.args.get('document_type') or '').upper() or None
+    application_id = request.args.get('application_id') or None
+    if application_id and not validate_uuid(application_id):
+        return jsonify({"status": "error", "message": "Invalid application_id format."}), 400
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), SEARCH_MAX_RESULTS)
+    except ValueError:
+        return jsonify({"status": "error", "message": "limit must be an integer."}), 400
+
+    try:
+        conn = get_db_connection()
+        if conn is None:
+            return jsonify({"status": "error", "message": "Database connection failed."}), 500
+        cur = get_db_cursor(conn, cursor_factory=psycopg2.extras.DictCursor)
+
+        cur.execute("""
+            WITH query AS (
+                SELECT websearch_to_tsquery(%(config)s::regconfig, %(q)s) AS tsq
+            ),
+            hits AS (
+                SELECT
+                    jd.document_id, jd.application_id, jd.document_type, jd.original_filename,
+                    jd.upload_timestamp, jd.extracted_text, a.company_id,
+                    ts_rank_cd(jd.search_vector, query.tsq) AS rank
+                FROM job_documents jd
+                JOIN applications a ON jd.application_id = a.application_id
+                CROSS JOIN query
+                -- CRITICAL SECURITY FILTER
+                WHERE a.user_id = %(user_id)s
+                  AND jd.search_vector @@ query.tsq
+                  AND (%(document_type)s::text IS NULL OR jd.document_type::text = %(document_type)s)
+                  AND (%(application_id)s::uuid IS NULL OR jd.application_id = %(application_id)s::uuid)
+                ORDER BY rank DESC, jd.upload_timestamp DESC
+                LIMIT %(limit)s
+            )
+            SELECT
+                hits.document_id, hits.application_id, hits.document_type, hits.original_filename,
+                hits.upload_timestamp, hits.company_id, c.company_name_clean, hits.rank,
+                ts_headline(%(config)s::regconfig, hits.extracted_text, query.tsq,
+                            'StartSel=\x02, StopSel=\x03, MaxFragments=2, MaxWords=25, MinWords=8, FragmentDelimiter= ... ') AS snippet
+            FROM hits
+            CROSS JOIN query
+            LEFT JOIN companies c ON hits.company_id = c.company_id
+            ORDER BY hits.rank DESC, hits.upload_timestamp DESC;
+        """, {
+            "config": SEARCH_TEXT_CONFIG,
+            "q": query_text,
+            "user_id": user_id,
+            "document_type": document_type,
+            "application_id": application_id,
+            "limit": limit,
+        })
+
+        results = []
+        for row in cur.fetchall():
+            data = dict(row)
+            data['document_id'] = str(data['document_id'])
+            data['application_id'] = str(data['application_id'])
+            data['rank'] = float(data['rank'])
+            # Escape the document text, then turn the match markers into <mark> tags
+            data['snippet'] = html.escape(data['snippet'] or '').replace('\x02', '<mark>').replace('\x03', '</mark>')
+            if isinstance(data.get('upload_timestamp'), datetime):
+                data['upload_timestamp'] = data['upload_timestamp'].isoformat()
+            results.append(data)
+
+        print(f"DEBUG 30.0: Search '{query_text}' returned {len(results)} hit(s) for user {user_id}.")
+        return jsonify({"status": "success", "query": query_text, "results": results}), 200
+
+    except psycopg2.Error as e:
+        db_error_detail = getattr(e.diag, 'message_primary', 'N/A')
+        print(f"PostgreSQL Error in search_documents: {db_error_detail}")
+        return jsonify({"status": "error", "message": f"Database error during search: {db_error_detail}"}), 500
+    except Exception as e:
+        traceback.print_exc()
+        print(f"General Error in search_documents: {e}")
+        return jsonify({"status": "error", "message": "Processing error during search."}), 500
+    finally:
+        if cur: cur.close()
+        if conn: conn.close()
+
+# ----------------------------------------------------------------------
+# 31. DOCUMENT ARCHIVE API (ZIP export)
+#   31.1 GET /api/application/<uuid:application_id>/documents/archive
+#   31.2 GET /api/companies/<int:company_id>/documents/archive
+# One ownership-checked query selects the documents; the ZIP is then built on the
+# fly while it is sent, one file at a time, so nothing is staged on disk and only
+# a single read chunk is held in memory. Entries use original_filename; duplicate
+# names get " (2)", " (3)", ... appended. Company archives have one folder per
+# application. PDF/DOCX are already compressed and are stored as-is.
+# ----------------------------------------------------------------------
+
+ARCHIVE_READ_CHUNK_SIZE = 256 * 1024
+ARCHIVE_STORED_EXTENSIONS = {'.pdf', '.docx', '.zip', '.png', '.jpg', '.jpeg'}
+
+class ZipStreamWriter:
+    """
+    Write-only file object for zipfile.ZipFile. It has no seek()/tell(), so ZipFile
+    writes each entry's sizes in a trailing data descriptor instead of seeking back,
+    and every byte written can be handed to the client straight away (drain()).
+    """
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def write(self, data):
+        self.buffer += data
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+def archive_safe_name(name, fallback):
+    """Strips path separators and control characters so an entry can't escape its folder."""
+    name = ''.join(ch for ch in (name or '') if ch.isprintable()).replace('/', '_').replace('\\', '_').strip(' .')
+    return name or fallback
+
+def unique_archive_name(folder, filename, used_names):
+    """Returns folder/filename, adding " (n)" before the extension until it is unused (case-insensitive)."""
+    stem, extension = os.path.splitext(filename)
+    candidate = filename
+    counter = 2
+    while f"{folder}{candidate}".lower() in used_names:
+        candidate = f"{stem} ({counter}){extension}"
+        counter += 1
+    arcname = f"{folder}{candidate}"
+    used_names.add(arcname.lower())
+    return arcname
+
+def generate_document_archive(documents, group_by_application=False):
+    """
+    Yields the ZIP archive for the given job_documents rows chunk by chunk.
+    Files missing on disk are skipped and listed in MISSING_FILES.txt.
+    """
+    writer = ZipStreamWriter()
+    used_names = set()
+    missing = []
+
+    with zipfile.ZipFile(writer, 'w', allowZip64=True) as archive:
+        for doc in documents:
+            folder = ''
+            if group_by_application:
+                folder_name = f"{doc['job_title'] or 'Application'} ({doc['date_applied'] or 'no date'})"
+                folder = archive_safe_name(folder_name, 'Application') + '/'
+            filename = archive_safe_name(doc['original_filename'], str(doc['document_id']))
+            arcname = unique_archive_name(folder, filename, used_names)
+
+            try:
+                # Original bytes, even for files compressed at rest
+                source = open_document_file(doc['file_path'], doc['storage_encoding'])
+                file_size = doc['file_size']
+                if file_size is None:  # Uploads from before migration 002 (never compressed)
+                    file_size = get_storage().stat(resolve_stored_path(doc['file_path']))
+            except OSError:
+                print(f"WARNING: Archive export: file for document {doc['document_id']} is missing from the store.")
+                missing.append(arcname)
+                continue
+
+            with source:
+                zinfo = zipfile.ZipInfo(arcname, date_time=doc['upload_timestamp'].timetuple()[:6])
+                is_stored = os.path.splitext(filename)[1].lower() in ARCHIVE_STORED_EXTENSIONS
+                zinfo.compress_type = zipfile.ZIP_STORED if is_stored else zipfile.ZIP_DEFLATED
+                # Lets zipfile decide on ZIP64 headers up front (files > 4 GiB)
+                zinfo.file_size = file_size
+                with archive.open(zinfo, 'w') as entry:
+                    while True:
+                        chunk = source.read(ARCHIVE_READ_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        entry.write(chunk)
+                        data = writer.drain()
+                        if data:
+                            yield data
+            yield writer.drain()
+
+        if missing:
+            archive.writestr('MISSING_FILES.txt',
+                             "These documents could not be found on the server:\n" + "\n".join(missing) + "\n")
+    # Central directory, written when the archive is closed
+    yield writer.drain()
+
+def document_archive_response(documents, archive_name, group_by_application=False):
+    response = app.response_class(
+        generate_document_archive(documents, group_by_application),
+        mimetype='application/zip'
+    )
+    response.headers.set('Content-Disposition', 'attachment',
+                         filename=secure_filename(archive_name) or 'documents.zip')
+    # Private, generated per request
+    response.cache_control.private = True
+    response.cache_control.no_store = True
+    return response
+
+## ENDPOINT 31.1: All documents of one application
+@app.route('/api/application/<uuid:application_id>/documents/archive', methods=['GET'])
+@authenticate_request()
+def download_application_archive(application_id):
+    """
+    Endpoint 31.1: Streams a ZIP of every document attached to one application.
+    """
+    user_id = g.user_id
+    conn = None
+    cur = None
+
+    try:
+        conn = get_db_connection()
+        if conn is None:
+            return jsonify({"status": "error", "message": "Database connection failed."}), 500
+        cur = get_db_cursor(conn, cursor_factory=psycopg2.extras.DictCursor)
+
+        # Ownership check and document list in one query
+        cur.execute("""
+            SELECT jd.document_id, jd.original_filename, jd.file_path, jd.upload_timestamp,
+                   jd.file_size, jd.storage_encoding, c.company_name_clean, jt.title_name AS job_title
+            FROM job_documents jd
+            JOIN applications a ON jd.application_id = a.application_id
+            LEFT JOIN companies c ON a.company_id = c.company_id
+            LEFT JOIN job_titles jt ON a.job_title_id = jt.job_title_id
+            -- CRITICAL SECURITY FILTER
+            WHERE jd.application_id = %s AND a.user_id = %s
+            ORDER BY jd.upload_timestamp, jd.document_id;
+        """, (str(application_id), user_id))
+        documents = cur.fetchall()
+
+        if not documents:
+            return jsonify({"status": "error", "message": "Application not found, unauthorized, or it has no documents."}), 404
+
+        first = documents[0]
+        archive_name = f"{first['company_name_clean'] or 'application'} {first['job_title'] or ''} documents.zip"
+        print(f"DEBUG 31.1: Streaming archive of {len(documents)} document(s) for application {application_id}.")
+        # The connection is released here; the archive is streamed without holding it
+        return document_archive_response(documents, archive_name)
+
+    except psycopg2.Error as e:
+        db_error_detail = getattr(e.diag, 'message_primary', 'N/A')
+        print(f"PostgreSQL Error in download_application_archive: {db_error_detail}")
+        return jsonify({"status": "error", "message": f"Database error during archive export: {db_error_detail}"}), 500
+    except Exception as e:
+        traceback.print_exc()
+        print(f"General Error in download_application_archive: {e}")
+        return jsonify({"status": "error", "message": "Processing error during archive export."}), 500
+    finally:
+        if cur: cur.close()
+        if conn: conn.close()
+
+## ENDPOINT 31.2: All documents of the user's applications to one company
+@app.route('/api/companies/<int:company_id>/documents/archive', methods=['GET'])
+@authenticate_request()
+def download_company_archive(company_id):
+    """
+    Endpoint 31.2: Streams a ZIP of the documents of every application the user made
+    to one company, with one folder per application ("<job title> (<date applied>)/").
+    """
+    user_id = g.user_id
+    conn = None
+    cur = None
+
+    try:
+        conn = get_db_connection()
+        if conn is None:
+            return jsonify({"status": "error", "message": "Database connection failed."}), 500
+        cur = get_db_cursor(conn, cursor_factory=psycopg2.extras.DictCursor)
+
+        cur.execute("""
+            SELECT jd.document_id, jd.original_filename, jd.file_path, jd.upload_timestamp,
+                   jd.file_size, jd.storage_encoding, a.date_applied, jt.title_name AS job_title, c.company_name_clean
+            FROM job_documents jd
+            JOIN applications a ON jd.application_id = a.application_id
+            LEFT JOIN companies c ON a.company_id = c.company_id
+            LEFT JOIN job_titles jt ON a.job_title_id = jt.job_title_id
+            -- CRITICAL SECURITY FILTER
+            WHERE a.company_id = %s AND a.user_id = %s
+            ORDER BY a.date_applied DESC NULLS LAST, a.application_id, jd.upload_timestamp, jd.document_id;
+        """, (company_id, user_id))
+        documents = cur.fetchall()
+
+        if not documents:
+            return jsonify({"status": "error", "message": "No documents found for this company."}), 404
+
+        archive_name = f"{documents[0]['company_name_clean'] or 'company'} documents.zip"
+        print(f"DEBUG 31.2: Streaming archive of {len(documents)} document(s) for company {company_id}.")
+        return document_archive_response(documents, archive_name, group_by_application=True)
+
+    except psycopg2.Error as e:
+        db_error_detail = getattr(e.diag, 'message_primary', 'N/A')
+        print(f"PostgreSQL Error in download_company_archive: {db_error_detail}")
+        return jsonify({"status": "error", "message": f"Database error during archive export: {db_error_detail}"}), 500
+    except Exception as e:
+        traceback.print_exc()
+        print(f"General Error in download_company_archive: {e}")
+        return jsonify({"status": "error", "message": "Processing error during archive export."}), 500
+    finally:
+        if cur: cur.close()
+        if conn: conn.close()
+
+# ----------------------------------------------------------------------
+# 32. FILESTORE INTEGRITY API: GET /api/filestore/integrity
+# Metrics of the background scrubber (`maintenance.py scrub`, migration 008):
+# how many documents are verified / ok / corrupt / missing / not checked yet,
+# progress of the latest scrub run, and the user's own documents that failed
+# verification (so they can be re-uploaded).
+# ----------------------------------------------------------------------
+INTEGRITY_PROBLEMS_LIMIT = 100
+
+def isoformat_or_none(value):
+    return value.isoformat() if value else None
+
+@app.route('/api/filestore/integrity', methods=['GET'])
+@authenticate_request()
+def get_filestore_integrity():
+    """
+    Endpoint 32.0: Filestore integrity summary. Counts cover the whole filestore;
+    'problems' lists only the authenticated user's documents.
+    """
+    user_id = g.user_id
+    conn = None
+    cur = None
+
+    try:
+        conn = get_db_connection()
+        if conn is None:
+            return jsonify({"status": "error", "message": "Database connection failed."}), 500
+        cur = get_db_cursor(conn, cursor_factory=psycopg2.extras.DictCursor)
+
+        cur.execute("""
+            SELECT
+                COUNT(*) AS documents,
+                COUNT(*) FILTER (WHERE integrity_status = 'ok') AS ok,
+                COUNT(*) FILTER (WHERE integrity_status = 'corrupt') AS corrupt,
+                COUNT(*) FILTER (WHERE integrity_status = 'missing') AS missing,
+                COUNT(*) FILTER (WHERE integrity_status IS NULL) AS unverified,
+                COUNT(*) FILTER (WHERE content_hash IS NULL) AS without_checksum,
+                MIN(verified_at) AS oldest_verification
+            FROM job_documents;
+        """)
+        summary = dict(cur.fetchone())
+        summary['oldest_verification'] = isoformat_or_none(summary['oldest_verification'])
+
+        cur.execute("""
+            SELECT run_id, started_at, updated_at, finished_at, files_checked, bytes_checked,
+                   corrupt_files, missing_files
+            FROM scrub_runs
+            ORDER BY run_id DESC
+            LIMIT 1;
+        """)
+        run = cur.fetchone()
+        last_run = None
+        if run:
+            last_run = dict(run)
+            for key in ('started_at', 'updated_at', 'finished_at'):
+                last_run[key] = isoformat_or_none(last_run[key])
+
+        # Uses the partial index idx_job_documents_integrity_problems
+        cur.execute("""
+            SELECT jd.document_id::text, jd.application_id::text, jd.original_filename,
+                   jd.integrity_status, jd.verified_at
+            FROM job_documents jd
+            JOIN applications a ON jd.application_id = a.application_id
+            -- CRITICAL SECURITY FILTER
+            WHERE a.user_id = %s AND jd.integrity_status <> 'ok'
+            ORDER BY jd.verified_at DESC
+            LIMIT %s;
+        """, (user_id, INTEGRITY_PROBLEMS_LIMIT))
+        problems = []
+        for row in cur.fetchall():
+            problem = dict(row)
+            problem['verified_at'] = isoformat_or_none(problem['verified_at'])
+            problems.append(problem)
+
+        return jsonify({
+            "status": "success",
+            "integrity": summary,
+            "last_run": last_run,
+            "problems": problems
+        }), 200
+
+    except psycopg2.Error as e:
+        db_error_detail = getattr(e.diag, 'message_primary', 'N/A')
+        print(f"PostgreSQL Error in get_filestore_integrity: {db_error_detail}")
+        return jsonify({"status": "error", "message": f"Database error reading integrity status: {db_error_detail}"}), 500
+    except Exception as e:
+        traceback.print_exc()
+        print(f"General Error in get_filestore_integrity: {e}")
+        return jsonify({"status": "error", "message": "Processing error reading integrity status."}), 500
+    finally:
+        if cur: cur.close()
+        if conn: conn.close()
+
+# ----------------------------------------------------------------------
+# 33. STORAGE USAGE API: GET /api/storage/usage
+# The user's stored bytes and documents against their quota, in total and per
+# application. Read from the trigger-maintained counters (migration 009): no
+# file is stat-ed and job_documents is not scanned.
+# ----------------------------------------------------------------------
+@app.route('/api/storage/usage', methods=['GET'])
+@authenticate_request()
+def get_storage_usage():
+    """
+    Endpoint 33.0: Storage usage of the authenticated user. quota_bytes / file_quota
+    of 0 mean unlimited.
+    """
+    user_id = g.user_id
+    conn = None
+    cur = None
+
+    try:
+        conn = get_db_connection()
+        if conn is None:
+            return jsonify({"status": "error", "message": "Database connection failed."}), 500
+        cur = get_db_cursor(conn, cursor_factory=psycopg2.extras.DictCursor)
+
+        usage = fetch_storage_usage(cur, user_id)
+
+        cur.execute("""
+            SELECT u.application_id::text, u.file_count, u.total_bytes,
+                   c.company_name_clean, jt.title_name AS job_title
+            FROM application_storage_usage u
+            JOIN applications a ON u.application_id = a.application_id
+            LEFT JOIN companies c ON a.company_id = c.company_id
+            LEFT JOIN job_titles jt ON a.job_title_id = jt.job_title_id
+            WHERE u.user_id = %s
+            ORDER BY u.total_bytes DESC;
+        """, (user_id,))
+        applications = [dict(row) for row in cur.fetchall()]
+
+        return jsonify({
+            "status": "success",
+            "usage": usage,
+            "applications": applications
+        }), 200
+
+    except psycopg2.Error as e:
+        db_error_detail = getattr(e.diag, 'message_primary', 'N/A')
+        print(f"PostgreSQL Error in get_storage_usage: {db_error_detail}")
+        return jsonify({"status": "error", "message": f"Database error reading storage usage: {db_error_detail}"}), 500
+    except Exception as e:
+        traceback.print_exc()
+        print(f"General Error in get_storage_usage: {e}")
+        return jsonify({"status": "error", "message": "Processing error reading storage usage."}), 500
+    finally:
+        if cur: cur.close()
+        if conn: conn.close()
+
+# ----------------------------------------------------------------------
+# 34. BACKGROUND JOB API (queue: migration 010, runner: `worker.py --jobs`)
+#   34.1 POST /api/jobs                  -> queue a job (202 Accepted)
+#   34.2 GET  /api/jobs                  -> the user's recent jobs + queue summary
+#   34.3 GET  /api/jobs/<job_id>         -> status of one job
+#   34.4 POST /api/jobs/<job_id>/cancel  -> cancel a job that has not started yet
+# ----------------------------------------------------------------------
+JOB_COLUMNS = """
+    job_id, job_type, status, priority, attempts, max_attempts, payload, result, last_error,
+    created_at, run_at, started_at, finished_at
+"""
+
+def job_to_dict(row):
+    job = dict(row)
+    for key in ('created_at', 'run_at', 'started_at', 'finished_at'):
+        job[key] = isoformat_or_none(job[key])
+    return job
+
+@app.route('/api/jobs', methods=['POST'])
+@authenticate_request()
+def create_job():
+    """
+    Endpoint 34.1: Queues a background job.
+    JSON body: {"job_type": "...", "payload": {...}, "priority": 0, "delay_seconds": 0}
+    A job of the same kind that the user already has queued or running is returned
+    instead of queuing a duplicate.
+    """
+    user_id = g.user_id
+    data = request.get_json(silent=True) or {}
+    job_type = data.get('job_type')
+    payload = data.get('payload') or {}
+    priority = data.get('priority', 0)
+    delay_seconds = data.get('delay_seconds', 0)
+
+    if job_type not in API_JOB_TYPES:
+        return jsonify({"status": "error", "message": f"Unknown job_type. Allowed: {', '.join(sorted(API_JOB_TYPES))}."}), 400
+    if not isinstance(payload, dict):
+        return jsonify({"status": "error", "message": "payload must be a JSON object."}), 400
+    if not isinstance(priority, int) or not JOB_PRIORITY_MIN <= priority <= JOB_PRIORITY_MAX:
+        return jsonify({"status": "error", "message": f"priority must be an integer from {JOB_PRIORITY_MIN} to {JOB_PRIORITY_MAX}."}), 400
+    if not isinstance(delay_seconds, int) or delay_seconds < 0:
+        return jsonify({"status": "error", "message": "delay_seconds must be a non-negative integer."}), 400
+
+    conn = None
+    cur = None
+
+    try:
+        conn = get_db_connection()
+        if conn is None:
+            return jsonify({"status": "error", "message": "Database connection failed."}), 500
+        cur = get_db_cursor(conn, cursor_factory=psycopg2.extras.DictCursor)
+
+        # Only pass on the payload keys each job type understands. Duplicates are only
+        # folded per user, so the job returned is always one the caller can read (34.3).
+        if job_type == 'reextract_documents':
+            application_id = str(payload.get('application_id') or '')
+            if not validate_uuid(application_id):
+                return jsonify({"status": "error", "message": "payload.application_id must be a valid application ID."}), 400
+            # CRITICAL SECURITY CHECK: only the owner may re-extract an application's documents
+            cur.execute("SELECT 1 FROM applications WHERE application_id = %s AND user_id = %s;", (application_id, user_id))
+            if cur.fetchone() is None:
+                return jsonify({"status": "error", "message": "Application not found or unauthorized."}), 404
+            payload = {"application_id": application_id}
+            dedupe_key = f"{user_id}:{application_id}"
+        else:
+            payload = {}
+            dedupe_key = f"{user_id}:{job_type}"
+
+        job_id, created = enqueue_job(
+            cur, job_type, payload, priority=priority, max_attempts=API_JOB_TYPES[job_type],
+            delay_seconds=delay_seconds, dedupe_key=dedupe_key, user_id=user_id
+        )
+        cur.execute(f"SELECT {JOB_COLUMNS} FROM background_jobs WHERE job_id = %s;", (job_id,))
+        job = job_to_dict(cur.fetchone())
+        conn.commit()
+
+        print(f"DEBUG: Job {job_id} ({job_type}) {'queued' if created else 'already queued or running'}")
+        response = jsonify({
+            "status": "success",
+            "message": "Job queued." if created else "An identical job is already queued or running.",
+            "job": job
+        })
+        response.status_code = 202
+        response.headers['Location'] = f"/api/jobs/{job_id}"
+        return response
+
+    except psycopg2.Error as e:
+        if conn: conn.rollback()
+        db_error_detail = getattr(e.diag, 'message_primary', 'N/A')
+        print(f"PostgreSQL Error in create_job: {db_error_detail}")
+        return jsonify({"status": "error", "message": f"Database error queuing job: {db_error_detail}"}), 500
+    except Exception as e:
+        if conn: conn.rollback()
+        traceback.print_exc()
+        print(f"General Error in create_job: {e}")
+        return jsonify({"status": "error", "message": "Processing error queuing job."}), 500
+    finally:
+        if cur: cur.close()
+        if conn: conn.close()
+
+@app.route('/api/jobs', methods=['GET'])
+@authenticate_request()
+def list_jobs():
+    """
+    Endpoint 34.2: The user's most recent jobs (optional ?status= and ?job_type=
+    filters), plus the number of queued and running jobs per type across all users.
+    """
+    user_id = g.user_id
+    status_filter = request.args.get('status')
+    type_filter = request.args.get('job_type')
+    conn = None
+    cur = None
+
+    try:
+        conn = get_db_connection()
+        if conn is None:
+            return jsonify({"status": "error", "message": "Database connection failed."}), 500
+        cur = get_db_cursor(conn, cursor_factory=psycopg2.extras.DictCursor)
+
+        # Uses idx_background_jobs_user
+        cur.execute(f"""
+            SELECT {JOB_COLUMNS}
+            FROM background_jobs
+            WHERE user_id = %s
+              AND (%s::text IS NULL OR status = %s)
+              AND (%s::text IS NULL OR job_type = %s)
+            ORDER BY job_id DESC
+            LIMIT %s;
+        """, (user_id, status_filter, status_filter, type_filter, type_filter, JOB_LIST_LIMIT))
+        jobs = [job_to_dict(row) for row in cur.fetchall()]
+
+        # Both partial indexes (queued / running) keep this cheap however long the history is
+        cur.execute("""
+            SELECT job_type,
+                   COUNT(*) FILTER (WHERE status = 'queued') AS queued,
+                   COUNT(*) FILTER (WHERE status = 'queued' AND run_at <= NOW()) AS due,
+                   COUNT(*) FILTER (WHERE status = 'running') AS running
+            FROM background_jobs
+            WHERE status IN ('queued', 'running')
+            GROUP BY job_type
+            ORDER BY job_type;
+        """)
+        queue = [dict(row) for row in cur.fetchall()]
+
+        return jsonify({"status": "success", "jobs": jobs, "queue": queue}), 200
+
+    except psycopg2.Error as e:
+        db_error_detail = getattr(e.diag, 'message_primary', 'N/A')
+        print(f"PostgreSQL Error in list_jobs: {db_error_detail}")
+        return jsonify({"status": "error", "message": f"Database error reading jobs: {db_error_detail}"}), 500
+    except Exception as e:
+        traceback.print_exc()
+        print(f"General Error in list_jobs: {e}")
+        return jsonify({"status": "error", "message": "Processing error reading jobs."}), 500
+    finally:
+        if cur: cur.close()
+        if conn: conn.close()
+
+@app.route('/api/jobs/<int:job_id>', methods=['GET'])
+@authenticate_request()
+def get_job(job_id):
+    """Endpoint 34.3: Status of one of the user's jobs (poll the Location returned by 34.1)."""
+    user_id = g.user_id
+    conn = None
+    cur = None
+
+    try:
+        conn = get_db_connection()
+        if conn is None:
+            return jsonify({"status": "error", "message": "Database connection failed."}), 500
+        cur = get_db_cursor(conn, cursor_factory=psycopg2.extras.DictCursor)
+
+        cur.execute(f"SELECT {JOB_COLUMNS} FROM background_jobs WHERE job_id = %s AND user_id = %s;", (job_id, user_id))
+        row = cur.fetchone()
+        if row is None:
+            return jsonify({"status": "error", "message": "Job not found or unauthorized."}), 404
+
+        return jsonify({"status": "success", "job": job_to_dict(row)}), 200
+
+    except psycopg2.Error as e:
+        db_error_detail = getattr(e.diag, 'message_primary', 'N/A')
+        print(f"PostgreSQL Error in get_job: {db_error_detail}")
+        return jsonify({"status": "error", "message": f"Database error reading job: {db_error_detail}"}), 500
+    except Exception as e:
+        traceback.print_exc()
+        print(f"General Error in get_job: {e}")
+        return jsonify({"status": "error", "message": "Processing error reading job."}), 500
+    finally:
+        if cur: cur.close()
+        if conn: conn.close()
+
+@app.route('/api/jobs/<int:job_id>/cancel', methods=['POST'])
+@authenticate_request()
+def cancel_job(job_id):
+    """
+    Endpoint 34.4: Cancels a queued job (including one waiting for a retry).
+    A job that a runner has already claimed cannot be cancelled (409).
+    """
+    user_id = g.user_id
+    conn = None
+    cur = None
+
+    try:
+        conn = get_db_connection()
+        if conn is None:
+            return jsonify({"status": "error", "message": "Database connection failed."}), 500
+        cur = get_db_cursor(conn, cursor_factory=psycopg2.extras.DictCursor)
+
+        # A runner claims with SKIP LOCKED and re-checks status, so either the claim or the cancel wins
+        cur.execute(f"""
+            UPDATE background_jobs
+            SET status = 'cancelled', finished_at = NOW()
+            WHERE job_id = %s AND user_id = %s AND status = 'queued'
+            RETURNING {JOB_COLUMNS};
+        """, (job_id, user_id))
+        row = cur.fetchone()
+        if row is None:
+            cur.execute("SELECT status FROM background_jobs WHERE job_id = %s AND user_id = %s;", (job_id, user_id))
+            current = cur.fetchone()
+            conn.rollback()
+            if current is None:
+                return jsonify({"status": "error", "message": "Job not found or unauthorized."}), 404
+            return jsonify({"status": "error", "message": f"Job is {current['status']} and can no longer be cancelled."}), 409
+        conn.commit()
+
+        print(f"DEBUG: Job {job_id} cancelled")
+        return jsonify({"status": "success", "message": "Job cancelled.", "job": job_to_dict(row)}), 200
+
+    except psycopg2.Error as e:
+        if conn: conn.rollback()
+        db_error_detail = getattr(e.diag, 'message_primary', 'N/A')
+        print(f"PostgreSQL Error in cancel_job: {db_error_detail}")
+        return jsonify({"status": "error", "message": f"Database error cancelling job: {db_error_detail}"}), 500
+    except Exception as e:
+        if conn: conn.rollback()
+        traceback.print_exc()
+        print(f"General Error in cancel_job: {e}")
+        return jsonify({"status": "error", "message": "Processing error cancelling job."}), 500
+    finally:
+        if cur: cur.close()
+        if conn: conn.close()
+
+# ----------------------------------------------------------------------
+# 35. APPLICATION CHANGE FEED: GET /api/applications/changes?since=<cursor>
+# Incremental sync for clients that keep a local copy of /api/applications/all (22.0).
+# Changes are recorded by triggers on applications / job_documents (migration 012).
+#   no since, or a cursor older than the retention -> "reset": true and the full list
+#   since=<cursor> -> only what changed since that cursor:
+#     applications: changed applications, 22.0 shape incl. their documents (replace)
+#     documents:    changed documents of otherwise unchanged applications (upsert)
+#     deleted:      {"applications": [ids], "documents": [ids]} tombstones
+# Every response carries the cursor for the next call. A change can be sent twice
+# (its transaction was still running at the previous call); applying it is idempotent.
+# Company / job title names and contact counts are copied into the rows but are not
+# tracked as changes; clients resync in full from time to time to refresh them.
+# ----------------------------------------------------------------------
+CHANGE_CURSOR_MAX_DIGITS = 20  # xid8 is a 64-bit unsigned integer
+
+@app.route('/api/applications/changes', methods=['GET'])
+@authenticate_request()
+def get_application_changes():
+    """
+    Endpoint 35.0: Applications and documents created, updated or deleted since ?since=.
+    Steady state (nothing changed) is a response with empty lists and the same cursor.
+    """
+    user_id = g.user_id
+    since = request.args.get('since')
+    conn = None
+    cur = None
+
+    if since is not None and not (since.isdigit() and len(since) <= CHANGE_CURSOR_MAX_DIGITS):
+        return jsonify({"status": "error", "message": "since must be a cursor returned by this endpoint."}), 400
+
+    try:
+        conn = get_db_connection()
+        if conn is None:
+            return jsonify({"status": "error", "message": "Database connection failed."}), 500
+        cur = get_db_cursor(conn, cursor_factory=psycopg2.extras.DictCursor)
+
+        # The next cursor is taken before anything is read: every transaction that commits
+        # after this point has a txid at or above it and is in the next delta, even if the
+        # reads below already see its rows.
+        cur.execute("""
+            SELECT pg_snapshot_xmin(pg_current_snapshot())::text AS cursor,
+                   %s::xid8 <= purged_through AS expired
+            FROM application_change_horizon;
+        """, (since or '0',))
+        horizon = cur.fetchone()
+        next_cursor = horizon['cursor']
+
+        if since is None or horizon['expired']:
+            applications = fetch_user_applications(cur, user_id)
+            print(f"DEBUG 35.0: Full sync for User ID {user_id} ({len(applications)} applications), cursor {next_cursor}")
+            return jsonify({
+                "status": "success",
+                "cursor": next_cursor,
+                "reset": True,
+                "applications": applications,
+                "documents": [],
+                "deleted": {"applications": [], "documents": []},
+            }), 200
+
+        cur.execute("""
+            SELECT DISTINCT entity, entity_id
+            FROM application_changes
+            WHERE user_id = %s AND txid >= %s::xid8;
+        """, (user_id, since))
+        changed = {'application': set(), 'document': set()}
+        for row in cur.fetchall():
+            changed[row['entity']].add(str(row['entity_id']))
+
+        applications = []
+        if changed['application']:
+            applications = fetch_user_applications(cur, user_id, application_ids=changed['application'])
+        returned_applications = {app['application_id'] for app in applications}
+
+        documents = []
+        if changed['document']:
+            cur.execute("""
+                SELECT jd.document_id, jd.application_id, jd.document_type, jd.file_path, jd.original_filename
+                FROM job_documents jd
+                JOIN applications a ON a.application_id = jd.application_id
+                WHERE a.user_id = %s AND jd.document_id = ANY(%s::uuid[]);
+            """, (user_id, list(changed['document'])))
+            for row in cur.fetchall():
+                doc = dict(row)
+                doc['document_id'] = str(doc['document_id'])
+                doc['application_id'] = str(doc['application_id'])
+                documents.append(doc)
+        found_documents = {doc['document_id'] for doc in documents}
+        # Documents of replaced applications are already nested in them
+        documents = [doc for doc in documents if doc['application_id'] not in returned_applications]
+
+        deleted = {
+            "applications": sorted(changed['application'] - returned_applications),
+            "documents": sorted(changed['document'] - found_documents),
+        }
+
+        print(f"DEBUG 35.0: Delta for User ID {user_id} since {since}: {len(applications)} application(s), "
+              f"{len(documents)} document(s), {len(deleted['applications']) + len(deleted['documents'])} tombstone(s)")
+        return jsonify({
+            "status": "success",
+            "cursor": next_cursor,
+            "reset": False,
+            "applications": applications,
+            "documents": documents,
+            "deleted": deleted,
+        }), 200
+
+    except psycopg2.Error as e:
+        db_error_detail = getattr(e.diag, 'message_primary', 'N/A')
+        print(f"[DB ERROR] PostgreSQL Error in get_application_changes: {db_error_detail}")
+        return jsonify({"status": "error", "message": "Database error retrieving application changes."}), 500
+    except Exception as e:
+        traceback.print_exc()
+        print(f"[GENERAL ERROR] in get_application_changes: {e}")
+        return jsonify({"status": "error", "message": "An unexpected server error occurred."}), 500
+    finally:
+        if cur: cur.close()
+        if conn: conn.close()
+
+# ----------------------------------------------------------------------
+# 36. LIVE EVENTS API (Server-Sent Events): GET /api/events
+# Pushes compact change events to the user's open dashboards instead of having them poll:
+#   event: application | document   data: {"ids": [...]}   (the user's own rows)
+#   event: company                  data: {"ids": [...]}   (company created / updated /
+#                                                            mapped; sent to everyone)
+#   event: resync                   data: {}               (events may have been lost)
+# "ids" is null when too many rows changed at once. Events only say what changed; the
+# client fetches the data through the change feed (35.0), which also covers anything
+# that happened while the stream was disconnected.
+# Source: NOTIFY on DASHBOARD_EVENT_CHANNEL (migration 013). Each process holds ONE
+# LISTEN connection and fans the notifications out to its streams.
+# Served by gunicorn's gevent worker (contact_db_events.service, nginx location
+# /api/events): an open stream is a greenlet waiting on a queue, not a pinned worker.
+# ----------------------------------------------------------------------
+class DashboardEventHub:
+    """
+    Per-process LISTEN connection plus one queue per open stream. Written with plain
+    threading / queue / select: gevent's monkey-patching turns them into greenlets and
+    cooperative waits, and under the threaded dev server they work as they are.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._streams = {}  # queue -> user_id
+        self._listener = None
+        self._listener_pid = None
+
+    def subscribe(self, user_id):
+        events = queue.Queue(maxsize=LIVE_EVENT_QUEUE_SIZE)
+        with self._lock:
+            self._streams[events] = str(user_id)
+            # Started on first use, in the worker process (not in the gunicorn master),
+            # and again should the previous listener thread have died
+            if self._listener is None or self._listener_pid != os.getpid() or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name='dashboard-events', daemon=True)
+                self._listener_pid = os.getpid()
+                self._listener.start()
+        return events
+
+    def unsubscribe(self, events):
+        with self._lock:
+            self._streams.pop(events, None)
+
+    def publish(self, event, user_id=None):
+        """Queues the event for the user's streams, or for every stream if user_id is None."""
+        with self._lock:
+            targets = [q for q, owner in self._streams.items() if user_id is None or owner == user_id]
+        for events in targets:
+            try:
+                events.put_nowait(event)
+            except queue.Full:
+                # The client stopped reading: its backlog is replaced by a single resync
+                try:
+                    while True:
+                        events.get_nowait()
+                except queue.Empty:
+                    pass
+                events.put_nowait({'type': 'resync'})
+
+    def _listen(self):
+        backoff = 1
+        connected_before = False
+        while True:
+            conn = None
+            try:
+                # Its own connection, not a pooled one: it is held for the life of the process
+                conn = psycopg2.connect(**DB_CONFIG)
+                conn.autocommit = True
+                conn.cursor().execute(f"LISTEN {DASHBOARD_EVENT_CHANNEL};")
+                if connected_before:
+                    # Notifications sent while the connection was down are gone
+                    self.publish({'type': 'resync'})
+                connected_before = True
+                backoff = 1
+                print(f"DEBUG 36.0: Listening on {DASHBOARD_EVENT_CHANNEL} (pid {os.getpid()})")
+                while True:
+                    if select.select([conn], [], [], LIVE_EVENT_KEEPALIVE_SECONDS) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        try:
+                            event = json.loads(notify.payload)
+                        except ValueError:
+                            event = None
+                        if not isinstance(event, dict):
+                            print(f"WARNING: Ignoring malformed {DASHBOARD_EVENT_CHANNEL} payload: {notify.payload[:200]}")
+                            continue
+                        self.publish(event, event.pop('user_id', None))
+            except psycopg2.Error as e:
+                print(f"[DB ERROR] Live event listener lost its connection ({e}); retrying in {backoff}s.")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 60)
+            except Exception as e:
+                # Anything else must not end the thread either: every stream of the process would go quiet
+                traceback.print_exc()
+                print(f"ERROR: Live event listener failed ({e}); restarting in {backoff}s.")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 60)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+dashboard_events = DashboardEventHub()
+
+def format_sse(event):
+    """One Server-Sent Events message; the event's 'type' becomes the SSE event name."""
+    event = dict(event)
+    name = event.pop('type', 'message')
+    return f"event: {name}\ndata: {json.dumps(event, separators=(',', ':'))}\n\n"
+
+@app.route('/api/events', methods=['GET'])
+@authenticate_request()
+def stream_dashboard_events():
+    """
+    Endpoint 36.0: Server-Sent Events stream of the user's changes (see section 36).
+    Opens with a 'ready' event; after it (and after every reconnect) the client syncs
+    once through 35.0 and from then on only when an event arrives.
+    """
+    if not LIVE_EVENTS_ENABLED:
+        # EventSource does not retry a non-200 answer, so the page stays on what it has
+        return jsonify({"status": "error", "message": "Live events are not served by this instance."}), 503
+
+    user_id = str(g.user_id)
+    events = dashboard_events.subscribe(user_id)
+    print(f"DEBUG 36.0: Event stream opened for User ID {user_id}")
+
+    def generate():
+        try:
+            yield f"retry: {LIVE_EVENT_RETRY_MS}\n\n"
+            yield format_sse({'type': 'ready'})
+            while True:
+                try:
+                    event = events.get(timeout=LIVE_EVENT_KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    # SSE comment: keeps the proxy from timing out an idle stream, and a
+                    # write to a closed connection is how a gone client is noticed
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            dashboard_events.unsubscribe(events)
+            print(f"DEBUG 36.0: Event stream closed for User ID {user_id}")
+
+    response = app.response_class(generate(), mimetype='text/event-stream')
+    response.cache_control.no_cache = True
+    # Let nginx pass every event on at once instead of buffering the response
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 ## MAIN (Included for optional local development testing)
 if __name__ == '__main__':
     # This is for local development only. Gunicorn is typically used in production.
@@ -1,7 +1,7 @@
 // FILENAME: application_create.js | COMPLETE AND FINAL WORKING VERSION (500 Error Fix for PUT)
 
 // --- 1. Imports ---
-import { initializeServices, fetchWithGuard, currentUserId, appId } from './core-utils.js';
+import { initializeServices, fetchWithGuard, currentUserId, appId, uploadDocumentResumable, RESUMABLE_UPLOAD_THRESHOLD, UPLOAD_BATCH_MAX_BYTES } from './core-utils.js';
 import { injectNavbar } from './navbar.js';
 import { initSidebar } from './company_sidebar.js';
 
@@ -188,51 +188,33 @@ function addDocumentRow() {
 }
 
 /**
- * Uploads a single file and its type to the API endpoint.
- * @param {string} appId - The ID of the application.
- * @param {File} file - The file object to upload.
- * @param {string} type - The document type string.
- * @param {number} index - The index for logging.
+ * Splits files into consecutive batches of at most UPLOAD_BATCH_MAX_BYTES each.
+ * @param {Array<{file: File, type: string}>} files - Files below RESUMABLE_UPLOAD_THRESHOLD.
+ * @returns {Array<Array<{file: File, type: string}>>} - The batches, in the original order.
  */
-async function uploadSingleDocument(appId, file, type, index) {
-    const apiUrl = API.UPLOAD_DOCUMENT(appId);
-    const fileName = file.name;
-    const operationName = `uploading file ${index + 1}/${fileName}`;
-
-    try {
-        const formData = new FormData();
-        
-        // Final working keys from prior debugging
-        formData.append('file', file);
-        formData.append('document_type', type); 
-
-        console.log(`[FILE UPLOAD] Starting upload for file ${index + 1} (${fileName}) using file key 'document' and type key 'document_type'...`);
-
-        const response = await fetch(apiUrl, {
-            method: 'POST',
-            headers: {
-                'Authorization': 'Bearer MOCK_TOKEN' 
-            },
-            body: formData
-        });
-
-        if (!response.ok) {
-            const errorData = await response.json().catch(() => ({ message: response.statusText }));
-            const errorMessage = errorData?.message || `API Error (${response.status}): ${operationName} failed.`;
-            throw new Error(errorMessage);
+function splitUploadBatches(files) {
+    const batches = [];
+    let current = [];
+    let currentBytes = 0;
+    files.forEach(item => {
+        if (current.length > 0 && currentBytes + item.file.size > UPLOAD_BATCH_MAX_BYTES) {
+            batches.push(current);
+            current = [];
+            currentBytes = 0;
         }
-        
-        console.log(`[FILE UPLOAD] Success: File ${index + 1} (${fileName}) uploaded successfully. Status: ${response.status}`);
-        return true; // Success
-
-    } catch (error) {
-        console.error(`[FILE UPLOAD] ${operationName} failed:`, error);
-        return false; // Failure
-    }
+        current.push(item);
+        currentBytes += item.file.size;
+    });
+    if (current.length > 0) batches.push(current);
+    return batches;
 }
 
 /**
- * Handles the upload of documents by making one API call per file.
+ * Uploads the documents in as few multipart requests as possible (API 9.0 accepts several
+ * 'file' parts, each with its own 'document_type', and stores them in one transaction).
+ * Each request carries at most UPLOAD_BATCH_MAX_BYTES, so many small files cannot add up
+ * past the server's request size limit. Files of RESUMABLE_UPLOAD_THRESHOLD and up are
+ * sent with the resumable API instead.
  * @param {string} appId - The ID of the application to attach documents to.
  * @param {Array<{file: File, type: string}>} filesToUpload - List of files and their types.
  */
@@ -241,17 +223,59 @@ async function uploadDocuments(appId, filesToUpload) {
     
     if (filesToUpload.length === 0) return true;
 
-    // Map each file to a promise that executes the single-file API call
-    const uploadPromises = filesToUpload.map((item, index) => 
-        uploadSingleDocument(appId, item.file, item.type, index)
-    );
+    const largeFiles = filesToUpload.filter(item => item.file.size >= RESUMABLE_UPLOAD_THRESHOLD);
+    const batchFiles = filesToUpload.filter(item => item.file.size < RESUMABLE_UPLOAD_THRESHOLD);
+    let successCount = 0;
+
+    // 1. Regular-sized files, one request per batch
+    for (const batch of splitUploadBatches(batchFiles)) {
+        try {
+            const formData = new FormData();
+            batch.forEach(item => {
+                // Final working keys from prior debugging; one document_type per file, same order
+                formData.append('file', item.file);
+                formData.append('document_type', item.type);
+            });
 
-    // Wait for all uploads to complete concurrently
-    const results = await Promise.all(uploadPromises);
+            console.log(`[FILE UPLOAD] Starting batch upload of ${batch.length} file(s)...`);
 
-    const successCount = results.filter(r => r).length;
+            const response = await fetch(API.UPLOAD_DOCUMENT(appId), {
+                method: 'POST',
+                headers: {
+                    'Authorization': 'Bearer MOCK_TOKEN' 
+                },
+                body: formData
+            });
+            const data = await response.json().catch(() => ({ message: response.statusText }));
+
+            // 201 = all stored, 207 = some stored (see data.results), 4xx/5xx = none stored
+            (data.results || []).forEach(result => {
+                if (result.status === 'success') {
+                    successCount++;
+                } else {
+                    console.error(`[FILE UPLOAD] ${result.filename} failed: ${result.message}`);
+                }
+            });
+            if (!response.ok && !data.results) {
+                console.error(`[FILE UPLOAD] ${operationName} failed: ${data?.message || response.status}`);
+            }
+        } catch (error) {
+            console.error(`[FILE UPLOAD] ${operationName} failed:`, error);
+        }
+    }
+
+    // 2. Large files one at a time through the resumable chunked API (29.x)
+    for (const item of largeFiles) {
+        try {
+            await uploadDocumentResumable(appId, item.file, item.type);
+            successCount++;
+        } catch (error) {
+            console.error(`[FILE UPLOAD] ${item.file.name} failed:`, error);
+        }
+    }
     
     if (successCount === filesToUpload.length) {
+        console.log(`[FILE UPLOAD] Success: ${successCount} file(s) uploaded.`);
         return true;
     } else {
         const failureCount = filesToUpload.length - successCount;
@@ -357,7 +381,7 @@ async function handleFormSubmit(event) {
             });
             
             if (filesToUpload.length > 0) {
-                // *** CALLS THE NEW MULTI-API-CALL FUNCTION ***
+                // *** ONE BATCH REQUEST FOR ALL FILES (large files resumable) ***
                 await uploadDocuments(newAppId, filesToUpload); 
             }
         }
@@ -1,14 +1,19 @@
 // FILENAME: application_dashboard.js | Logic for fetching and displaying the user's application history.
 
-import { initializeServices, fetchWithGuard } from './core-utils.js';
+import { initializeServices, syncApplications, subscribeDashboardEvents } from './core-utils.js';
 
 // --- API Endpoints ---
-const APPLICATIONS_ALL_API = '/api/applications/all'; // Endpoint 22.0
+// Applications come from a local copy kept current through the change feed (API 35.0),
+// so a repeat visit only downloads what changed since the last one. While the page is
+// open, the live event stream (API 36.0) says when to fetch the next delta.
+const LIVE_SYNC_DELAY_MS = 500; // events arriving within this window share one sync
 
 // --- Global State ---
 let allApplications = [];
 let currentSortKey = 'application_date';
 let currentSortDirection = 'desc'; // Default to newest first
+let liveSyncTimer = null;
+let liveSyncFull = false;
 
 // --- DOM Elements ---
 const applicationTableBody = document.getElementById('applicationTableBody');
@@ -136,11 +141,14 @@ function renderApplicationTable(applications) {
 /**
  * Client-side sorting function.
  * @param {string} key - The data property key to sort by.
+ * @param {boolean} [keepDirection=false] - Re-sort in the current direction (after a data refresh).
  * * **UPDATED:** Added numeric sorting logic for the 'contact_count' key.
  */
-function sortApplications(key) {
+function sortApplications(key, keepDirection = false) {
     // 1. Determine sort direction
-    if (currentSortKey === key) {
+    if (keepDirection) {
+        // Same order as before, just with the refreshed data
+    } else if (currentSortKey === key) {
         // Toggle direction if the same key is clicked
         currentSortDirection = currentSortDirection === 'asc' ? 'desc' : 'asc';
     } else {
@@ -239,28 +247,22 @@ function handleSortClick(key) {
 
 /**
  * Fetches all job applications for the current user.
+ * @param {object} [options={}] - { full: true } reloads everything instead of the delta.
  */
-async function fetchApplications() {
+async function fetchApplications(options = {}) {
     if (loadingIndicator) loadingIndicator.classList.remove('hidden');
     if (errorDisplay) errorDisplay.classList.add('hidden');
 
     try {
-        const responseData = await fetchWithGuard(
-            APPLICATIONS_ALL_API, 
-            'GET', 
-            'Fetch All Applications',
-            { useAuth: true }
-        );
-        
-        allApplications = responseData.applications || [];
+        allApplications = await syncApplications(options);
 
         // 1. Update the Summary Card count
         if (totalApplicationCountElement) {
             totalApplicationCountElement.textContent = allApplications.length.toString();
         }
 
-        // 2. Initial sort and render (defaults to application_date desc)
-        sortApplications(currentSortKey); 
+        // 2. Sort and render in the current order (defaults to application_date desc)
+        sortApplications(currentSortKey, true); 
         
     } catch (error) {
         console.error("Error fetching applications:", error);
@@ -275,6 +277,32 @@ async function fetchApplications() {
 }
 
 
+/**
+ * Schedules a sync after a live event; events arriving close together share one request.
+ * @param {boolean} [full=false] - Reload everything (company names / contact counts changed).
+ */
+function scheduleLiveSync(full = false) {
+    liveSyncFull = liveSyncFull || full;
+    clearTimeout(liveSyncTimer);
+    liveSyncTimer = setTimeout(() => {
+        const options = { full: liveSyncFull };
+        liveSyncFull = false;
+        fetchApplications(options);
+    }, LIVE_SYNC_DELAY_MS);
+}
+
+/**
+ * Company events concern everyone; only reload if a listed company is one shown here.
+ * @param {object} data - { ids: [company_id, ...] } or { ids: null } for "many".
+ */
+function handleCompanyEvent(data) {
+    const shown = new Set(allApplications.map(app => app.company_id));
+    if (data.ids === null || data.ids === undefined || data.ids.some(id => shown.has(id))) {
+        scheduleLiveSync(true);
+    }
+}
+
+
 // ---------------------------------------------------------------------
 // --- INITIALIZATION --------------------------------------------------
 // ---------------------------------------------------------------------
@@ -285,6 +313,20 @@ document.addEventListener('DOMContentLoaded', async () => {
     
     // Once services are ready, fetch the application data
     fetchApplications();
+
+    // Live updates: 'ready' follows every (re)connect, so changes made while the stream
+    // was down are picked up as well
+    let streamConnected = false;
+    subscribeDashboardEvents({
+        ready: () => {
+            if (streamConnected) scheduleLiveSync();
+            streamConnected = true;
+        },
+        application: () => scheduleLiveSync(),
+        document: () => scheduleLiveSync(),
+        company: handleCompanyEvent,
+        resync: () => scheduleLiveSync(),
+    });
     
     // Set initial sort icon state (for default 'application_date' desc)
     updateSortIcons();
@@ -1,7 +1,7 @@
 // FILENAME: application_review.js | FIX: Changing DELETE API path to plural to match working cURL.
 
 // CRITICAL FIX: Import core utilities and firebase dependencies directly for use in this module
-import { fetchWithGuard, initializeServices, currentUserId, appId, db, isAuthReady } from './core-utils.js'; 
+import { fetchWithGuard, initializeServices, currentUserId, appId, db, isAuthReady, uploadDocumentResumable, RESUMABLE_UPLOAD_THRESHOLD } from './core-utils.js'; 
 import { collection, addDoc, serverTimestamp } from "https://www.gstatic.com/firebasejs/11.6.1/firebase-firestore.js"; 
 // IMPORT NEW REUSABLE SIDEBAR MODULE
 import { initSidebar } from './company_sidebar.js';
@@ -10,7 +10,8 @@ import { initSidebar } from './company_sidebar.js';
 // --- API Endpoints ---
 const APPLICATIONS_API_BASE = '/api/applications'; // GET /api/applications?company_id=<id> (Endpoint 11.0)
 const DOCUMENT_UPLOAD_API_BASE = '/api/application'; // For POST /api/application/<id>/documents (API 9.0)
-const DOCUMENT_DOWNLOAD_API_BASE = '/api/document'; // For GET /api/document/<id> (API 10.0)
+const DOCUMENT_DOWNLOAD_API_BASE = '/api/documents'; // For GET /api/documents/<document_id> (API 12.0)
+const DOCUMENT_ARCHIVE_API = (id) => `${DOCUMENT_UPLOAD_API_BASE}/${id}/documents/archive`; // GET, streamed ZIP of all documents (API 31.1)
 // API 8.0: DELETE /api/application/<id>
 // CRITICAL FIX: Changed from /api/application/ to /api/applications/ to match successful CURL
 const APPLICATION_DELETE_API = (id) => `/api/applications/${id}`; 
@@ -71,6 +72,17 @@ async function uploadModalFile(appId, file, type) {
     const authHeader = `Bearer ${window.__initial_auth_token || currentUserId || appId || 'dummy-token'}`;
 
     try {
+        // Large files go through the resumable chunked API (29.x): a dropped connection
+        // only costs the chunk in flight, and re-submitting the same file resumes it.
+        if (file.size >= RESUMABLE_UPLOAD_THRESHOLD) {
+            console.log(`[MODAL UPLOAD] Starting resumable upload for ${fileName} (${file.size} bytes)...`);
+            await uploadDocumentResumable(appId, file, type, (done, total) => {
+                console.log(`[MODAL UPLOAD] ${fileName}: chunk ${done}/${total}`);
+            });
+            console.log(`[MODAL UPLOAD] Success: File ${fileName} uploaded successfully (resumable).`);
+            return true;
+        }
+
         const formData = new FormData();
         // NOTE: Using 'file' and 'document_type' keys as successfully used in the modal context
         formData.append('file', file);
@@ -164,9 +176,10 @@ function renderDocumentLinks(documents, applicationId) {
         const docName = doc.original_filename || 'Document File';
         const icon = doc.document_type === 'RESUME' ? 'file-text' : doc.document_type === 'COVER_LETTER' ? 'mail' : 'file';
 
-        // Use direct link to API endpoint with file_path and 'download' attribute
+        // Use direct link to API endpoint with document_id and 'download' attribute.
+        // The server sends an ETag, so repeat downloads are revalidated (304) instead of re-sent.
         return `
-            <a href="${DOCUMENT_DOWNLOAD_API_BASE}/${doc.file_path}"
+            <a href="${DOCUMENT_DOWNLOAD_API_BASE}/${doc.document_id}"
                download="${docName}"
                target="_blank"
                class="flex items-center text-sm text-indigo-600 hover:text-indigo-800 hover:underline transition duration-150 truncate leading-tight"
@@ -177,6 +190,19 @@ function renderDocumentLinks(documents, applicationId) {
         `;
     }).join('');
 
+    // With several documents, offer them all as one ZIP (API 31.1) instead of one click per file
+    if (documents.length > 1) {
+        linksHtml += `
+            <a href="${DOCUMENT_ARCHIVE_API(applicationId)}"
+               download
+               class="mt-0.5 text-xs font-medium text-indigo-600 hover:text-indigo-800 flex items-center transition duration-150"
+               title="Download all documents as a ZIP archive">
+               <span class="inline-block w-3 h-3 mr-1" data-lucide="archive"></span>
+               Download All (ZIP)
+            </a>
+        `;
+    }
+
     // Add the "Upload New Document" button
     linksHtml += `
         <button type="button" 
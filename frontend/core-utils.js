@@ -226,4 +226,275 @@ export async function fetchWithGuard(url, method, operationName, options = {}) {
     console.error(`[API] Fatal Error after ${MAX_RETRIES} attempts for ${operationName}:`, lastError);
     // Throw a user-friendly error
     throw new Error(`Failed to perform '${operationName}'. Please check your network connection and try again. Technical details: ${lastError.message}`);
-}
\ No newline at end of file
+}
+
+/** localStorage key prefix of the local application copy kept by syncApplications(). */
+const APPLICATION_CACHE_PREFIX = 'applications-cache:';
+/** After this long the local copy is reloaded in full, which also refreshes company / job
+ *  title names and contact counts (the change feed does not track those). */
+const APPLICATION_CACHE_MAX_AGE_MS = 24 * 60 * 60 * 1000;
+
+/**
+ * Returns the user's applications (same shape as API 22.0) from a local copy that is kept
+ * current through the change feed (API 35.0): the first call loads everything, later calls
+ * only download what changed since the stored cursor and merge it in.
+ * @param {object} [options={}] - { full: true } reloads everything (e.g. after company changes).
+ * @returns {Promise<Array<object>>} - The applications, with nested documents.
+ */
+export async function syncApplications({ full = false } = {}) {
+    // Keyed by the signed-in account (currentUserId is a random fallback without Firebase auth)
+    const storageKey = `${APPLICATION_CACHE_PREFIX}${auth?.currentUser?.uid || 'default'}`;
+    let cache = null;
+    try {
+        cache = JSON.parse(localStorage.getItem(storageKey));
+    } catch (error) {
+        cache = null; // Unreadable copy: load everything again
+    }
+
+    const canResume = !full && cache && cache.cursor && Array.isArray(cache.applications)
+        && Date.now() - cache.syncedAt < APPLICATION_CACHE_MAX_AGE_MS;
+    const url = canResume
+        ? `/api/applications/changes?since=${encodeURIComponent(cache.cursor)}`
+        : '/api/applications/changes';
+    const delta = await fetchWithGuard(url, 'GET', 'Sync Applications');
+
+    let applications;
+    let syncedAt;
+    if (delta.reset) {
+        // Full list (first visit, copy too old, or cursor older than the server's retention)
+        applications = new Map(delta.applications.map(app => [app.application_id, app]));
+        syncedAt = Date.now();
+    } else {
+        applications = new Map(cache.applications.map(app => [app.application_id, app]));
+        syncedAt = cache.syncedAt;
+
+        const removeDocuments = (documentIds) => {
+            for (const app of applications.values()) {
+                if (app.documents) {
+                    app.documents = app.documents.filter(d => !documentIds.has(d.document_id));
+                }
+            }
+        };
+
+        delta.deleted.applications.forEach(id => applications.delete(id));
+        removeDocuments(new Set(delta.deleted.documents));
+
+        // Changed applications come complete (with their documents) and replace the old copy
+        delta.applications.forEach(app => applications.set(app.application_id, app));
+
+        // Changed documents: drop the old version wherever it was (it may have moved), then add it
+        removeDocuments(new Set(delta.documents.map(d => d.document_id)));
+        delta.documents.forEach(({ application_id, ...doc }) => {
+            const app = applications.get(application_id);
+            if (app) {
+                app.documents = [...(app.documents || []), doc];
+            }
+        });
+    }
+
+    const result = [...applications.values()];
+    try {
+        localStorage.setItem(storageKey, JSON.stringify({ cursor: delta.cursor, syncedAt, applications: result }));
+    } catch (error) {
+        // Storage full or disabled: the next visit simply loads everything again
+        localStorage.removeItem(storageKey);
+    }
+    return result;
+}
+
+/**
+ * Opens the live event stream (API 36.0) and calls the matching handler for each event:
+ * 'ready' (connected, also after every reconnect), 'application', 'document', 'company'
+ * (data: { ids } - null when many rows changed) and 'resync' (events may have been lost).
+ * Events only say what changed; handlers fetch the data, e.g. with syncApplications().
+ * The browser reconnects by itself after network errors.
+ * @param {object} handlers - { ready, application, document, company, resync } callbacks.
+ * @returns {EventSource|null} - The stream (call close() to stop), or null if unsupported.
+ */
+export function subscribeDashboardEvents(handlers) {
+    if (typeof EventSource === 'undefined') {
+        console.warn('[EVENTS] EventSource is not supported; live updates are off.');
+        return null;
+    }
+    const stream = new EventSource('/api/events');
+    for (const [name, handler] of Object.entries(handlers)) {
+        stream.addEventListener(name, (event) => {
+            let data = {};
+            try {
+                data = JSON.parse(event.data || '{}');
+            } catch (error) {
+                console.warn(`[EVENTS] Ignoring malformed '${name}' event:`, event.data);
+                return;
+            }
+            handler(data);
+        });
+    }
+    stream.onerror = () => {
+        // CLOSED: the server refused the stream (e.g. 503); CONNECTING: the browser retries
+        if (stream.readyState === EventSource.CLOSED) {
+            console.warn('[EVENTS] Live updates unavailable.');
+        }
+    };
+    return stream;
+}
+
+/** Files at least this large are sent with the resumable upload API (29.x) instead of one POST. */
+export const RESUMABLE_UPLOAD_THRESHOLD = 8 * 1024 * 1024;
+
+/** Upper bound on the file bytes of one multipart upload request (API 9.0). Stays well below
+ *  nginx's client_max_body_size 50M, leaving room for the multipart framing. */
+export const UPLOAD_BATCH_MAX_BYTES = 40 * 1024 * 1024;
+
+/** SHA-256 round constants (first 32 bits of the fractional parts of the cube roots of the first 64 primes). */
+const SHA256_K = new Uint32Array([
+    0x428a2f98, 0x71374491, 0xb5c0fbcf, 0xe9b5dba5, 0x3956c25b, 0x59f111f1, 0x923f82a4, 0xab1c5ed5,
+    0xd807aa98, 0x12835b01, 0x243185be, 0x550c7dc3, 0x72be5d74, 0x80deb1fe, 0x9bdc06a7, 0xc19bf174,
+    0xe49b69c1, 0xefbe4786, 0x0fc19dc6, 0x240ca1cc, 0x2de92c6f, 0x4a7484aa, 0x5cb0a9dc, 0x76f988da,
+    0x983e5152, 0xa831c66d, 0xb00327c8, 0xbf597fc7, 0xc6e00bf3, 0xd5a79147, 0x06ca6351, 0x14292967,
+    0x27b70a85, 0x2e1b2138, 0x4d2c6dfc, 0x53380d13, 0x650a7354, 0x766a0abb, 0x81c2c92e, 0x92722c85,
+    0xa2bfe8a1, 0xa81a664b, 0xc24b8b70, 0xc76c51a3, 0xd192e819, 0xd6990624, 0xf40e3585, 0x106aa070,
+    0x19a4c116, 0x1e376c08, 0x2748774c, 0x34b0bcb5, 0x391c0cb3, 0x4ed8aa4a, 0x5b9cca4f, 0x682e6ff3,
+    0x748f82ee, 0x78a5636f, 0x84c87814, 0x8cc70208, 0x90befffa, 0xa4506ceb, 0xbef9a3f7, 0xc67178f2
+]);
+
+/**
+ * Plain JavaScript SHA-256, for pages served over plain HTTP where crypto.subtle is not
+ * available (it only exists in secure contexts).
+ * @param {Uint8Array} bytes - The data to hash.
+ * @returns {Uint8Array} - The 32-byte digest.
+ */
+function sha256Fallback(bytes) {
+    const rotr = (x, n) => (x >>> n) | (x << (32 - n));
+    // Padding: 0x80, zeros, then the bit length as a 64-bit big-endian integer
+    const paddedLength = Math.ceil((bytes.length + 9) / 64) * 64;
+    const padded = new Uint8Array(paddedLength);
+    padded.set(bytes);
+    padded[bytes.length] = 0x80;
+    const view = new DataView(padded.buffer);
+    view.setUint32(paddedLength - 8, Math.floor(bytes.length / 0x20000000));
+    view.setUint32(paddedLength - 4, (bytes.length * 8) >>> 0);
+
+    const h = new Uint32Array([0x6a09e667, 0xbb67ae85, 0x3c6ef372, 0xa54ff53a, 0x510e527f, 0x9b05688c, 0x1f83d9ab, 0x5be0cd19]);
+    const w = new Uint32Array(64);
+    for (let offset = 0; offset < paddedLength; offset += 64) {
+        for (let i = 0; i < 16; i++) w[i] = view.getUint32(offset + i * 4);
+        for (let i = 16; i < 64; i++) {
+            const s0 = rotr(w[i - 15], 7) ^ rotr(w[i - 15], 18) ^ (w[i - 15] >>> 3);
+            const s1 = rotr(w[i - 2], 17) ^ rotr(w[i - 2], 19) ^ (w[i - 2] >>> 10);
+            w[i] = (w[i - 16] + s0 + w[i - 7] + s1) | 0;
+        }
+        let [a, b, c, d, e, f, g, hh] = h;
+        for (let i = 0; i < 64; i++) {
+            const t1 = (hh + (rotr(e, 6) ^ rotr(e, 11) ^ rotr(e, 25)) + ((e & f) ^ (~e & g)) + SHA256_K[i] + w[i]) | 0;
+            const t2 = ((rotr(a, 2) ^ rotr(a, 13) ^ rotr(a, 22)) + ((a & b) ^ (a & c) ^ (b & c))) | 0;
+            hh = g; g = f; f = e; e = (d + t1) | 0;
+            d = c; c = b; b = a; a = (t1 + t2) | 0;
+        }
+        h[0] += a; h[1] += b; h[2] += c; h[3] += d; h[4] += e; h[5] += f; h[6] += g; h[7] += hh;
+    }
+    const digest = new Uint8Array(32);
+    const digestView = new DataView(digest.buffer);
+    h.forEach((word, i) => digestView.setUint32(i * 4, word));
+    return digest;
+}
+
+/**
+ * Hex SHA-256 of a file, sent when a resumable upload starts so finalize (29.4) can verify
+ * the assembled file. Files here are at most MAX_UPLOAD_SIZE (25 MiB), so they are hashed whole.
+ * @param {File} file - The file to hash.
+ * @returns {Promise<string>} - 64 lowercase hex characters.
+ */
+export async function sha256Hex(file) {
+    const buffer = await file.arrayBuffer();
+    const digest = globalThis.crypto?.subtle
+        ? new Uint8Array(await crypto.subtle.digest('SHA-256', buffer))
+        : sha256Fallback(new Uint8Array(buffer));
+    return Array.from(digest, byte => byte.toString(16).padStart(2, '0')).join('');
+}
+
+/**
+ * Uploads a document in chunks via the resumable upload API (29.1 - 29.4).
+ * A failed chunk is retried on its own, and calling this again for the same file
+ * (e.g. after a reload) resumes the saved session and only sends missing chunks.
+ * @param {string} applicationId - The application the document belongs to.
+ * @param {File} file - The file to upload.
+ * @param {string} documentType - The document type ENUM value (e.g. 'RESUME').
+ * @param {function} [onProgress] - Called with (chunksDone, totalChunks) after each chunk.
+ * @returns {Promise<object>} - The finalize response (contains document_id).
+ */
+export async function uploadDocumentResumable(applicationId, file, documentType, onProgress = null) {
+    const MAX_CHUNK_RETRIES = 3;
+    const token = await auth?.currentUser?.getIdToken() || 'MOCK_TOKEN';
+    const authHeaders = { 'Authorization': `Bearer ${token}` };
+    const storageKey = `resumable-upload:${applicationId}:${file.name}:${file.size}:${file.lastModified}`;
+
+    const callJson = async (url, method, body = undefined) => {
+        const response = await fetch(url, {
+            method: method,
+            headers: body === undefined ? authHeaders : { ...authHeaders, 'Content-Type': 'application/json' },
+            body: body === undefined ? undefined : JSON.stringify(body)
+        });
+        const data = await response.json().catch(() => ({ message: response.statusText }));
+        if (!response.ok) {
+            const error = new Error(data?.message || `API Error (${response.status})`);
+            error.status = response.status;
+            throw error;
+        }
+        return data;
+    };
+
+    // 1. Resume the saved session for this exact file, or start a new one
+    let session = null;
+    const savedUploadId = localStorage.getItem(storageKey);
+    if (savedUploadId) {
+        session = await callJson(`/api/uploads/${savedUploadId}`, 'GET').catch(() => null);
+        if (!session) localStorage.removeItem(storageKey);
+    }
+    if (!session) {
+        session = await callJson(`/api/application/${applicationId}/uploads`, 'POST', {
+            filename: file.name,
+            document_type: documentType,
+            total_size: file.size,
+            sha256: await sha256Hex(file)
+        });
+        localStorage.setItem(storageKey, session.upload_id);
+    }
+
+    // 2. Send the missing chunks, retrying each one on its own with backoff
+    const totalChunks = session.total_chunks;
+    let chunksDone = totalChunks - session.missing_chunks.length;
+    for (const index of session.missing_chunks) {
+        const start = index * session.chunk_size;
+        const chunk = file.slice(start, Math.min(start + session.chunk_size, file.size));
+
+        for (let attempt = 1; ; attempt++) {
+            try {
+                const response = await fetch(`/api/uploads/${session.upload_id}/chunks/${index}`, {
+                    method: 'PUT',
+                    headers: { ...authHeaders, 'Content-Type': 'application/octet-stream' },
+                    body: chunk
+                });
+                if (!response.ok) throw new Error(`Chunk ${index} failed (${response.status})`);
+                break;
+            } catch (error) {
+                if (attempt >= MAX_CHUNK_RETRIES) throw error;
+                const delay = Math.pow(2, attempt) * 500;
+                console.warn(`[UPLOAD] ${error.message}; retrying in ${delay}ms...`);
+                await new Promise(resolve => setTimeout(resolve, delay));
+            }
+        }
+        chunksDone++;
+        if (onProgress) onProgress(chunksDone, totalChunks);
+    }
+
+    // 3. Finalize (the server verifies size and checksum and creates the document)
+    try {
+        const result = await callJson(`/api/uploads/${session.upload_id}/finalize`, 'POST');
+        localStorage.removeItem(storageKey);
+        return result;
+    } catch (error) {
+        // 404/422: the session is gone or was discarded; the next attempt starts fresh
+        if (error.status === 404 || error.status === 422) localStorage.removeItem(storageKey);
+        throw error;
+    }
+}
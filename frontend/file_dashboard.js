@@ -53,9 +53,10 @@ const renderTable = (data) => {
                     ${getFileIcon(doc.original_filename)}
                 </div>
                 <div class="ml-4">
-                    <div class="text-sm font-medium text-gray-900 truncate max-w-xs text-indigo-600 cursor-pointer hover:underline" title="${doc.original_filename || 'Unknown File'}">
+                    <!-- Download via API 12.0; the ETag makes repeat views a 304 revalidation -->
+                    <a href="/api/documents/${doc.document_id}" download class="block text-sm font-medium text-gray-900 truncate max-w-xs text-indigo-600 cursor-pointer hover:underline" title="${doc.original_filename || 'Unknown File'}">
                         ${doc.original_filename || 'Unknown File'}
-                    </div>
+                    </a>
                     <div class="text-xs text-gray-400 truncate max-w-[200px]">${doc.document_id ? doc.document_id.substring(0, 8) : ''}...</div>
                 </div>
             </div>
@@ -22,6 +22,8 @@ const API_URLS = {
     CREATE: '/api/companies',
     RAW_NAMES: (id) => `/api/companies/${id}/raw_names`,
     CONTACTS: (id) => `/api/companies/${id}/contacts`,
+    // API 28.0: profile + raw names + contacts in one request
+    DETAIL: (id) => `/api/companies/${id}/detail?include=profile,raw_names,contacts`,
     DELETE: (id) => `/api/companies/${id}`,
 };
 
@@ -250,40 +252,19 @@ export async function loadCompanyData(id) {
     if (managementContent) managementContent.classList.remove('hidden');
     
     try {
-        // 1. Fetch main company profile
-        const profilePromise = fetchWithGuard(
-            API_URLS.PROFILE(id), 
+        // 1. Fetch profile, raw names and contacts in ONE request (API 28.0)
+        const detailResponse = await fetchWithGuard(
+            API_URLS.DETAIL(id), 
             'GET', 
-            `Fetch Company Profile ${id}`,
+            `Fetch Company Detail ${id}`,
             { headers: MOCK_AUTH_HEADERS }
         );
 
-        // 2. Fetch related data in parallel
-        const rawNamesPromise = fetchWithGuard(
-            API_URLS.RAW_NAMES(id), 
-            'GET', 
-            `Fetch Raw Names for ${id}`,
-            { headers: MOCK_AUTH_HEADERS }
-        );
-        
-        const contactsPromise = fetchWithGuard(
-            API_URLS.CONTACTS(id), 
-            'GET', 
-            `Fetch Contacts for ${id}`,
-            { headers: MOCK_AUTH_HEADERS }
-        );
-
-        const [profileResponse, rawNamesResponse, contactsResponse] = await Promise.all([
-            profilePromise, 
-            rawNamesPromise, 
-            contactsPromise
-        ]);
-
         // 3. Populate Form and Render Related Data
         
-        const profileData = profileResponse?.company || {};
-        const rawNamesData = Array.isArray(rawNamesResponse?.raw_names) ? rawNamesResponse.raw_names : [];
-        const contactsData = Array.isArray(contactsResponse?.contacts) ? contactsResponse.contacts : [];
+        const profileData = detailResponse?.company || {};
+        const rawNamesData = Array.isArray(detailResponse?.raw_names) ? detailResponse.raw_names : [];
+        const contactsData = Array.isArray(detailResponse?.contacts) ? detailResponse.contacts : [];
 
         // --- DEBUG LOG ---
         console.log('Raw Names Data received:', rawNamesData); 
@@ -58,6 +58,85 @@ async function processStructuredResponse(response, resourceKey) {
 }
 
 
+// --- Optional Request Batching (API 27.0: POST /api/batch) ---
+// OFF by default. When enabled, JSON calls made within `batchWindowMs` of each other
+// are merged into a single POST /api/batch and fanned back out to their callers.
+const BATCH_API_URL = `${API_BASE_URL}/api/batch`;
+const BATCH_MAX_SIZE = 20; // Must not exceed the server's BATCH_MAX_REQUESTS
+let batchWindowMs = 0;     // 0 = batching disabled
+let pendingBatch = [];
+let batchTimer = null;
+
+/**
+ * Opts in to request batching for subsequent fetchWithGuard calls.
+ * @param {number} [windowMs=5] - How long to wait for more calls before sending the batch.
+ */
+export function enableRequestBatching(windowMs = 5) {
+    batchWindowMs = windowMs;
+}
+
+/**
+ * Turns batching off again; anything already queued is sent immediately.
+ */
+export function disableRequestBatching() {
+    batchWindowMs = 0;
+    flushBatch();
+}
+
+/**
+ * Sends every queued call, either directly (a batch of one) or as one /api/batch request,
+ * and settles each caller's promise from its own sub-response.
+ */
+async function flushBatch() {
+    if (batchTimer) {
+        clearTimeout(batchTimer);
+        batchTimer = null;
+    }
+    const queued = pendingBatch;
+    pendingBatch = [];
+    if (queued.length === 0) return;
+
+    // A batch of one gains nothing from the envelope; send it as a normal request
+    if (queued.length === 1) {
+        const call = queued[0];
+        sendRequest(call.endpoint, call.method, call.resourceKey, call.body).then(call.resolve, call.reject);
+        return;
+    }
+
+    try {
+        const response = await fetch(BATCH_API_URL, {
+            method: 'POST',
+            headers: {
+                'Authorization': `Bearer ${API_KEY}`,
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                requests: queued.map((call, index) => ({
+                    id: index,
+                    method: call.method,
+                    path: call.endpoint,
+                    body: call.body,
+                })),
+            }),
+        });
+        const results = await processStructuredResponse(response, 'responses');
+
+        results.forEach((result, index) => {
+            const call = queued[index];
+            // Re-wrap each sub-response so it goes through the same standardizer as a direct call
+            const subResponse = new Response(
+                result.body === null ? null : JSON.stringify(result.body),
+                { status: result.status, headers: { 'Content-Type': 'application/json' } }
+            );
+            processStructuredResponse(subResponse, call.resourceKey).then(call.resolve, call.reject);
+        });
+    } catch (error) {
+        console.error(`Batch request to ${BATCH_API_URL} failed:`, error.message);
+        queued.forEach(call => call.reject(error));
+    }
+}
+
+
 // --- Mandatory Core Function: The Network Guard ---
 
 /**
@@ -70,6 +149,24 @@ async function processStructuredResponse(response, resourceKey) {
  * @returns {Promise<any>} The parsed and extracted data resource.
  */
 export async function fetchWithGuard(endpoint, method = 'GET', resourceKey = null, body = null) {
+    // File uploads (FormData) can't travel inside a JSON batch envelope
+    if (batchWindowMs > 0 && !(body instanceof FormData)) {
+        return new Promise((resolve, reject) => {
+            pendingBatch.push({ endpoint, method: method.toUpperCase(), resourceKey, body, resolve, reject });
+            if (pendingBatch.length >= BATCH_MAX_SIZE) {
+                flushBatch();
+            } else if (!batchTimer) {
+                batchTimer = setTimeout(flushBatch, batchWindowMs);
+            }
+        });
+    }
+    return sendRequest(endpoint, method, resourceKey, body);
+}
+
+/**
+ * Performs a single (unbatched) request. Used by fetchWithGuard and by flushBatch.
+ */
+async function sendRequest(endpoint, method, resourceKey, body) {
     const fullUrl = `${API_BASE_URL}${endpoint}`;
     
     const options = {
@@ -0,0 +1,1732 @@
+# FILENAME: maintenance.py
+# One-off and periodic maintenance tasks for the JobAssist filestore and database.
+# Run from the application directory (same environment as gunicorn), e.g.:
+#   python maintenance.py dedupe-filestore --dry-run
+#   python maintenance.py dedupe-filestore
+#   python maintenance.py gc-uploads        (e.g. hourly from cron)
+#   python maintenance.py shard-filestore --dry-run
+#   python maintenance.py shard-filestore
+#   python maintenance.py bench-codec --limit 200
+#   python maintenance.py reconcile [--prefix 0] [--quarantine | --delete]
+#   python maintenance.py scrub [--rate-mib 20] [--max-minutes 120]
+#   python maintenance.py recount-usage
+#   python maintenance.py import-contacts connections.csv [--workers 4]
+#   python maintenance.py regenerate-mappings
+#   python maintenance.py rebuild-search
+#   python maintenance.py reindex
+#   python maintenance.py warm-cache
+#   python maintenance.py benchmark [--requests 200] [--concurrency 8]
+#   python maintenance.py backup [--dest /var/backups/jobassist] [--jobs 4] [--keep 7]
+#   python maintenance.py restore /var/backups/jobassist/latest --dbname contact_db_restore --filestore /srv/filestore.new
+# The bulk commands work in parallel batches and keep a checkpoint: re-running an
+# interrupted one continues where it stopped (--restart starts over).
+#   python maintenance.py storage-check
+import argparse
+import csv
+import hashlib
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import psycopg2
+import psycopg2.extras
+from psycopg2 import sql
+
+# Reuse the app's configuration and content-addressed store helpers so paths,
+# locking and reference counting are exactly the same as for live uploads.
+from app import (
+    app as flask_app,
+    DB_CONFIG,
+    DB_POOL_MAX,
+    BACKUP_LOCK_KEY,
+    SEARCH_TEXT_CONFIG,
+    UPLOAD_FOLDER,
+    STORAGE_BACKEND,
+    get_db_connection,
+    get_storage,
+    acquire_blob,
+    lock_blob,
+    is_blob_path,
+    document_disk_path,
+    flat_relative_path,
+    resolve_stored_path,
+    resolve_disk_path,
+    open_document_file,
+    zstandard,
+    DOCUMENT_COMPRESSION_LEVEL,
+    DOCUMENT_COMPRESSION_SKIP_MIME_TYPES,
+    DOCUMENT_COMPRESSION_MIN_SAVING,
+    purge_stale_upload_sessions,
+    PARTIAL_UPLOAD_FOLDER,
+    UPLOAD_SESSION_TTL_HOURS,
+)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(f):
+    """Returns (sha256 hex digest, size in bytes) of an open file, read in fixed-size chunks."""
+    sha256 = hashlib.sha256()
+    size = 0
+    with f:
+        while True:
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            sha256.update(chunk)
+            size += len(chunk)
+    return sha256.hexdigest(), size
+
+
+def require_local_storage(command):
+    """The filesystem-level tasks below work on UPLOAD_FOLDER directly (hardlinks, directory scans)."""
+    if STORAGE_BACKEND != 'local':
+        print(f"ERROR: {command} only works with STORAGE_BACKEND=local (configured: {STORAGE_BACKEND}).")
+        return False
+    return True
+
+
+def place_blob(src_path, dest_path):
+    """
+    Puts a copy of src_path at dest_path atomically. Hardlinks when possible (same
+    filesystem, no extra space); the original is only removed after the DB commit.
+    """
+    tmp_path = f"{dest_path}.tmp-{os.getpid()}"
+    try:
+        os.link(src_path, tmp_path)
+    except OSError:
+        shutil.copyfile(src_path, tmp_path)
+    os.replace(tmp_path, dest_path)
+
+
+# ----------------------------------------------------------------------
+# Batch runner for the bulk commands (import-contacts, regenerate-mappings,
+# rebuild-search, reindex, warm-cache).
+# A command hands over its input as (position, batch) pairs in increasing
+# position order; batches run in a thread pool, each on its own pooled
+# connection. The checkpoint in maintenance_checkpoints (migration 011) only
+# moves past a batch once it and every batch before it have committed, so an
+# interrupted run redoes at most the few batches that were in flight.
+# ----------------------------------------------------------------------
+PROGRESS_SECONDS = 5
+
+
+def pool_workers(workers):
+    """Thread count that leaves pooled connections for the checkpoint and the input query."""
+    return max(1, min(workers, DB_POOL_MAX - 2))
+
+
+def load_checkpoint(command, restart=False):
+    """(position, items_done) to continue from, or (None, 0) for a fresh run."""
+    conn = get_db_connection()
+    if conn is None:
+        raise RuntimeError("Database connection failed.")
+    try:
+        cur = conn.cursor()
+        if restart:
+            cur.execute("DELETE FROM maintenance_checkpoints WHERE command = %s;", (command,))
+        cur.execute('SELECT "position", items_done FROM maintenance_checkpoints WHERE command = %s;', (command,))
+        row = cur.fetchone()
+        conn.commit()
+    finally:
+        conn.close()
+    if row:
+        print(f"{command}: resuming after {row[0]!r} ({row[1]} done before)")
+        return row
+    return None, 0
+
+
+def run_batches(command, batches, process_batch, workers, items_done=0, total=None):
+    """
+    Runs process_batch(batch) -> items handled for every batch and keeps the
+    checkpoint current. Returns the number of items handled (including earlier runs).
+    """
+    workers = pool_workers(workers)
+    conn = get_db_connection()
+    if conn is None:
+        raise RuntimeError("Database connection failed.")
+    started = time.monotonic()
+    last_report = started
+    session_items = 0
+    in_flight = deque()  # (position, future), in submission order
+
+    def complete_oldest():
+        nonlocal items_done, session_items, last_report
+        position, future = in_flight.popleft()
+        handled = future.result()  # Re-raises the batch's error: the checkpoint stays before it
+        items_done += handled
+        session_items += handled
+        cur.execute("""
+            INSERT INTO maintenance_checkpoints (command, "position", items_done)
+            VALUES (%s, %s, %s)
+            ON CONFLICT (command) DO UPDATE
+            SET "position" = EXCLUDED."position", items_done = EXCLUDED.items_done, updated_at = NOW();
+        """, (command, str(position), items_done))
+        conn.commit()
+        now = time.monotonic()
+        if now - last_report >= PROGRESS_SECONDS:
+            last_report = now
+            of_total = f"/{total}" if total else ""
+            print(f"{command}: {items_done}{of_total} done, {session_items / (now - started):.0f}/s, at {position!r}")
+
+    try:
+        cur = conn.cursor()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            try:
+                for position, batch in batches:
+                    in_flight.append((position, executor.submit(process_batch, batch)))
+                    while len(in_flight) > workers or (in_flight and in_flight[0][1].done()):
+                        complete_oldest()
+                while in_flight:
+                    complete_oldest()
+            except BaseException:
+                for _, future in in_flight:
+                    future.cancel()
+                raise
+
+        cur.execute("DELETE FROM maintenance_checkpoints WHERE command = %s;", (command,))
+        conn.commit()
+        print(f"{command}: finished, {items_done} done ({session_items} in {time.monotonic() - started:.1f}s)")
+        return items_done
+    finally:
+        conn.close()
+
+
+def with_connection(work):
+    """Runs work(cur) in its own transaction on a pooled connection (inside a batch thread)."""
+    conn = get_db_connection()
+    if conn is None:
+        raise RuntimeError("Database connection failed.")
+    try:
+        result = work(conn.cursor())
+        conn.commit()
+        return result
+    finally:
+        conn.close()  # Rolls back if work() raised
+
+
+def fetch_value(query, params=None):
+    """First column of the first row of a read-only query."""
+    def work(cur):
+        cur.execute(query, params)
+        return cur.fetchone()[0]
+    return with_connection(work)
+
+
+# ----------------------------------------------------------------------
+# dedupe-filestore
+# Moves every flat (uuid-named) document into the content-addressed store.
+# Each document is handled in its own transaction and the flat file is only
+# deleted after that commit, so the task can be interrupted and re-run safely.
+# ----------------------------------------------------------------------
+def dedupe_filestore(dry_run=False):
+    if not require_local_storage('dedupe-filestore'):
+        return 1
+    conn = get_db_connection()
+    if conn is None:
+        print("ERROR: Database connection failed.")
+        return 1
+
+    migrated = 0
+    missing = 0
+    bytes_freed = 0
+    seen_hashes = set()
+
+    try:
+        cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+        cur.execute("SELECT document_id, file_path, content_hash, storage_encoding FROM job_documents ORDER BY upload_timestamp;")
+        documents = cur.fetchall()
+        conn.rollback()  # Release the snapshot; each document gets its own transaction below
+
+        print(f"Scanning {len(documents)} document(s) in {UPLOAD_FOLDER}")
+
+        for doc in documents:
+            document_id = str(doc['document_id'])
+            if is_blob_path(doc['file_path'], doc['content_hash']):
+                continue  # Already in the store
+
+            flat_path = resolve_disk_path(doc['file_path'])
+            if not os.path.exists(flat_path):
+                print(f"WARNING: {document_id}: file {flat_path} is missing, skipped.")
+                missing += 1
+                continue
+
+            # Hash the original bytes (the file may be compressed at rest)
+            content_hash, file_size = hash_file(open_document_file(doc['file_path'], doc['storage_encoding']))
+            is_duplicate = content_hash in seen_hashes
+            seen_hashes.add(content_hash)
+
+            if dry_run:
+                migrated += 1
+                if is_duplicate:
+                    bytes_freed += file_size
+                continue
+
+            def write_blob(file_path, flat_path=flat_path, storage_encoding=doc['storage_encoding']):
+                dest_path = document_disk_path(file_path)
+                os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+                place_blob(flat_path, dest_path)
+                return storage_encoding  # The blob is stored exactly like the flat file was
+
+            try:
+                file_path, is_new_blob, storage_encoding = acquire_blob(cur, content_hash, file_size, write_blob)
+                cur.execute("""
+                    UPDATE job_documents
+                    SET file_path = %s, content_hash = %s, file_size = %s, storage_encoding = %s
+                    WHERE document_id = %s;
+                """, (file_path, content_hash, file_size, storage_encoding, document_id))
+                conn.commit()
+            except (psycopg2.Error, OSError) as e:
+                conn.rollback()
+                print(f"ERROR: {document_id}: {e}")
+                continue
+
+            os.remove(flat_path)
+            migrated += 1
+            if not is_new_blob:
+                bytes_freed += file_size
+
+        action = "Would migrate" if dry_run else "Migrated"
+        print(f"{action} {migrated} document(s); {bytes_freed} byte(s) freed by deduplication; {missing} missing file(s).")
+        return 0
+    finally:
+        conn.close()
+
+
+# ----------------------------------------------------------------------
+# gc-uploads
+# Purges resumable upload sessions (API 29.x) untouched for UPLOAD_SESSION_TTL_HOURS
+# (their partial files go through the file_deletions outbox) and removes partial files
+# that no longer have a session row. With s3 there are no local partial files: chunk
+# objects are only written under a live, locked session row, so none can be orphaned.
+# ----------------------------------------------------------------------
+def gc_uploads():
+    conn = get_db_connection()
+    if conn is None:
+        print("ERROR: Database connection failed.")
+        return 1
+
+    try:
+        cur = conn.cursor()
+        purged = purge_stale_upload_sessions(cur)
+        conn.commit()
+
+        # Partial files whose session row is gone (e.g. a crash in create_upload_session after the file was created).
+        # Only old files: a brand-new partial file exists briefly before its session row is committed.
+        cur.execute("SELECT upload_id::text FROM upload_sessions;")
+        live_ids = {row[0] for row in cur.fetchall()}
+        conn.rollback()
+        cutoff = time.time() - UPLOAD_SESSION_TTL_HOURS * 3600
+        orphans = 0
+        for name in os.listdir(PARTIAL_UPLOAD_FOLDER):
+            path = os.path.join(PARTIAL_UPLOAD_FOLDER, name)
+            if name not in live_ids and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                orphans += 1
+
+        print(f"Purged {purged} upload session(s) older than {UPLOAD_SESSION_TTL_HOURS}h; removed {orphans} orphaned partial file(s).")
+        return 0
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"ERROR: {e}")
+        return 1
+    finally:
+        conn.close()
+
+
+# ----------------------------------------------------------------------
+# shard-filestore
+# Moves legacy uploads stored directly in UPLOAD_FOLDER (file_path = document_id)
+# into the sharded layout (files/ab/cd/<uuid>) while the app keeps running:
+#   1. lock the job_documents row (a concurrent delete waits for us),
+#   2. hardlink the file to its new path (both paths are valid now),
+#   3. point file_path at the new path and commit,
+#   4. unlink the old name.
+# Requests that read the old file_path in between still find the file through
+# resolve_stored_path(). Safe to interrupt and re-run.
+# ----------------------------------------------------------------------
+def shard_filestore(dry_run=False):
+    if not require_local_storage('shard-filestore'):
+        return 1
+    conn = get_db_connection()
+    if conn is None:
+        print("ERROR: Database connection failed.")
+        return 1
+
+    moved = 0
+    missing = 0
+
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT document_id::text, file_path FROM job_documents WHERE strpos(file_path, '/') = 0;")
+        documents = cur.fetchall()
+        conn.rollback()
+
+        print(f"Found {len(documents)} document(s) outside the sharded layout in {UPLOAD_FOLDER}")
+
+        for document_id, legacy_path in documents:
+            new_path = flat_relative_path(legacy_path)
+            src_path = document_disk_path(legacy_path)
+            dest_path = document_disk_path(new_path)
+
+            if not os.path.exists(src_path) and not os.path.exists(dest_path):
+                print(f"WARNING: {document_id}: file {src_path} is missing, skipped.")
+                missing += 1
+                continue
+            if dry_run:
+                moved += 1
+                continue
+
+            try:
+                cur.execute("SELECT file_path FROM job_documents WHERE document_id = %s FOR UPDATE;", (document_id,))
+                row = cur.fetchone()
+                if row is None or row[0] != legacy_path:
+                    conn.rollback()  # Deleted or already moved meanwhile
+                    continue
+                if not os.path.exists(dest_path):
+                    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+                    place_blob(src_path, dest_path)
+                cur.execute("UPDATE job_documents SET file_path = %s WHERE document_id = %s;", (new_path, document_id))
+                conn.commit()
+            except (psycopg2.Error, OSError) as e:
+                conn.rollback()
+                print(f"ERROR: {document_id}: {e}")
+                continue
+
+            if os.path.exists(src_path):
+                os.remove(src_path)
+            moved += 1
+
+        action = "Would move" if dry_run else "Moved"
+        print(f"{action} {moved} file(s) into the sharded layout; {missing} missing file(s).")
+        return 0
+    finally:
+        conn.close()
+
+
+# ----------------------------------------------------------------------
+# bench-codec
+# Measures what DOCUMENT_COMPRESSION=zstd would do on real documents: size saving,
+# compression speed (paid once per upload) and decompression speed (paid on every
+# download by a client that does not accept zstd) next to plain read speed.
+# Read-only; nothing in the store or in the database is changed.
+# ----------------------------------------------------------------------
+def bench_codec(limit=200, level=DOCUMENT_COMPRESSION_LEVEL):
+    if zstandard is None:
+        print("ERROR: The zstandard package is not installed.")
+        return 1
+    conn = get_db_connection()
+    if conn is None:
+        print("ERROR: Database connection failed.")
+        return 1
+
+    try:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT file_path, mime_type FROM job_documents
+            WHERE storage_encoding IS NULL
+            ORDER BY upload_timestamp DESC
+            LIMIT %s;
+        """, (limit,))
+        documents = cur.fetchall()
+        conn.rollback()
+    finally:
+        conn.close()
+
+    compressor = zstandard.ZstdCompressor(level=level)
+    decompressor = zstandard.ZstdDecompressor()
+    totals = {}  # mime_type -> [files, original bytes, stored bytes, read s, compress s, decompress s]
+    for file_path, mime_type in documents:
+        try:
+            started = time.perf_counter()
+            with open_document_file(file_path, None) as f:
+                data = f.read()
+            read_time = time.perf_counter() - started
+        except OSError:
+            continue
+        started = time.perf_counter()
+        packed = compressor.compress(data)
+        compress_time = time.perf_counter() - started
+        started = time.perf_counter()
+        decompressor.decompress(packed)
+        decompress_time = time.perf_counter() - started
+
+        # What the upload path would keep (see compress_local_file)
+        kept = mime_type not in DOCUMENT_COMPRESSION_SKIP_MIME_TYPES and len(packed) <= len(data) * (1 - DOCUMENT_COMPRESSION_MIN_SAVING)
+        row = totals.setdefault(mime_type, [0, 0, 0, 0.0, 0.0, 0.0])
+        row[0] += 1
+        row[1] += len(data)
+        row[2] += len(packed) if kept else len(data)
+        row[3] += read_time
+        row[4] += compress_time
+        row[5] += decompress_time
+
+    def rate(size, seconds):
+        return f"{size / max(seconds, 1e-9) / 1048576:8.1f}"
+
+    print(f"zstd level {level}, {len(documents)} document(s) sampled")
+    print(f"{'mime type':<45} {'files':>5} {'saved':>6} {'read MiB/s':>10} {'comp MiB/s':>10} {'decomp MiB/s':>12}")
+    for mime_type, (files, original, stored, read_time, compress_time, decompress_time) in sorted(totals.items()):
+        saved = 1 - stored / original if original else 0
+        print(f"{mime_type:<45} {files:>5} {saved:>6.1%} {rate(original, read_time):>10} "
+              f"{rate(original, compress_time):>10} {rate(original, decompress_time):>12}")
+    return 0
+
+
+# ----------------------------------------------------------------------
+# reconcile
+# Diffs the filestore against the database in both directions:
+#   orphan   -> a file no job_documents / document_blobs row points at
+#               (upload died between writing the file and the INSERT, ...)
+#   dangling -> a row whose file is missing (files removed before a
+#               transaction that then rolled back, manual cleanup, ...)
+# Each area (blobs/, files/, legacy top-level files) is a sorted merge-join of
+# a filesystem walk and a server-side cursor over the matching paths, ordered
+# the same way. Shard directories are listed in parallel with os.scandir (no
+# stat per file) a few shards ahead of the merge, so memory stays at a handful
+# of shards and the database is read in RECONCILE_BATCH_SIZE batches.
+# Only orphans get stat()ed: files younger than --min-age-hours are ignored, as
+# they may belong to uploads that have not committed yet. --prefix limits a run
+# to the shards starting with those hex digits, e.g. one of 0..f per night.
+# Orphans can be moved to UPLOAD_FOLDER/.quarantine or deleted (each is checked
+# against the database again first). Dangling rows are only reported.
+# ----------------------------------------------------------------------
+RECONCILE_BATCH_SIZE = 10000
+QUARANTINE_FOLDER = os.path.join(UPLOAD_FOLDER, '.quarantine')
+# Top-level entries of UPLOAD_FOLDER that are not legacy documents
+RECONCILE_AREAS = ('blobs', 'files')
+RECONCILE_SKIP_TOP_LEVEL = set(RECONCILE_AREAS) | {os.path.basename(PARTIAL_UPLOAD_FOLDER), os.path.basename(QUARANTINE_FOLDER)}
+
+
+def scan_shard(area, shard):
+    """Sorted relative paths of the files in one shard (area/ab/*/*). Runs in a worker thread."""
+    base = os.path.join(UPLOAD_FOLDER, area, shard)
+    paths = []
+    try:
+        with os.scandir(base) as entries:
+            subdirs = [entry.name for entry in entries if entry.is_dir(follow_symlinks=False)]
+        for sub in subdirs:
+            with os.scandir(os.path.join(base, sub)) as entries:
+                paths.extend(f"{area}/{shard}/{sub}/{entry.name}" for entry in entries if entry.is_file(follow_symlinks=False))
+    except FileNotFoundError:
+        pass  # Shard removed while scanning
+    paths.sort()
+    return paths
+
+
+def scan_area(executor, area, prefix, window):
+    """Yields every file path of an area in sorted order, listing up to `window` shards ahead."""
+    try:
+        with os.scandir(os.path.join(UPLOAD_FOLDER, area)) as entries:
+            shards = sorted(entry.name for entry in entries
+                            if entry.is_dir(follow_symlinks=False) and entry.name.startswith(prefix))
+    except FileNotFoundError:
+        return
+    pending = deque()
+    for shard in shards:
+        pending.append(executor.submit(scan_shard, area, shard))
+        if len(pending) >= window:
+            yield from pending.popleft().result()
+    while pending:
+        yield from pending.popleft().result()
+
+
+def scan_legacy(prefix):
+    """Yields the sorted names of plain files directly in UPLOAD_FOLDER (pre-sharding uploads, stray temp files)."""
+    with os.scandir(UPLOAD_FOLDER) as entries:
+        names = sorted(entry.name for entry in entries
+                       if entry.is_file(follow_symlinks=False) and entry.name.startswith(prefix)
+                       and entry.name not in RECONCILE_SKIP_TOP_LEVEL)
+    yield from names
+
+
+def stream_db_paths(conn, area, prefix, scan_started):
+    """
+    Yields (path, document_id) for every row pointing into an area, ordered like the
+    filesystem walk (byte order). document_id is None for document_blobs rows.
+    Rows created after the scan started are left out (their files may not have been seen).
+    """
+    if area == 'blobs':
+        query = """
+            SELECT path, document_id FROM (
+                SELECT file_path AS path, document_id::text AS document_id FROM job_documents
+                WHERE file_path LIKE %(like)s AND upload_timestamp < %(since)s
+                UNION ALL
+                SELECT 'blobs/' || substr(content_hash, 1, 2) || '/' || substr(content_hash, 3, 2) || '/' || content_hash, NULL
+                FROM document_blobs
+                WHERE content_hash LIKE %(hash_like)s AND created_at < %(since)s
+            ) refs
+            ORDER BY path COLLATE "C";
+        """
+    elif area == 'files':
+        query = """
+            SELECT file_path AS path, document_id::text FROM job_documents
+            WHERE file_path LIKE %(like)s AND upload_timestamp < %(since)s
+            ORDER BY path COLLATE "C";
+        """
+    else:
+        query = """
+            SELECT file_path AS path, document_id::text FROM job_documents
+            WHERE strpos(file_path, '/') = 0 AND file_path LIKE %(hash_like)s AND upload_timestamp < %(since)s
+            ORDER BY path COLLATE "C";
+        """
+    cur = conn.cursor(name=f"reconcile_{area}")  # Server-side cursor: fetched in batches
+    cur.itersize = RECONCILE_BATCH_SIZE
+    cur.execute(query, {"like": f"{area}/{prefix}%", "hash_like": f"{prefix}%", "since": scan_started})
+    try:
+        yield from cur
+    finally:
+        cur.close()
+
+
+def merge_paths(fs_paths, db_rows):
+    """Merge-joins two sorted streams. Yields ('orphan', path, None) and ('dangling', path, document_id)."""
+    fs_path = next(fs_paths, None)
+    db_row = next(db_rows, None)
+    while fs_path is not None or db_row is not None:
+        if db_row is None or (fs_path is not None and fs_path < db_row[0]):
+            yield 'orphan', fs_path, None
+            fs_path = next(fs_paths, None)
+        elif fs_path is None or db_row[0] < fs_path:
+            yield 'dangling', db_row[0], db_row[1]
+            db_row = next(db_rows, None)
+        else:
+            # Matched; a shared blob may be referenced by several rows
+            while db_row is not None and db_row[0] == fs_path:
+                db_row = next(db_rows, None)
+            fs_path = next(fs_paths, None)
+
+
+def is_uuid(value):
+    try:
+        uuid.UUID(value)
+        return True
+    except ValueError:
+        return False
+
+
+def remove_orphan(conn, area, path, action):
+    """
+    Re-checks one orphan against the database and quarantines or deletes it.
+    Blobs are handled under the blob's advisory lock, like uploads and deletes.
+    Returns True if the file was moved/removed.
+    """
+    name = os.path.basename(path)
+    full_path = document_disk_path(path)
+    cur = conn.cursor()
+    try:
+        if area == 'blobs':
+            lock_blob(cur, name)
+            cur.execute("""
+                SELECT EXISTS (SELECT 1 FROM document_blobs WHERE content_hash = %s)
+                    OR EXISTS (SELECT 1 FROM job_documents WHERE content_hash = %s AND file_path = %s);
+            """, (name, name, path))
+            referenced = cur.fetchone()[0]
+        elif is_uuid(name):
+            # Flat file named after its document (also covers a legacy file being moved by shard-filestore)
+            cur.execute("SELECT EXISTS (SELECT 1 FROM job_documents WHERE document_id = %s);", (name,))
+            referenced = cur.fetchone()[0]
+        else:
+            referenced = False  # Temp files (.upload-*, *.tmp-<pid>, *.zst-tmp) are never referenced
+
+        if referenced or not os.path.exists(full_path):
+            conn.rollback()
+            return False
+        if action == 'quarantine':
+            dest_path = os.path.join(QUARANTINE_FOLDER, path)
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            os.replace(full_path, dest_path)
+        else:
+            os.remove(full_path)
+        conn.commit()  # Releases the blob lock
+        return True
+    except (psycopg2.Error, OSError) as e:
+        conn.rollback()
+        print(f"ERROR: {path}: {e}")
+        return False
+    finally:
+        cur.close()
+
+
+def reconcile(prefix='', action=None, workers=8, min_age_hours=24):
+    if not require_local_storage('reconcile'):
+        return 1
+    conn = get_db_connection()
+    action_conn = get_db_connection() if action else None
+    if conn is None or (action and action_conn is None):
+        print("ERROR: Database connection failed.")
+        return 1
+
+    scan_started = time.time()
+    cutoff = scan_started - min_age_hours * 3600
+    counts = {'orphan': 0, 'orphan_bytes': 0, 'young': 0, 'dangling': 0, 'removed': 0}
+
+    try:
+        scan_started_ts = datetime.fromtimestamp(scan_started, tz=timezone.utc)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for area in RECONCILE_AREAS + ('legacy',):
+                if area == 'legacy':
+                    fs_paths = scan_legacy(prefix)
+                else:
+                    fs_paths = scan_area(executor, area, prefix, workers * 2)
+                db_rows = stream_db_paths(conn, area, prefix, scan_started_ts)
+
+                for kind, path, document_id in merge_paths(fs_paths, db_rows):
+                    if kind == 'dangling':
+                        if os.path.exists(resolve_disk_path(path)):
+                            continue  # Written or moved after the scan
+                        counts['dangling'] += 1
+                        owner = f"document {document_id}" if document_id else f"blob {os.path.basename(path)}"
+                        print(f"DANGLING {owner}: {path} is missing")
+                        continue
+
+                    try:
+                        stat = os.lstat(document_disk_path(path))
+                    except FileNotFoundError:
+                        continue  # Deleted after the scan
+                    if stat.st_mtime > cutoff:
+                        counts['young'] += 1  # Possibly an upload that has not committed yet
+                        continue
+                    counts['orphan'] += 1
+                    counts['orphan_bytes'] += stat.st_size
+                    print(f"ORPHAN {path} ({stat.st_size} bytes)")
+                    if action and remove_orphan(action_conn, area, path, action):
+                        counts['removed'] += 1
+                conn.rollback()  # Ends the server-side cursor's transaction before the next area
+
+        done = {'quarantine': f"; {counts['removed']} moved to {QUARANTINE_FOLDER}",
+                'delete': f"; {counts['removed']} deleted"}.get(action, "")
+        print(f"{counts['orphan']} orphaned file(s), {counts['orphan_bytes']} byte(s){done}; "
+              f"{counts['young']} recent unreferenced file(s) skipped; {counts['dangling']} dangling row(s); "
+              f"{time.time() - scan_started:.1f}s")
+        return 0
+    except psycopg2.Error as e:
+        print(f"ERROR: {e}")
+        return 1
+    finally:
+        conn.close()
+        if action_conn:
+            action_conn.close()
+
+
+# ----------------------------------------------------------------------
+# scrub
+# Re-reads every stored file and checks it against the SHA-256 and size recorded
+# at upload (job_documents.content_hash / file_size), so silent corruption or
+# truncation is found before a user downloads the document. Results go to
+# job_documents.integrity_status / verified_at (reported by API 32.0).
+#   - files are hashed in a process pool, each process throttled to its share of
+#     --rate-mib so the scrub never starves live traffic of disk bandwidth,
+#   - shared blobs are read once for all the documents that reference them,
+#   - progress is checkpointed in scrub_runs after every batch: a pass that is
+#     stopped (--max-minutes, Ctrl-C, reboot) resumes where it stopped next time.
+# Rows from before migration 002 have no checksum yet; it is recorded on their
+# first successful read. Meant to run nightly (contact_db_scrub.timer).
+# ----------------------------------------------------------------------
+SCRUB_BATCH_SIZE = 200
+SCRUB_LOCK_KEY = 'jobassist-scrub'  # advisory lock: one scrub at a time
+
+
+def verify_stored_file(file_path, storage_encoding, bytes_per_second):
+    """
+    Pool entry point: reads one stored file (original bytes, decompressed if needed)
+    at no more than bytes_per_second. Returns (file_path, outcome, content_hash, size, error)
+    with outcome 'read', 'missing' or 'unreadable'.
+    """
+    sha256 = hashlib.sha256()
+    size = 0
+    started = time.monotonic()
+    try:
+        with open_document_file(file_path, storage_encoding) as f:
+            while True:
+                chunk = f.read(HASH_CHUNK_SIZE)
+                if not chunk:
+                    break
+                sha256.update(chunk)
+                size += len(chunk)
+                ahead = size / bytes_per_second - (time.monotonic() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+    except FileNotFoundError:
+        return file_path, 'missing', None, None, None
+    except Exception as e:  # I/O error, truncated or damaged zstd frame, ...
+        return file_path, 'unreadable', None, size, f"{type(e).__name__}: {e}"
+    return file_path, 'read', sha256.hexdigest(), size, None
+
+
+def scrub(workers=2, rate_mib=20.0, max_minutes=None, restart=False):
+    conn = get_db_connection()
+    if conn is None:
+        print("ERROR: Database connection failed.")
+        return 1
+
+    try:
+        cur = conn.cursor()
+        # Session-level lock, held until the connection closes (a timer run may overlap a manual one)
+        cur.execute("SELECT pg_try_advisory_lock(hashtextextended(%s, 0));", (SCRUB_LOCK_KEY,))
+        if not cur.fetchone()[0]:
+            print("Another scrub is already running.")
+            return 1
+
+        cur.execute("SELECT run_id, checkpoint_path FROM scrub_runs WHERE finished_at IS NULL ORDER BY run_id DESC LIMIT 1;")
+        run = cur.fetchone()
+        if run and restart:
+            cur.execute("UPDATE scrub_runs SET finished_at = NOW() WHERE run_id = %s;", (run[0],))
+            run = None
+        if run is None:
+            cur.execute("INSERT INTO scrub_runs DEFAULT VALUES RETURNING run_id, checkpoint_path;")
+            run = cur.fetchone()
+            print(f"Starting scrub run {run[0]}")
+        else:
+            print(f"Resuming scrub run {run[0]} after {run[1]!r}")
+        conn.commit()
+        run_id, checkpoint = run
+
+        deadline = time.monotonic() + max_minutes * 60 if max_minutes else None
+        per_worker_rate = rate_mib * 1048576 / workers
+        session = {'files': 0, 'bytes': 0, 'corrupt': 0, 'missing': 0}
+        started = time.monotonic()
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            while True:
+                if deadline and time.monotonic() > deadline:
+                    print(f"Time limit reached; run {run_id} resumes after {checkpoint!r} next time.")
+                    break
+
+                # One entry per stored file, whatever the number of documents sharing it
+                cur.execute("""
+                    SELECT file_path COLLATE "C", max(content_hash), max(file_size), max(storage_encoding)
+                    FROM job_documents
+                    WHERE file_path COLLATE "C" > %s
+                    GROUP BY 1
+                    ORDER BY 1
+                    LIMIT %s;
+                """, (checkpoint, SCRUB_BATCH_SIZE))
+                files = cur.fetchall()
+                conn.rollback()
+                if not files:
+                    cur.execute("UPDATE scrub_runs SET finished_at = NOW(), updated_at = NOW() WHERE run_id = %s;", (run_id,))
+                    conn.commit()
+                    print(f"Scrub run {run_id} complete.")
+                    break
+
+                results = []  # (file_path, integrity_status, content_hash to record, size to record)
+                batch_bytes = 0
+                for (file_path, expected_hash, expected_size, _), (_, outcome, content_hash, size, error) in zip(
+                        files, pool.map(verify_stored_file, [f[0] for f in files], [f[3] for f in files],
+                                        [per_worker_rate] * len(files))):
+                    batch_bytes += size or 0
+                    if outcome == 'missing':
+                        results.append((file_path, 'missing', None, None))
+                        print(f"MISSING {file_path}")
+                    elif outcome == 'unreadable':
+                        results.append((file_path, 'corrupt', None, None))
+                        print(f"CORRUPT {file_path}: {error}")
+                    elif (expected_hash and content_hash != expected_hash) or \
+                            (expected_size is not None and size != expected_size):
+                        results.append((file_path, 'corrupt', None, None))
+                        print(f"CORRUPT {file_path}: sha256 {content_hash} / {size} bytes, "
+                              f"expected {expected_hash} / {expected_size} bytes")
+                    else:
+                        results.append((file_path, 'ok', content_hash, size))
+
+                # Only rows that still exist are updated (and counted): a document deleted
+                # while its file was being read is not reported as missing
+                updated = psycopg2.extras.execute_values(cur, """
+                    UPDATE job_documents jd
+                    SET integrity_status = v.status, verified_at = NOW(),
+                        content_hash = COALESCE(jd.content_hash, v.content_hash),
+                        file_size = COALESCE(jd.file_size, v.file_size)
+                    FROM (VALUES %s) AS v(file_path, status, content_hash, file_size)
+                    WHERE jd.file_path = v.file_path
+                    RETURNING jd.file_path, v.status;
+                """, results, template="(%s, %s, %s::character(64), %s::bigint)", fetch=True)
+                statuses = dict(updated)
+                corrupt = sum(1 for status in statuses.values() if status == 'corrupt')
+                missing = sum(1 for status in statuses.values() if status == 'missing')
+
+                checkpoint = files[-1][0]
+                cur.execute("""
+                    UPDATE scrub_runs
+                    SET checkpoint_path = %s, updated_at = NOW(),
+                        files_checked = files_checked + %s, bytes_checked = bytes_checked + %s,
+                        corrupt_files = corrupt_files + %s, missing_files = missing_files + %s
+                    WHERE run_id = %s;
+                """, (checkpoint, len(files), batch_bytes, corrupt, missing, run_id))
+                conn.commit()
+
+                session['files'] += len(files)
+                session['bytes'] += batch_bytes
+                session['corrupt'] += corrupt
+                session['missing'] += missing
+
+        elapsed = time.monotonic() - started
+        print(f"Checked {session['files']} file(s), {session['bytes']} byte(s) in {elapsed:.1f}s "
+              f"({session['bytes'] / max(elapsed, 1e-9) / 1048576:.1f} MiB/s); "
+              f"{session['corrupt']} corrupt, {session['missing']} missing.")
+        return 1 if session['corrupt'] or session['missing'] else 0
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"ERROR: {e}")
+        return 1
+    except KeyboardInterrupt:
+        conn.rollback()
+        print("Interrupted; the run resumes from its last checkpoint next time.")
+        return 1
+    finally:
+        conn.close()
+
+
+# ----------------------------------------------------------------------
+# recount-usage
+# Rebuilds the storage usage counters (migration 009) from job_documents and
+# reports every user whose counters had drifted. They are kept by triggers, so
+# drift means rows were changed with the triggers disabled (e.g. a restore).
+# Document uploads and deletes wait while the recount runs.
+# ----------------------------------------------------------------------
+def recount_usage():
+    conn = get_db_connection()
+    if conn is None:
+        print("ERROR: Database connection failed.")
+        return 1
+
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT user_id::text, file_count, total_bytes FROM user_storage_usage;")
+        before = {row[0]: row[1:] for row in cur.fetchall()}
+        cur.execute("SELECT public.recount_storage_usage();")
+        cur.execute("SELECT user_id::text, file_count, total_bytes FROM user_storage_usage;")
+        after = {row[0]: row[1:] for row in cur.fetchall()}
+        conn.commit()
+
+        drifted = 0
+        for user_id, counters in sorted(after.items()):
+            old = before.get(user_id, (0, 0))
+            if old != counters:
+                drifted += 1
+                print(f"{user_id}: {old[0]} file(s) / {old[1]} byte(s) -> {counters[0]} file(s) / {counters[1]} byte(s)")
+        print(f"Recounted storage usage of {len(after)} user(s); {drifted} had drifted.")
+        return 0
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"ERROR: {e}")
+        return 1
+    finally:
+        conn.close()
+
+
+def resumable(command, body):
+    """Runs a bulk command; on Ctrl-C or an error its checkpoint is kept for the next run."""
+    try:
+        return body()
+    except KeyboardInterrupt:
+        print(f"{command}: interrupted; run it again to continue from the checkpoint.")
+        return 130
+    except (psycopg2.Error, RuntimeError, OSError) as e:
+        print(f"ERROR: {command}: {e}")
+        return 1
+
+
+# ----------------------------------------------------------------------
+# import-contacts
+# Loads a LinkedIn "Connections" export (or data/mock_contacts.csv) into contacts,
+# --batch-size rows per transaction, then adds the new company names to
+# company_name_mapping (regenerate-mappings). A contact whose email address or
+# profile URL is already stored is skipped, so importing a newer export of the
+# same network only adds the new connections. The checkpoint is the number of
+# CSV records already imported.
+# ----------------------------------------------------------------------
+IMPORT_BATCH_SIZE = 1000
+# Normalised CSV header -> contacts column (LinkedIn export and mock_contacts.csv headers)
+CONTACT_CSV_COLUMNS = {
+    'first_name': 'first_name', 'last_name': 'last_name',
+    'url': 'url', 'linkedin_url': 'url', 'profile_url': 'url',
+    'email_address': 'email_address', 'email': 'email_address',
+    'company': 'company', 'position': 'position',
+    'connected_on': 'connected_on', 'connection_date': 'connected_on',
+}
+CONTACT_FIELDS = ('first_name', 'last_name', 'url', 'email_address', 'company', 'position', 'connected_on')
+CONTACT_FIELD_LENGTHS = {'first_name': 50, 'last_name': 50, 'url': 255, 'email_address': 100, 'company': 100, 'position': 100}
+CONTACT_DATE_FORMATS = ('%Y-%m-%d', '%d %b %Y', '%m/%d/%Y')
+
+
+def parse_contact_date(value):
+    for date_format in CONTACT_DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+    return None
+
+
+def read_contact_batches(csv_path, after_record, batch_size):
+    """
+    Yields (records read so far, rows) with rows as contacts tuples, skipping the
+    first after_record records. LinkedIn puts a few lines of notes above the header.
+    """
+    with open(csv_path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        columns = None
+        for header in reader:
+            names = [CONTACT_CSV_COLUMNS.get(cell.strip().lower().replace(' ', '_')) for cell in header]
+            if 'first_name' in names:
+                columns = names
+                break
+        if columns is None:
+            raise RuntimeError(f"{csv_path}: no header row with a 'First Name' column found.")
+
+        record = 0
+        batch = []
+        for values in reader:
+            record += 1
+            if record <= after_record or not any(value.strip() for value in values):
+                continue
+            contact = dict.fromkeys(CONTACT_FIELDS)
+            for field, value in zip(columns, values):
+                value = value.strip()
+                if field and value:
+                    contact[field] = value[:CONTACT_FIELD_LENGTHS[field]] if field in CONTACT_FIELD_LENGTHS else value
+            if contact['connected_on']:
+                contact['connected_on'] = parse_contact_date(contact['connected_on'])
+            batch.append(tuple(contact[field] for field in CONTACT_FIELDS))
+            if len(batch) >= batch_size:
+                yield record, batch
+                batch = []
+        if batch:
+            yield record, batch
+
+
+def insert_contacts(rows):
+    def work(cur):
+        psycopg2.extras.execute_values(cur, """
+            INSERT INTO contacts (first_name, last_name, url, email_address, company, "position", connected_on)
+            SELECT v.first_name, v.last_name, v.url, v.email_address, v.company, v.position, v.connected_on
+            FROM (VALUES %s) AS v(first_name, last_name, url, email_address, company, position, connected_on)
+            WHERE v.url IS NULL OR NOT EXISTS (SELECT 1 FROM contacts c WHERE c.url = v.url)
+            ON CONFLICT (email_address) DO NOTHING;
+        """, rows, template="(%s, %s, %s, %s, %s, %s, %s::date)", page_size=len(rows))
+        return len(rows)
+    return with_connection(work)
+
+
+def import_contacts(csv_path, workers=4, batch_size=IMPORT_BATCH_SIZE, restart=False):
+    def body():
+        position, done = load_checkpoint('import-contacts', restart)
+        batches = read_contact_batches(csv_path, int(position) if position else 0, batch_size)
+        run_batches('import-contacts', batches, insert_contacts, workers, items_done=done)
+        return regenerate_mappings(workers=workers)
+    return resumable('import-contacts', body)
+
+
+# ----------------------------------------------------------------------
+# regenerate-mappings
+# Adds an unmapped company_name_mapping row (company_id NULL) for every raw
+# company name in contacts that has none yet, so it shows up in the
+# standardization workflow (API 2 / 15). Replaces bin/regenerate_unmapped.py,
+# in contacts.id ranges of --batch-size; the checkpoint is the last id done.
+# ----------------------------------------------------------------------
+MAPPING_BATCH_SIZE = 5000
+
+
+def regenerate_mappings(workers=4, batch_size=MAPPING_BATCH_SIZE, restart=False):
+    def add_mappings(bounds):
+        def work(cur):
+            cur.execute("""
+                INSERT INTO company_name_mapping (raw_name, company_id)
+                SELECT DISTINCT c.company, NULL::integer
+                FROM contacts c
+                WHERE c.id > %s AND c.id <= %s AND c.company IS NOT NULL
+                  AND NOT EXISTS (SELECT 1 FROM company_name_mapping m WHERE m.raw_name = c.company)
+                ON CONFLICT (raw_name) DO NOTHING;
+            """, bounds)
+            return cur.rowcount
+        return with_connection(work)
+
+    def body():
+        position, done = load_checkpoint('regenerate-mappings', restart)
+        max_id = fetch_value("SELECT COALESCE(MAX(id), 0) FROM contacts;")
+        start = int(position) if position else 0
+        batches = ((min(low + batch_size, max_id), (low, min(low + batch_size, max_id)))
+                   for low in range(start, max_id, batch_size))
+        added = run_batches('regenerate-mappings', batches, add_mappings, workers, items_done=done)
+        print(f"{added} unmapped company name(s) added.")
+        return 0
+    return resumable('regenerate-mappings', body)
+
+
+# ----------------------------------------------------------------------
+# rebuild-search
+# Recomputes job_documents.search_vector from extracted_text, e.g. after
+# changing SEARCH_TEXT_CONFIG. Documents go in document_id order, --batch-size
+# per transaction; the checkpoint is the last document_id done.
+# ----------------------------------------------------------------------
+SEARCH_BATCH_SIZE = 500
+
+
+def rebuild_search(workers=4, batch_size=SEARCH_BATCH_SIZE, restart=False):
+    def update_vectors(document_ids):
+        def work(cur):
+            cur.execute("""
+                UPDATE job_documents
+                SET search_vector = to_tsvector(%s::regconfig, extracted_text)
+                WHERE document_id = ANY(%s::uuid[]) AND extracted_text IS NOT NULL;
+            """, (SEARCH_TEXT_CONFIG, document_ids))
+            return cur.rowcount
+        return with_connection(work)
+
+    def document_batches(after_id, read_conn):
+        cur = read_conn.cursor(name='rebuild_search')  # Server-side: ids are streamed, not loaded at once
+        cur.itersize = batch_size * 4
+        cur.execute("""
+            SELECT document_id::text FROM job_documents
+            WHERE extracted_text IS NOT NULL AND document_id > %s::uuid
+            ORDER BY document_id;
+        """, (after_id,))
+        batch = []
+        for (document_id,) in cur:
+            batch.append(document_id)
+            if len(batch) >= batch_size:
+                yield batch[-1], batch
+                batch = []
+        if batch:
+            yield batch[-1], batch
+
+    def body():
+        position, done = load_checkpoint('rebuild-search', restart)
+        after_id = position or '00000000-0000-0000-0000-000000000000'
+        total = fetch_value("SELECT COUNT(*) FROM job_documents WHERE extracted_text IS NOT NULL;")
+        read_conn = get_db_connection()
+        if read_conn is None:
+            raise RuntimeError("Database connection failed.")
+        try:
+            run_batches('rebuild-search', document_batches(after_id, read_conn), update_vectors, workers,
+                        items_done=done, total=total)
+        finally:
+            read_conn.close()
+        return 0
+    return resumable('rebuild-search', body)
+
+
+# ----------------------------------------------------------------------
+# reindex
+# Rebuilds the indexes of every table in the public schema with REINDEX TABLE
+# CONCURRENTLY (no write lock: the app keeps running). One table per batch,
+# --workers tables at a time; the checkpoint is the last table done.
+# ----------------------------------------------------------------------
+def list_public_relations(kinds):
+    """Names of the public schema's relations of the given pg_class relkinds, sorted."""
+    def work(cur):
+        cur.execute("""
+            SELECT c.relname FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = 'public' AND c.relkind = ANY(%s);
+        """, (list(kinds),))
+        return sorted(row[0] for row in cur.fetchall())
+    return with_connection(work)
+
+
+def reindex(workers=2, restart=False):
+    def reindex_table(table):
+        conn = get_db_connection()
+        if conn is None:
+            raise RuntimeError("Database connection failed.")
+        try:
+            conn.autocommit = True  # REINDEX CONCURRENTLY cannot run inside a transaction
+            started = time.monotonic()
+            conn.cursor().execute(sql.SQL("REINDEX TABLE CONCURRENTLY {};").format(sql.Identifier('public', table)))
+            print(f"reindex: {table} ({time.monotonic() - started:.1f}s)")
+            return 1
+        finally:
+            conn.close()
+
+    def body():
+        position, done = load_checkpoint('reindex', restart)
+        tables = [table for table in list_public_relations('r') if position is None or table > position]
+        run_batches('reindex', ((table, table) for table in tables), reindex_table, workers,
+                    items_done=done, total=done + len(tables))
+        return 0
+    return resumable('reindex', body)
+
+
+# ----------------------------------------------------------------------
+# warm-cache
+# Loads the public tables and indexes into PostgreSQL's shared buffers after a
+# restart, so the first requests do not all go to disk. Uses the pg_prewarm
+# extension if it is installed (CREATE EXTENSION pg_prewarm, as a superuser);
+# otherwise tables are read with a sequential scan, which only warms the OS
+# page cache. The checkpoint is the last relation done.
+# ----------------------------------------------------------------------
+def warm_cache(workers=4, restart=False):
+    def body():
+        position, done = load_checkpoint('warm-cache', restart)
+        has_prewarm = fetch_value("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_prewarm');")
+        if not has_prewarm:
+            print("warm-cache: pg_prewarm is not installed; reading tables only (OS page cache).")
+        relations = list_public_relations('ri' if has_prewarm else 'r')
+        relations = [name for name in relations if position is None or name > position]
+
+        def warm(name):
+            if has_prewarm:
+                # pg_prewarm returns the number of blocks it loaded
+                return fetch_value("SELECT pg_prewarm(%s::regclass);", (f'public."{name}"',))
+            return fetch_value(sql.SQL("SELECT COUNT(*) FROM {};").format(sql.Identifier('public', name)))
+
+        warmed = run_batches('warm-cache', ((name, name) for name in relations), warm, workers, items_done=done)
+        print(f"{len(relations)} relation(s) warmed ({warmed} {'block' if has_prewarm else 'row'}(s)).")
+        return 0
+    return resumable('warm-cache', body)
+
+
+# ----------------------------------------------------------------------
+# benchmark
+# Latency of the main read endpoints, called in-process through the Flask test
+# client (same code, config and connection pool as gunicorn, no network) from
+# --concurrency threads. Prints percentiles per endpoint. Nothing is written,
+# so there is no checkpoint.
+# ----------------------------------------------------------------------
+BENCHMARK_ENDPOINTS = (
+    '/api/sidebar',
+    '/api/companies',
+    '/api/applications/all',
+    '/api/documents/all',
+    '/api/contacts/all',
+    '/api/dashboard',
+)
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))]
+
+
+def benchmark(requests_per_endpoint=200, concurrency=8, endpoints=None):
+    concurrency = pool_workers(concurrency)
+    local = threading.local()
+
+    def timed_get(path):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = flask_app.test_client()
+        started = time.perf_counter()
+        response = client.get(path)
+        response.close()
+        return time.perf_counter() - started, response.status_code
+
+    print(f"{requests_per_endpoint} request(s) per endpoint, {concurrency} concurrent")
+    print(f"{'endpoint':<28} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>6}")
+    failed = False
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for path in endpoints or BENCHMARK_ENDPOINTS:
+            started = time.perf_counter()
+            results = list(executor.map(timed_get, [path] * requests_per_endpoint))
+            elapsed = time.perf_counter() - started
+            latencies = sorted(seconds * 1000 for seconds, _ in results)
+            errors = sum(1 for _, status in results if status >= 400)
+            failed = failed or errors > 0
+            print(f"{path:<28} {len(results) / elapsed:>7.1f} {percentile(latencies, 0.5):>8.1f} "
+                  f"{percentile(latencies, 0.95):>8.1f} {percentile(latencies, 0.99):>8.1f} "
+                  f"{latencies[-1]:>8.1f} {errors:>6}")
+    return 1 if failed else 0
+
+
+# ----------------------------------------------------------------------
+# backup / restore
+# backup writes one snapshot per run under --dest (default BACKUP_DIR):
+#   <name>/db/             pg_dump directory format, --jobs tables dumped in parallel
+#   <name>/files/          the stored files the dumped job_documents rows point at
+#   <name>/files.manifest  sha256, size, source mtime and path of each of those files
+#   latest -> the newest complete snapshot
+# The dump and the file list are read from one exported snapshot, and deferred
+# file deletions (worker.py) are held back until the files are copied, so every
+# dumped row finds its file. A file whose size and mtime are unchanged since the
+# previous snapshot is hardlinked from it instead of copied, so a run only copies
+# and hashes what was uploaded since; each snapshot is still a complete tree
+# that can be restored or deleted on its own. The database dump runs while the
+# files are copied. A snapshot is built as <name>.partial and renamed when done.
+# restore loads a snapshot into an empty database and/or filestore, re-hashing
+# every file against the manifest, then checks that each job_documents row of
+# the restored database has its file, with the right size and checksum.
+# ----------------------------------------------------------------------
+BACKUP_DIR = os.environ.get('BACKUP_DIR', '/var/backups/jobassist')
+BACKUP_MANIFEST = 'files.manifest'
+BACKUP_NAME_FORMAT = '%Y%m%d-%H%M%S'
+
+
+def pg_client_command(program, db_config, *args):
+    """(argv, env) for a PostgreSQL client program using app.py's DB_CONFIG."""
+    argv = [program, '-d', db_config['dbname']]
+    if db_config.get('host'):
+        argv += ['-h', db_config['host']]
+    if db_config.get('port'):
+        argv += ['-p', str(db_config['port'])]
+    if db_config.get('user'):
+        argv += ['-U', db_config['user']]
+    env = dict(os.environ)
+    if db_config.get('password'):
+        env['PGPASSWORD'] = db_config['password']
+    return argv + list(args), env
+
+
+def list_snapshots(dest):
+    """Names of the complete snapshots under dest, oldest first."""
+    names = []
+    for name in os.listdir(dest):
+        try:
+            datetime.strptime(name, BACKUP_NAME_FORMAT)
+        except ValueError:
+            continue
+        names.append(name)
+    return sorted(names)
+
+
+def read_manifest(snapshot_dir):
+    """path -> (sha256, size, mtime_ns) of a snapshot's files ({} if it has no manifest)."""
+    entries = {}
+    try:
+        with open(os.path.join(snapshot_dir, BACKUP_MANIFEST), encoding='utf-8') as f:
+            for line in f:
+                sha256, size, mtime_ns, path = line.rstrip('\n').split('\t', 3)
+                entries[path] = (sha256, int(size), int(mtime_ns))
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def copy_hashed(src_path, dest_path):
+    """Copies a file durably; returns (sha256, size) of the bytes copied."""
+    sha256 = hashlib.sha256()
+    size = 0
+    with open(src_path, 'rb') as src, open(dest_path, 'wb') as dest:
+        while True:
+            chunk = src.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            sha256.update(chunk)
+            dest.write(chunk)
+            size += len(chunk)
+        dest.flush()
+        os.fsync(dest.fileno())
+    return sha256.hexdigest(), size
+
+
+def snapshot_file(key, files_dir, previous_files_dir, previous_manifest):
+    """
+    Puts one stored file into the snapshot (worker thread).
+    Returns (key, manifest entry, 'linked' / 'copied' / 'missing').
+    """
+    src_path = document_disk_path(key)
+    try:
+        stat = os.stat(src_path)
+    except FileNotFoundError:
+        return key, None, 'missing'
+    dest_path = os.path.join(files_dir, key)
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    previous = previous_manifest.get(key)
+    if previous and previous[1:] == (stat.st_size, stat.st_mtime_ns):
+        try:
+            os.link(os.path.join(previous_files_dir, key), dest_path)
+            return key, previous, 'linked'
+        except OSError:
+            pass  # Gone from the old snapshot, other filesystem, link limit: copy it
+    sha256, size = copy_hashed(src_path, dest_path)
+    return key, (sha256, size, stat.st_mtime_ns), 'copied'
+
+
+def backup(dest=BACKUP_DIR, jobs=4, file_workers=4, keep=7):
+    include_files = STORAGE_BACKEND == 'local'
+    if not include_files:
+        print(f"backup: STORAGE_BACKEND={STORAGE_BACKEND}: database only; protect the bucket with "
+              "versioning / replication on the object store.")
+    os.makedirs(dest, exist_ok=True)
+    for name in os.listdir(dest):
+        if name.endswith('.partial'):
+            shutil.rmtree(os.path.join(dest, name))  # Left behind by a failed run
+    snapshots = list_snapshots(dest)
+    previous_dir = os.path.join(dest, snapshots[-1]) if snapshots else None
+    name = datetime.now().strftime(BACKUP_NAME_FORMAT)
+    snapshot_dir = os.path.join(dest, name)
+    work_dir = snapshot_dir + '.partial'
+
+    conn = get_db_connection()
+    lock_conn = get_db_connection()
+    if conn is None or lock_conn is None:
+        print("ERROR: Database connection failed.")
+        return 1
+
+    started = time.monotonic()
+    dump = None
+    counts = {'linked': 0, 'copied': 0, 'missing': 0}
+    copied_bytes = 0
+    try:
+        if include_files:
+            # Session lock: worker.py skips deferred deletions while it is held
+            lock_conn.autocommit = True
+            lock_conn.cursor().execute("SELECT pg_advisory_lock(hashtextextended(%s, 0));", (BACKUP_LOCK_KEY,))
+
+        conn.set_session(isolation_level='REPEATABLE READ', readonly=True)
+        cur = conn.cursor()
+        cur.execute("SELECT pg_export_snapshot();")
+        snapshot_id = cur.fetchone()[0]
+
+        os.makedirs(work_dir)
+        argv, env = pg_client_command('pg_dump', DB_CONFIG, '--format=directory', f'--jobs={jobs}',
+                                      f'--snapshot={snapshot_id}', '--file', os.path.join(work_dir, 'db'))
+        dump = subprocess.Popen(argv, env=env)
+
+        if include_files:
+            cur.execute("SELECT DISTINCT file_path FROM job_documents;")
+            keys = sorted({resolve_stored_path(row[0]) for row in cur.fetchall()})
+            previous_manifest = read_manifest(previous_dir) if previous_dir else {}
+            previous_files_dir = os.path.join(previous_dir, 'files') if previous_dir else ''
+            files_dir = os.path.join(work_dir, 'files')
+            last_report = time.monotonic()
+            with ThreadPoolExecutor(max_workers=file_workers) as executor, \
+                    open(os.path.join(work_dir, BACKUP_MANIFEST), 'w', encoding='utf-8') as manifest:
+                results = executor.map(lambda key: snapshot_file(key, files_dir, previous_files_dir, previous_manifest), keys)
+                for done, (key, entry, outcome) in enumerate(results, 1):
+                    counts[outcome] += 1
+                    if outcome == 'missing':
+                        print(f"MISSING {key}")
+                        continue
+                    manifest.write(f"{entry[0]}\t{entry[1]}\t{entry[2]}\t{key}\n")
+                    if outcome == 'copied':
+                        copied_bytes += entry[1]
+                    if time.monotonic() - last_report >= PROGRESS_SECONDS:
+                        last_report = time.monotonic()
+                        print(f"backup: {done}/{len(keys)} files, {copied_bytes / 1048576:.0f} MiB copied")
+            lock_conn.cursor().execute("SELECT pg_advisory_unlock(hashtextextended(%s, 0));", (BACKUP_LOCK_KEY,))
+
+        if dump.wait() != 0:
+            print(f"ERROR: pg_dump exited with status {dump.returncode}.")
+            shutil.rmtree(work_dir, ignore_errors=True)
+            return 1
+        conn.rollback()  # The exported snapshot was only needed until pg_dump took it over
+
+        os.rename(work_dir, snapshot_dir)
+        latest_tmp = os.path.join(dest, '.latest-tmp')
+        if os.path.lexists(latest_tmp):
+            os.remove(latest_tmp)
+        os.symlink(name, latest_tmp)
+        os.replace(latest_tmp, os.path.join(dest, 'latest'))
+
+        for old in list_snapshots(dest)[:-keep] if keep > 0 else []:
+            shutil.rmtree(os.path.join(dest, old))  # Files shared with newer snapshots stay (hardlinks)
+            print(f"backup: removed old snapshot {old}")
+
+        print(f"backup: {snapshot_dir} in {time.monotonic() - started:.1f}s; {counts['copied']} file(s) copied "
+              f"({copied_bytes / 1048576:.1f} MiB), {counts['linked']} unchanged, {counts['missing']} missing")
+        return 1 if counts['missing'] else 0
+    except (psycopg2.Error, OSError) as e:
+        print(f"ERROR: {e}")
+        return 1
+    except KeyboardInterrupt:
+        print("backup: interrupted; the partial snapshot is removed on the next run.")
+        return 130
+    finally:
+        if dump and dump.poll() is None:
+            dump.terminate()
+            dump.wait()
+        conn.close()
+        lock_conn.close()  # Also releases the backup lock if it is still held
+
+
+def restore_file(key, entry, snapshot_files_dir, target_dir):
+    """
+    Re-hashes one snapshot file against its manifest entry (worker thread); copies it
+    into target_dir unless that is None. Returns (key, problem or None).
+    """
+    src_path = os.path.join(snapshot_files_dir, key)
+    try:
+        if target_dir is None:
+            with open(src_path, 'rb') as f:
+                sha256, size = hash_file(f)
+        else:
+            dest_path = os.path.join(target_dir, key)
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            sha256, size = copy_hashed(src_path, dest_path)
+    except FileNotFoundError:
+        return key, 'missing from the snapshot'
+    if (sha256, size) != entry[:2]:
+        return key, f"checksum mismatch ({size} bytes, sha256 {sha256})"
+    return key, None
+
+
+def check_restored_documents(db_config, files_dir, manifest):
+    """
+    Checks every job_documents row of a restored database against the restored
+    files: the file exists (also at its sharded path for legacy rows), its size
+    matches file_size and, for uncompressed files, its checksum matches content_hash.
+    Returns the number of problems.
+    """
+    conn = psycopg2.connect(**db_config)
+    try:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT DISTINCT ON (file_path) file_path, file_size, content_hash, storage_encoding
+            FROM job_documents
+            ORDER BY file_path;
+        """)
+        rows = cur.fetchall()
+    finally:
+        conn.close()
+
+    problems = 0
+    referenced = set()
+    for file_path, file_size, content_hash, storage_encoding in rows:
+        key = file_path
+        if not os.path.exists(os.path.join(files_dir, key)) and os.sep not in file_path:
+            key = flat_relative_path(file_path)  # Legacy row whose file was sharded later
+        referenced.add(key)
+        path = os.path.join(files_dir, key)
+        if not os.path.exists(path):
+            print(f"MISSING {file_path}")
+            problems += 1
+            continue
+        if storage_encoding:
+            continue  # Stored compressed: size and checksum describe the original content
+        if file_size is not None and os.path.getsize(path) != file_size:
+            print(f"SIZE MISMATCH {file_path}: {os.path.getsize(path)} bytes, expected {file_size}")
+            problems += 1
+        elif content_hash and key in manifest and manifest[key][0] != content_hash.strip():
+            print(f"CHECKSUM MISMATCH {file_path}")
+            problems += 1
+    unreferenced = len(set(manifest) - referenced)
+    print(f"restore: {len(rows)} stored file(s) checked against the database, {problems} problem(s), "
+          f"{unreferenced} file(s) in the snapshot without a row")
+    return problems
+
+
+def restore(snapshot, dbname=None, filestore=None, jobs=4, file_workers=4, verify_only=False):
+    snapshot = os.path.realpath(snapshot)
+    manifest = read_manifest(snapshot)
+    snapshot_files_dir = os.path.join(snapshot, 'files')
+    if not verify_only and not dbname and not filestore:
+        print("ERROR: give --dbname and/or --filestore to restore into, or --verify-only.")
+        return 1
+    if filestore and os.path.isdir(filestore) and os.listdir(filestore):
+        print(f"ERROR: {filestore} is not empty; restore into a new directory and switch UPLOAD_FOLDER to it.")
+        return 1
+
+    try:
+        if dbname and not verify_only:
+            # Into an existing, empty database (createdb -O jobert <dbname>); never over the live one
+            argv, env = pg_client_command('pg_restore', dict(DB_CONFIG, dbname=dbname), '--format=directory',
+                                          f'--jobs={jobs}', '--no-owner', '--exit-on-error', os.path.join(snapshot, 'db'))
+            started = time.monotonic()
+            if subprocess.run(argv, env=env).returncode != 0:
+                print("ERROR: pg_restore failed.")
+                return 1
+            print(f"restore: database {dbname} restored in {time.monotonic() - started:.1f}s")
+
+        target_dir = None if verify_only else filestore
+        problems = 0
+        with ThreadPoolExecutor(max_workers=file_workers) as executor:
+            results = executor.map(lambda item: restore_file(item[0], item[1], snapshot_files_dir, target_dir),
+                                   manifest.items())
+            for key, problem in results:
+                if problem:
+                    print(f"CORRUPT {key}: {problem}")
+                    problems += 1
+        action = 'verified' if target_dir is None else f'restored to {filestore} and verified'
+        print(f"restore: {len(manifest)} file(s) {action}, {problems} problem(s)")
+
+        if dbname:
+            problems += check_restored_documents(dict(DB_CONFIG, dbname=dbname), target_dir or snapshot_files_dir, manifest)
+        return 1 if problems else 0
+    except (psycopg2.Error, OSError) as e:
+        print(f"ERROR: {e}")
+        return 1
+
+
+# ----------------------------------------------------------------------
+# storage-check
+# Round trip against the configured document store (STORAGE_BACKEND): put, stat,
+# full and ranged reads, presigned URL, delete. Run it after pointing the app at
+# a new bucket, e.g. a local MinIO:
+#   STORAGE_BACKEND=s3 S3_ENDPOINT_URL=http://127.0.0.1:9000 python maintenance.py storage-check
+# Only touches a throwaway key under .storage-check/, never a document.
+# ----------------------------------------------------------------------
+def storage_check(size_mib=20):
+    storage = get_storage()
+    key = os.path.join('.storage-check', uuid.uuid4().hex)
+    size = size_mib * 1024 * 1024
+    print(f"Checking {type(storage).__name__} with a {size_mib} MiB object at {key}")
+
+    # Written in chunks so large sizes exercise multipart uploads without the memory
+    fd, src_path = tempfile.mkstemp(dir=UPLOAD_FOLDER, prefix='.storage-check-')
+    sha256 = hashlib.sha256()
+    with os.fdopen(fd, 'wb') as f:
+        for _ in range(size_mib):
+            chunk = os.urandom(1024 * 1024)
+            sha256.update(chunk)
+            f.write(chunk)
+    with open(src_path, 'rb') as f:
+        f.seek(size // 2)
+        middle = f.read(4096)
+
+    checks = []
+    try:
+        started = time.perf_counter()
+        storage.put_file(key, src_path)
+        put_time = time.perf_counter() - started
+        checks.append(("put consumed the source file", not os.path.exists(src_path)))
+        checks.append(("stat reports the size", storage.stat(key) == size))
+
+        started = time.perf_counter()
+        content_hash, read_size = hash_file(storage.open(key))
+        get_time = time.perf_counter() - started
+        checks.append(("read returns the same bytes", (content_hash, read_size) == (sha256.hexdigest(), size)))
+        with storage.open_range(key, size // 2, size // 2 + len(middle) - 1) as f:
+            checks.append(("ranged read returns the requested bytes", f.read() == middle))
+
+        url = storage.redirect_url(key, 60, content_disposition='attachment; filename="check.bin"')
+        print(f"Presigned URL: {url or '(not supported by this backend)'}")
+
+        storage.delete(key)
+        checks.append(("deleted object is gone", storage.stat(key) is None))
+        storage.delete(key)  # Deleting a missing object must not fail either
+        try:
+            storage.open(key).close()
+            checks.append(("open of a missing object raises FileNotFoundError", False))
+        except FileNotFoundError:
+            checks.append(("open of a missing object raises FileNotFoundError", True))
+    except Exception as e:
+        print(f"ERROR: {type(e).__name__}: {e}")
+        return 1
+    finally:
+        if os.path.exists(src_path):
+            os.remove(src_path)
+
+    for name, ok in checks:
+        print(f"  {'ok  ' if ok else 'FAIL'} {name}")
+    print(f"put {size / max(put_time, 1e-9) / 1048576:.1f} MiB/s, get {size / max(get_time, 1e-9) / 1048576:.1f} MiB/s")
+    return 0 if all(ok for _, ok in checks) else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="JobAssist maintenance tasks.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    dedupe = subparsers.add_parser('dedupe-filestore', help="Move flat uploads into the deduplicated blob store.")
+    dedupe.add_argument('--dry-run', action='store_true', help="Only report what would be migrated.")
+
+    subparsers.add_parser('gc-uploads', help="Purge stale resumable upload sessions and partial files.")
+
+    shard = subparsers.add_parser('shard-filestore', help="Move legacy top-level uploads into shard directories.")
+    shard.add_argument('--dry-run', action='store_true', help="Only report what would be moved.")
+
+    bench = subparsers.add_parser('bench-codec', help="Measure zstd ratio and throughput on stored documents.")
+    bench.add_argument('--limit', type=int, default=200, help="Number of recent documents to sample.")
+    bench.add_argument('--level', type=int, default=DOCUMENT_COMPRESSION_LEVEL, help="zstd level to test.")
+
+    recon = subparsers.add_parser('reconcile', help="Report orphaned files and rows whose file is missing.")
+    recon.add_argument('--prefix', default='', help="Only check shards starting with these hex digits (incremental runs).")
+    recon.add_argument('--workers', type=int, default=8, help="Directories listed in parallel.")
+    recon.add_argument('--min-age-hours', type=float, default=24, help="Ignore unreferenced files younger than this.")
+    orphan_action = recon.add_mutually_exclusive_group()
+    orphan_action.add_argument('--quarantine', action='store_const', const='quarantine', dest='action',
+                               help="Move orphaned files to UPLOAD_FOLDER/.quarantine.")
+    orphan_action.add_argument('--delete', action='store_const', const='delete', dest='action',
+                               help="Delete orphaned files.")
+
+    scrub_parser = subparsers.add_parser('scrub', help="Verify stored files against their recorded checksums.")
+    scrub_parser.add_argument('--workers', type=int, default=2, help="Files verified in parallel (processes).")
+    scrub_parser.add_argument('--rate-mib', type=float, default=20.0, help="Total read rate limit in MiB/s.")
+    scrub_parser.add_argument('--max-minutes', type=float, help="Stop (and resume next time) after this long.")
+    scrub_parser.add_argument('--restart', action='store_true', help="Abandon an unfinished run and start a new pass.")
+
+    subparsers.add_parser('recount-usage', help="Rebuild the per-user storage usage counters from job_documents.")
+
+    import_parser = subparsers.add_parser('import-contacts', help="Import a LinkedIn connections CSV into contacts.")
+    import_parser.add_argument('csv_path', help="CSV file (LinkedIn 'Connections' export or mock_contacts.csv).")
+    import_parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE, help="Rows per transaction.")
+
+    mappings = subparsers.add_parser('regenerate-mappings', help="Add unmapped company names for contacts' companies.")
+    mappings.add_argument('--batch-size', type=int, default=MAPPING_BATCH_SIZE, help="Contact ids per transaction.")
+
+    search = subparsers.add_parser('rebuild-search', help="Recompute document search vectors from the extracted text.")
+    search.add_argument('--batch-size', type=int, default=SEARCH_BATCH_SIZE, help="Documents per transaction.")
+
+    subparsers.add_parser('reindex', help="Rebuild all indexes with REINDEX TABLE CONCURRENTLY.")
+
+    subparsers.add_parser('warm-cache', help="Load tables and indexes into PostgreSQL's buffer cache.")
+
+    for name, workers in (('import-contacts', 4), ('regenerate-mappings', 4), ('rebuild-search', 4),
+                          ('reindex', 2), ('warm-cache', 4)):
+        bulk = subparsers.choices[name]
+        bulk.add_argument('--workers', type=int, default=workers, help="Batches processed in parallel.")
+        bulk.add_argument('--restart', action='store_true', help="Ignore the checkpoint of an interrupted run.")
+
+    bench_api = subparsers.add_parser('benchmark', help="Measure the latency of the main read endpoints.")
+    bench_api.add_argument('--requests', type=int, default=200, help="Requests per endpoint.")
+    bench_api.add_argument('--concurrency', type=int, default=8, help="Requests in flight at once.")
+    bench_api.add_argument('--endpoint', action='append', help="Path to measure (repeatable; default: the main read endpoints).")
+
+    backup_parser = subparsers.add_parser('backup', help="Dump the database and snapshot the filestore (incremental).")
+    backup_parser.add_argument('--dest', default=BACKUP_DIR, help="Directory holding the snapshots (BACKUP_DIR).")
+    backup_parser.add_argument('--jobs', type=int, default=4, help="Tables dumped in parallel (pg_dump -j).")
+    backup_parser.add_argument('--file-workers', type=int, default=4, help="Files copied and hashed in parallel.")
+    backup_parser.add_argument('--keep', type=int, default=7, help="Snapshots to keep (0 = all).")
+
+    restore_parser = subparsers.add_parser('restore', help="Restore and verify a backup snapshot.")
+    restore_parser.add_argument('snapshot', help="Snapshot directory, e.g. /var/backups/jobassist/latest.")
+    restore_parser.add_argument('--dbname', help="Existing empty database to restore into (checked afterwards).")
+    restore_parser.add_argument('--filestore', help="New, empty directory to restore the documents into.")
+    restore_parser.add_argument('--jobs', type=int, default=4, help="Tables restored in parallel (pg_restore -j).")
+    restore_parser.add_argument('--file-workers', type=int, default=4, help="Files copied and hashed in parallel.")
+    restore_parser.add_argument('--verify-only', action='store_true',
+                                help="Only re-hash the snapshot's files (and check them against --dbname, if given).")
+
+    check = subparsers.add_parser('storage-check', help="Round-trip a test object through the configured document store.")
+    check.add_argument('--size-mib', type=int, default=20, help="Size of the test object in MiB.")
+
+    args = parser.parse_args(argv)
+    if args.command == 'dedupe-filestore':
+        return dedupe_filestore(dry_run=args.dry_run)
+    if args.command == 'gc-uploads':
+        return gc_uploads()
+    if args.command == 'shard-filestore':
+        return shard_filestore(dry_run=args.dry_run)
+    if args.command == 'bench-codec':
+        return bench_codec(limit=args.limit, level=args.level)
+    if args.command == 'reconcile':
+        if any(ch not in '0123456789abcdef' for ch in args.prefix) or len(args.prefix) > 2:
+            parser.error("--prefix must be one or two lowercase hex digits")
+        return reconcile(prefix=args.prefix, action=args.action, workers=args.workers,
+                         min_age_hours=args.min_age_hours)
+    if args.command == 'scrub':
+        return scrub(workers=args.workers, rate_mib=args.rate_mib, max_minutes=args.max_minutes, restart=args.restart)
+    if args.command == 'recount-usage':
+        return recount_usage()
+    if args.command == 'import-contacts':
+        return import_contacts(args.csv_path, workers=args.workers, batch_size=args.batch_size, restart=args.restart)
+    if args.command == 'regenerate-mappings':
+        return regenerate_mappings(workers=args.workers, batch_size=args.batch_size, restart=args.restart)
+    if args.command == 'rebuild-search':
+        return rebuild_search(workers=args.workers, batch_size=args.batch_size, restart=args.restart)
+    if args.command == 'reindex':
+        return reindex(workers=args.workers, restart=args.restart)
+    if args.command == 'warm-cache':
+        return warm_cache(workers=args.workers, restart=args.restart)
+    if args.command == 'benchmark':
+        return benchmark(requests_per_endpoint=args.requests, concurrency=args.concurrency, endpoints=args.endpoint)
+    if args.command == 'backup':
+        return backup(dest=args.dest, jobs=args.jobs, file_workers=args.file_workers, keep=args.keep)
+    if args.command == 'restore':
+        return restore(args.snapshot, dbname=args.dbname, filestore=args.filestore, jobs=args.jobs,
+                       file_workers=args.file_workers, verify_only=args.verify_only)
+    if args.command == 'storage-check':
+        return storage_check(size_mib=args.size_mib)
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,138 @@
+# Sparse fieldsets on the list endpoints (SHARED LIST QUERIES in app.py): the SQL built
+# for a pruned ?fields= / ?include= selection must not contain the joins, CTEs and
+# subqueries that only the unrequested parts need.
+# The EXPLAIN comparisons run against a real database with the contact_db schema when
+# JOBASSIST_TEST_DSN is set (e.g. "dbname=contact_db user=jobert host=localhost").
+import os
+
+import pytest
+
+import app
+
+MOCK_USER_ID = '00000000-0000-0000-0000-000000000001'
+
+
+class RecordingCursor:
+    """Stands in for a DictCursor: records the statements, returns no rows."""
+
+    def __init__(self):
+        self.queries = []
+
+    def execute(self, query, params=None):
+        self.queries.append((query, params))
+
+    def fetchall(self):
+        return []
+
+    @property
+    def sql(self):
+        assert len(self.queries) == 1
+        return self.queries[0][0]
+
+
+def build(fetch, *args, **kwargs):
+    cur = RecordingCursor()
+    fetch(cur, *args, **kwargs)
+    return cur
+
+
+# --- fetch_company_list (/api/companies, 1.0) ---
+
+def test_company_list_full_selection_has_both_count_ctes():
+    sql = build(app.fetch_company_list, MOCK_USER_ID).sql
+    assert 'app_counts AS' in sql
+    assert 'contact_counts AS' in sql
+    assert 'FROM contacts' in sql
+
+
+def test_company_list_without_includes_has_no_ctes():
+    cur = build(app.fetch_company_list, MOCK_USER_ID, fields={'company_name_clean'}, include=set())
+    sql, params = cur.queries[0]
+    assert not sql.startswith('WITH')
+    assert 'applications' not in sql
+    assert 'contacts' not in sql
+    assert 'JOIN' not in sql
+    assert 'c.headquarters' not in sql
+    assert params == []
+
+
+def test_company_list_application_count_only_skips_contacts():
+    sql = build(app.fetch_company_list, MOCK_USER_ID, include={'application_count'}).sql
+    assert 'app_counts AS' in sql
+    assert 'contact_counts' not in sql
+    assert 'company_name_mapping' not in sql
+
+
+# --- fetch_user_applications (/api/applications/all, 22.0) ---
+
+def test_applications_full_selection_joins_everything():
+    sql = build(app.fetch_user_applications, MOCK_USER_ID).sql
+    assert 'LEFT JOIN job_titles jt' in sql
+    assert 'LEFT JOIN companies c' in sql
+    assert 'LEFT JOIN job_documents jd' in sql
+    assert 'FROM contacts' in sql
+
+
+def test_applications_pruned_selection_reads_only_applications():
+    sql = build(app.fetch_user_applications, MOCK_USER_ID,
+                fields={'date_applied', 'current_status'}, include=set()).sql
+    assert 'JOIN' not in sql
+    assert 'contacts' not in sql
+    assert 'jd.' not in sql
+
+
+def test_applications_title_only_joins_job_titles_only():
+    sql = build(app.fetch_user_applications, MOCK_USER_ID, fields={'title_name'}, include=set()).sql
+    assert 'LEFT JOIN job_titles jt' in sql
+    assert 'companies' not in sql
+    assert 'job_documents' not in sql
+
+
+def test_applications_preloaded_contact_counts_skip_the_subquery():
+    sql = build(app.fetch_user_applications, MOCK_USER_ID, contact_counts={}).sql
+    assert 'FROM contacts' not in sql
+
+
+# --- fetch_contact_list (/api/contacts/all, 23.0) ---
+
+def test_contacts_full_selection_joins_mapping_and_companies():
+    sql = build(app.fetch_contact_list).sql
+    assert 'LEFT JOIN company_name_mapping t2' in sql
+    assert 'LEFT JOIN companies t3' in sql
+
+
+def test_contacts_without_company_has_no_joins():
+    sql = build(app.fetch_contact_list, fields={'first_name', 'last_name'}, include=set()).sql
+    assert 'JOIN' not in sql
+    assert 't1.email_address' not in sql
+
+
+# --- Query plans (needs a database) ---
+
+TEST_DSN = os.environ.get('JOBASSIST_TEST_DSN')
+
+PLAN_CASES = [
+    (app.fetch_company_list, (MOCK_USER_ID,), {'fields': {'company_name_clean'}, 'include': set()}),
+    (app.fetch_user_applications, (MOCK_USER_ID,), {'fields': {'date_applied', 'current_status'}, 'include': set()}),
+    (app.fetch_contact_list, (), {'fields': {'first_name', 'last_name'}, 'include': set()}),
+]
+
+
+def plan_cost(conn, query, params):
+    with conn.cursor() as cur:
+        cur.execute('EXPLAIN (FORMAT JSON) ' + query, params)
+        return cur.fetchone()[0][0]['Plan']['Total Cost']
+
+
+@pytest.mark.skipif(not TEST_DSN, reason="JOBASSIST_TEST_DSN not set")
+@pytest.mark.parametrize('fetch, args, pruned', PLAN_CASES, ids=lambda v: getattr(v, '__name__', None))
+def test_pruned_selection_has_a_cheaper_plan(fetch, args, pruned):
+    psycopg2 = pytest.importorskip('psycopg2')
+    full = build(fetch, *args).queries[0]
+    reduced = build(fetch, *args, **pruned).queries[0]
+
+    conn = psycopg2.connect(TEST_DSN)
+    try:
+        assert plan_cost(conn, *reduced) < plan_cost(conn, *full)
+    finally:
+        conn.close()
@@ -0,0 +1,69 @@
+# Resumable uploads with a non-local document store (API 29.x): chunks are kept as
+# objects under .partial/<upload_id>/ in the store, so any node can take any chunk.
+# A LocalStorage rooted outside UPLOAD_FOLDER stands in for the object store.
+import os
+import uuid
+
+import pytest
+
+import app
+from storage import LocalStorage
+
+
+@pytest.fixture
+def remote_store(tmp_path, monkeypatch):
+    upload_folder = tmp_path / 'filestore'
+    upload_folder.mkdir()
+    store = LocalStorage(str(tmp_path / 'bucket'))
+    monkeypatch.setitem(app.app.config, 'STORAGE_BACKEND', 's3')
+    monkeypatch.setitem(app.app.config, 'UPLOAD_FOLDER', str(upload_folder))
+    monkeypatch.setattr(app, 'PARTIAL_UPLOAD_FOLDER', str(upload_folder / '.partial'))
+    monkeypatch.setattr(app, 'get_storage', lambda: store)
+    return store
+
+
+def put_chunk(store, tmp_path, upload_id, index, data):
+    src = tmp_path / f'chunk-{index}'
+    src.write_bytes(data)
+    store.put_file(app.partial_chunk_key(upload_id, index), str(src))
+
+
+def test_assemble_joins_chunk_objects_in_order(remote_store, tmp_path):
+    upload_id = uuid.uuid4()
+    chunks = [b'a' * 10, b'b' * 10, b'c' * 3]
+    # Out of order, as parallel clients send them
+    for index in (2, 0, 1):
+        put_chunk(remote_store, tmp_path, upload_id, index, chunks[index])
+
+    session = {'upload_id': upload_id, 'total_size': 23, 'chunk_size': 10}
+    path = app.assemble_partial_upload(session)
+    try:
+        assert os.path.dirname(path) == app.app.config['UPLOAD_FOLDER']
+        with open(path, 'rb') as f:
+            assert f.read() == b''.join(chunks)
+    finally:
+        os.remove(path)
+
+
+def test_assemble_with_a_missing_chunk_leaves_no_temp_file(remote_store, tmp_path):
+    upload_id = uuid.uuid4()
+    put_chunk(remote_store, tmp_path, upload_id, 0, b'a' * 10)
+
+    session = {'upload_id': upload_id, 'total_size': 20, 'chunk_size': 10}
+    with pytest.raises(FileNotFoundError):
+        app.assemble_partial_upload(session)
+    assert os.listdir(app.app.config['UPLOAD_FOLDER']) == []
+
+
+def test_outbox_deletion_removes_every_chunk_object(remote_store, tmp_path):
+    upload_id, other_id = uuid.uuid4(), uuid.uuid4()
+    for index in range(3):
+        put_chunk(remote_store, tmp_path, upload_id, index, b'x')
+    put_chunk(remote_store, tmp_path, other_id, 0, b'y')
+
+    app.delete_stored_file(app.partial_upload_key(upload_id))
+
+    assert remote_store.stat(app.partial_chunk_key(upload_id, 0)) is None
+    assert remote_store.stat(app.partial_chunk_key(other_id, 0)) == 1
+    # Already gone is not an error
+    app.delete_stored_file(app.partial_upload_key(upload_id))
@@ -0,0 +1,633 @@
+# FILENAME: worker.py
+# Background work that must not run in the request path:
+#   - text extraction for uploaded documents (feeds the search API, 30.0)
+#   - deferred file deletion (the file_deletions outbox filled by API 20.0 / 25.0)
+#   - the generic background job queue (background_jobs, migration 010, API 34.x)
+# Runs as its own service next to gunicorn (see Package/conf/extraction_worker.conf):
+#   python worker.py            -> run forever (LISTEN for new work + periodic poll)
+#   python worker.py --once     -> process everything pending, then exit
+#   python worker.py --jobs     -> run queued background jobs instead (one job at a time;
+#                                  start more of these, on any node, to run more at once:
+#                                  contact_db_job_worker@<n>.service)
+#
+# Extraction: the main process claims pending job_documents rows, a process pool
+# extracts the text (CPU-bound: pdftotext for PDF, zipfile/XML for DOCX, plain
+# decoding for TXT; with STORAGE_BACKEND=s3 each process first downloads its
+# document to a temp file), and the main process stores extracted_text and
+# search_vector.
+import argparse
+import os
+import re
+import select
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from xml.etree import ElementTree
+
+import psycopg2
+import psycopg2.extras
+
+from app import (
+    get_db_connection,
+    get_storage,
+    resolve_stored_path,
+    open_document_file,
+    delete_stored_file,
+    try_lock_blob,
+    DOCUMENT_READ_CHUNK_SIZE,
+    EXTRACTION_NOTIFY_CHANNEL,
+    FILE_DELETION_NOTIFY_CHANNEL,
+    BACKGROUND_JOB_NOTIFY_CHANNEL,
+    BACKUP_LOCK_KEY,
+    CHANGE_FEED_RETENTION_DAYS,
+    SEARCH_TEXT_CONFIG,
+)
+
+# --- Worker Configuration ---
+EXTRACTION_WORKERS = int(os.environ.get('EXTRACTION_WORKERS', 2))        # processes in the pool
+EXTRACTION_BATCH_SIZE = int(os.environ.get('EXTRACTION_BATCH_SIZE', 8))  # rows claimed per round
+EXTRACTION_POLL_SECONDS = int(os.environ.get('EXTRACTION_POLL_SECONDS', 60))  # fallback poll when no NOTIFY arrives
+EXTRACTION_TIMEOUT_SECONDS = 120  # per document (pdftotext)
+EXTRACTION_STALE_MINUTES = 15     # 'processing' rows older than this are retried (crashed worker)
+# to_tsvector() rejects vectors over 1MB; a few hundred KB of text is far beyond any CV anyway
+EXTRACTION_MAX_CHARS = 500000
+
+DELETION_BATCH_SIZE = 200
+DELETION_MAX_BACKOFF_SECONDS = 3600  # retries back off 5s, 10s, 20s, ... up to this
+
+# Background job runner (--jobs)
+JOB_POLL_SECONDS = int(os.environ.get('JOB_POLL_SECONDS', 15))  # fallback poll; also picks up retries that came due
+JOB_HEARTBEAT_SECONDS = 30
+JOB_STALE_SECONDS = 180          # a running job without a heartbeat for this long lost its runner: retried
+JOB_RETRY_BASE_SECONDS = 10      # failed attempts back off 10s, 20s, 40s, ... up to JOB_MAX_BACKOFF_SECONDS
+JOB_MAX_BACKOFF_SECONDS = 3600
+JOB_RETENTION_DAYS = 14          # done / failed / cancelled jobs are purged after this
+JOB_PURGE_BATCH_SIZE = 1000
+JOB_TYPE_LOCK_PREFIX = 'jobassist-job-type:'  # advisory lock per job type, taken while claiming
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"  # background_jobs.locked_by
+
+DOCX_TEXT_TAG = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}t'
+DOCX_PARAGRAPH_TAG = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}p'
+
+
+# ----------------------------------------------------------------------
+# EXTRACTORS (run inside the process pool: plain functions, no DB access)
+# Each returns the text, or None if the format is not supported.
+# ----------------------------------------------------------------------
+
+def extract_pdf(path):
+    # poppler-utils' pdftotext; '-' writes to stdout
+    result = subprocess.run(
+        ['pdftotext', '-q', '-enc', 'UTF-8', path, '-'],
+        capture_output=True, timeout=EXTRACTION_TIMEOUT_SECONDS, check=True
+    )
+    return result.stdout.decode('utf-8', errors='replace')
+
+def extract_docx(path):
+    # A .docx is a zip; the body text lives in word/document.xml as <w:t> runs inside <w:p> paragraphs
+    with zipfile.ZipFile(path) as archive:
+        with archive.open('word/document.xml') as xml_file:
+            paragraphs = []
+            for _, element in ElementTree.iterparse(xml_file):
+                if element.tag == DOCX_PARAGRAPH_TAG:
+                    paragraphs.append(''.join(node.text or '' for node in element.iter(DOCX_TEXT_TAG)))
+                    element.clear()
+    return '\n'.join(paragraphs)
+
+def extract_plain_text(path):
+    with open(path, 'rb') as f:
+        return f.read(EXTRACTION_MAX_CHARS * 4).decode('utf-8', errors='replace')
+
+EXTRACTORS = {
+    'application/pdf': extract_pdf,
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document': extract_docx,
+    'text/plain': extract_plain_text,
+}
+
+def extract_text(file_path, mime_type, original_filename, storage_encoding=None):
+    """
+    Pool entry point: file_path is the job_documents.file_path (storage key).
+    Returns (status, text) with status in done / empty / unsupported / failed.
+    """
+    extractor = EXTRACTORS.get(mime_type)
+    if extractor is None:
+        # libmagic often reports DOCX as application/zip or octet-stream; fall back to the extension
+        extension = os.path.splitext(original_filename or '')[1].lower()
+        extractor = {'.pdf': extract_pdf, '.docx': extract_docx, '.txt': extract_plain_text}.get(extension)
+    if extractor is None:
+        return 'unsupported', None
+    try:
+        local_path = get_storage().local_path(resolve_stored_path(file_path))
+        if local_path and not storage_encoding:
+            text = extractor(local_path)
+        else:
+            # The extractors need the original file on local disk: fetch it from the
+            # store (STORAGE_BACKEND=s3) and/or decompress it to a temp file first
+            with tempfile.NamedTemporaryFile(prefix='jobassist-extract-') as plain:
+                with open_document_file(file_path, storage_encoding) as source:
+                    shutil.copyfileobj(source, plain, DOCUMENT_READ_CHUNK_SIZE)
+                plain.flush()
+                text = extractor(plain.name)
+    except Exception as e:
+        return 'failed', f"{type(e).__name__}: {e}"
+    # Collapse runs of whitespace (PDF layout) and drop NULs, which PostgreSQL text cannot hold
+    text = re.sub(r'\s+', ' ', text.replace('\x00', ' ')).strip()[:EXTRACTION_MAX_CHARS]
+    return ('done', text) if text else ('empty', None)
+
+
+# ----------------------------------------------------------------------
+# QUEUE HANDLING (main process)
+# ----------------------------------------------------------------------
+
+def claim_pending(conn):
+    """
+    Marks up to EXTRACTION_BATCH_SIZE pending rows as 'processing' and returns them.
+    SKIP LOCKED lets several workers run side by side without claiming the same row.
+    """
+    with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
+        cur.execute("""
+            UPDATE job_documents jd
+            SET extraction_status = 'processing', extraction_claimed_at = NOW()
+            WHERE jd.document_id IN (
+                SELECT document_id
+                FROM job_documents
+                WHERE extraction_status = 'pending'
+                   OR (extraction_status = 'processing'
+                       AND extraction_claimed_at < NOW() - make_interval(mins => %s))
+                ORDER BY upload_timestamp
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING jd.document_id, jd.file_path, jd.mime_type, jd.original_filename, jd.content_hash,
+                      jd.storage_encoding;
+        """, (EXTRACTION_STALE_MINUTES, EXTRACTION_BATCH_SIZE))
+        rows = cur.fetchall()
+    conn.commit()
+    return rows
+
+def copy_from_duplicate(conn, doc):
+    """Deduplicated uploads share content: reuse text already extracted for the same hash."""
+    if not doc['content_hash']:
+        return False
+    with conn.cursor() as cur:
+        cur.execute("""
+            UPDATE job_documents target
+            SET extraction_status = source.extraction_status,
+                extracted_text = source.extracted_text,
+                search_vector = source.search_vector,
+                extraction_claimed_at = NULL
+            FROM (
+                SELECT extraction_status, extracted_text, search_vector
+                FROM job_documents
+                WHERE content_hash = %s AND document_id <> %s
+                  AND extraction_status IN ('done', 'empty', 'unsupported')
+                LIMIT 1
+            ) source
+            WHERE target.document_id = %s;
+        """, (doc['content_hash'], doc['document_id'], doc['document_id']))
+        copied = cur.rowcount == 1
+    conn.commit()
+    return copied
+
+def store_result(conn, document_id, status, text):
+    with conn.cursor() as cur:
+        if status == 'done':
+            cur.execute("""
+                UPDATE job_documents
+                SET extraction_status = 'done', extraction_claimed_at = NULL,
+                    extracted_text = %s, search_vector = to_tsvector(%s::regconfig, %s)
+                WHERE document_id = %s;
+            """, (text, SEARCH_TEXT_CONFIG, text, document_id))
+        else:
+            cur.execute("""
+                UPDATE job_documents
+                SET extraction_status = %s, extraction_claimed_at = NULL,
+                    extracted_text = NULL, search_vector = NULL
+                WHERE document_id = %s;
+            """, (status, document_id))
+    conn.commit()
+
+def process_pending(conn, pool):
+    """Drains the queue. Returns the number of documents handled."""
+    handled = 0
+    while True:
+        docs = claim_pending(conn)
+        if not docs:
+            return handled
+
+        futures = {}
+        for doc in docs:
+            if copy_from_duplicate(conn, doc):
+                print(f"[WORKER] {doc['document_id']}: reused text of identical content.")
+                handled += 1
+                continue
+            futures[doc['document_id']] = pool.submit(
+                extract_text, doc['file_path'], doc['mime_type'], doc['original_filename'], doc['storage_encoding']
+            )
+
+        for document_id, future in futures.items():
+            try:
+                status, payload = future.result()
+            except Exception as e:  # Pool process died, etc.
+                status, payload = 'failed', f"{type(e).__name__}: {e}"
+            if status == 'failed':
+                print(f"[WORKER] {document_id}: extraction failed: {payload}")
+                store_result(conn, document_id, 'failed', None)
+            else:
+                store_result(conn, document_id, status, payload)
+                print(f"[WORKER] {document_id}: {status}" + (f" ({len(payload)} chars)" if payload else ""))
+            handled += 1
+
+# ----------------------------------------------------------------------
+# DEFERRED FILE DELETION
+# Rows are only in file_deletions once the DELETE that queued them has committed.
+# A row is removed in the same transaction that deletes its file from the store,
+# after the delete: if the worker dies in between, the row is retried and the
+# missing file counts as success. Failures are retried with exponential backoff.
+# Nothing is deleted while `maintenance.py backup` copies the filestore: the
+# files of the rows in its dump must still be there when it gets to them.
+# ----------------------------------------------------------------------
+
+def process_deletions(conn):
+    """Deletes queued files in batches. Returns the number of queue entries completed."""
+    handled = 0
+    while True:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_try_advisory_xact_lock_shared(hashtextextended(%s, 0));", (BACKUP_LOCK_KEY,))
+            if not cur.fetchone()[0]:
+                conn.commit()
+                print("[WORKER] Backup in progress; file deletions wait for it.")
+                return handled
+            cur.execute("""
+                SELECT deletion_id, file_path, content_hash
+                FROM file_deletions
+                WHERE next_attempt_at <= NOW()
+                ORDER BY deletion_id
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED;
+            """, (DELETION_BATCH_SIZE,))
+            entries = cur.fetchall()
+            if not entries:
+                conn.commit()
+                return handled
+
+            done = []
+            failed = []
+            for deletion_id, file_path, content_hash in entries:
+                if content_hash:
+                    # Shared blob: hold its lock so no upload can re-create it while we look.
+                    # Never block here (an upload holding several blob locks could deadlock us).
+                    if not try_lock_blob(cur, content_hash):
+                        failed.append((deletion_id, "blob locked by another transaction"))
+                        continue
+                    cur.execute("SELECT EXISTS (SELECT 1 FROM document_blobs WHERE content_hash = %s);", (content_hash,))
+                    if cur.fetchone()[0]:
+                        done.append(deletion_id)  # Uploaded again since it was released: keep the file
+                        continue
+                try:
+                    delete_stored_file(file_path)  # A file that is already gone counts as deleted
+                except Exception as e:  # OSError on local disk, botocore errors on S3
+                    print(f"[WORKER] Could not delete {file_path}: {e}")
+                    failed.append((deletion_id, str(e)))
+                    continue
+                done.append(deletion_id)
+
+            if done:
+                cur.execute("DELETE FROM file_deletions WHERE deletion_id = ANY(%s);", (done,))
+            if failed:
+                psycopg2.extras.execute_values(cur, f"""
+                    UPDATE file_deletions fd
+                    SET attempts = fd.attempts + 1,
+                        last_error = v.error,
+                        next_attempt_at = NOW() + make_interval(secs => LEAST({DELETION_MAX_BACKOFF_SECONDS}, 5 * power(2, fd.attempts)))
+                    FROM (VALUES %s) AS v(deletion_id, error)
+                    WHERE fd.deletion_id = v.deletion_id;
+                """, failed)
+        conn.commit()
+        handled += len(done)
+        if done:
+            print(f"[WORKER] Deleted {len(done)} queued file(s).")
+
+
+# ----------------------------------------------------------------------
+# BACKGROUND JOB HANDLERS
+# handler(conn, payload) -> JSON-serialisable result, stored in background_jobs.result.
+# An exception fails the attempt; it is retried with backoff up to max_attempts,
+# so handlers must be safe to run again. conn has no open transaction; handlers
+# commit their own work.
+# ----------------------------------------------------------------------
+
+def job_regenerate_unmapped(conn, payload):
+    """Adds company_name_mapping rows (unmapped) for raw company names of contacts that have none (maintenance.py regenerate-mappings, in one statement)."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO company_name_mapping (raw_name, company_id)
+            SELECT DISTINCT c.company, NULL::integer
+            FROM contacts c
+            LEFT JOIN company_name_mapping cnm ON c.company = cnm.raw_name
+            WHERE cnm.raw_name IS NULL AND c.company IS NOT NULL
+            ON CONFLICT (raw_name) DO NOTHING;
+        """)
+        inserted = cur.rowcount
+    conn.commit()
+    return {"inserted": inserted}
+
+def job_reextract_documents(conn, payload):
+    """Puts an application's documents back into the text extraction queue (main worker loop)."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            UPDATE job_documents
+            SET extraction_status = 'pending', extraction_claimed_at = NULL
+            WHERE application_id = %s AND extraction_status <> 'processing';
+        """, (payload['application_id'],))
+        queued = cur.rowcount
+        cur.execute(f"NOTIFY {EXTRACTION_NOTIFY_CHANNEL};")
+    conn.commit()
+    return {"documents": queued}
+
+# job_type -> (handler, max running at once across all runners and nodes; None = no limit).
+# A runner only claims the types listed here, so jobs of a type added by a newer
+# app.py wait for an upgraded runner instead of failing.
+JOB_TYPES = {
+    'regenerate_unmapped': (job_regenerate_unmapped, 1),
+    'reextract_documents': (job_reextract_documents, None),
+}
+
+
+# ----------------------------------------------------------------------
+# BACKGROUND JOB RUNNER (--jobs)
+# Runners on any number of processes and nodes share the queue through
+# PostgreSQL alone: a claim is FOR UPDATE SKIP LOCKED on the next due job,
+# highest priority first, so runners never wait on each other's rows.
+# A claimed job is 'running' with a heartbeat refreshed by a helper thread; if
+# its runner dies, the next housekeeping pass of any runner retries it.
+# ----------------------------------------------------------------------
+
+class JobHeartbeat(threading.Thread):
+    """Refreshes heartbeat_at of a running job from its own connection while the handler works."""
+
+    def __init__(self, job_id):
+        super().__init__(daemon=True)
+        self.job_id = job_id
+        self.stopped = threading.Event()
+
+    def run(self):
+        conn = get_db_connection()
+        if conn is None:
+            print(f"[JOBS] {self.job_id}: no database connection for the heartbeat.")
+            return
+        conn.autocommit = True
+        try:
+            while not self.stopped.wait(JOB_HEARTBEAT_SECONDS):
+                with conn.cursor() as cur:
+                    cur.execute("""
+                        UPDATE background_jobs SET heartbeat_at = NOW()
+                        WHERE job_id = %s AND locked_by = %s AND status = 'running';
+                    """, (self.job_id, WORKER_ID))
+        except psycopg2.Error as e:
+            print(f"[JOBS] {self.job_id}: heartbeat failed: {e}")
+        finally:
+            conn.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+def housekeep_jobs(conn):
+    """
+    Retries jobs whose runner stopped heartbeating, purges old finished jobs and
+    expires old application change feed rows (migration 012).
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            UPDATE background_jobs
+            SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END,
+                finished_at = CASE WHEN attempts >= max_attempts THEN NOW() END,
+                run_at = NOW(), heartbeat_at = NULL, locked_by = NULL,
+                last_error = 'Runner ' || COALESCE(locked_by, '?') || ' stopped responding.'
+            WHERE status = 'running' AND heartbeat_at < NOW() - make_interval(secs => %s)
+            RETURNING job_id, job_type, status;
+        """, (JOB_STALE_SECONDS,))
+        for job_id, job_type, status in cur.fetchall():
+            print(f"[JOBS] {job_id} ({job_type}): runner lost, job is {status} again.")
+        cur.execute("""
+            DELETE FROM background_jobs
+            WHERE job_id IN (
+                SELECT job_id FROM background_jobs
+                WHERE finished_at < NOW() - make_interval(days => %s)
+                LIMIT %s
+            );
+        """, (JOB_RETENTION_DAYS, JOB_PURGE_BATCH_SIZE))
+        # The highest purged txid is the horizon: API 35.0 answers an older cursor with a
+        # full resync, since the delta would miss the purged changes
+        cur.execute("""
+            WITH purged AS (
+                DELETE FROM application_changes
+                WHERE change_id IN (
+                    SELECT change_id FROM application_changes
+                    WHERE changed_at < NOW() - make_interval(days => %s)
+                    LIMIT %s
+                )
+                RETURNING txid
+            )
+            UPDATE application_change_horizon
+            SET purged_through = GREATEST(purged_through, p.max_txid), updated_at = NOW()
+            FROM (SELECT max(txid) AS max_txid FROM purged) p
+            WHERE p.max_txid IS NOT NULL;
+        """, (CHANGE_FEED_RETENTION_DAYS, JOB_PURGE_BATCH_SIZE))
+    conn.commit()
+
+def claim_job(conn):
+    """
+    Claims the next due job and marks it running; returns it, or None if nothing can
+    run now. The concurrency limit of a job type is checked under a transaction-level
+    advisory lock on that type, so two runners cannot both take its last free slot.
+    """
+    full_types = []
+    while True:
+        with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
+            cur.execute("""
+                SELECT job_id, job_type
+                FROM background_jobs
+                WHERE status = 'queued' AND run_at <= NOW()
+                  AND job_type = ANY(%s) AND job_type <> ALL(%s)
+                ORDER BY priority DESC, run_at, job_id
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED;
+            """, (list(JOB_TYPES), full_types))
+            job = cur.fetchone()
+            if job is None:
+                conn.commit()
+                return None
+
+            max_running = JOB_TYPES[job['job_type']][1]
+            if max_running:
+                cur.execute("SELECT pg_advisory_xact_lock(hashtextextended(%s, 0));",
+                            (JOB_TYPE_LOCK_PREFIX + job['job_type'],))
+                cur.execute("SELECT COUNT(*) FROM background_jobs WHERE status = 'running' AND job_type = %s;",
+                            (job['job_type'],))
+                if cur.fetchone()[0] >= max_running:
+                    conn.rollback()
+                    full_types.append(job['job_type'])  # Look for work of another type
+                    continue
+
+            cur.execute("""
+                UPDATE background_jobs
+                SET status = 'running', attempts = attempts + 1, locked_by = %s,
+                    started_at = NOW(), heartbeat_at = NOW(), finished_at = NULL
+                WHERE job_id = %s
+                RETURNING job_id, job_type, payload, attempts, max_attempts;
+            """, (WORKER_ID, job['job_id']))
+            job = cur.fetchone()
+        conn.commit()  # Also releases the advisory lock
+        return job
+
+def finish_job(conn, job, result):
+    with conn.cursor() as cur:
+        cur.execute("""
+            UPDATE background_jobs
+            SET status = 'done', finished_at = NOW(), heartbeat_at = NULL, result = %s, last_error = NULL
+            WHERE job_id = %s AND locked_by = %s AND status = 'running';
+        """, (psycopg2.extras.Json(result), job['job_id'], WORKER_ID))
+        # A slot of this job type is free again: wake runners that skipped it
+        cur.execute(f"NOTIFY {BACKGROUND_JOB_NOTIFY_CHANNEL};")
+    conn.commit()
+
+def fail_job(conn, job, error):
+    """Requeues the job with exponential backoff, or fails it for good after max_attempts. Returns the new status."""
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            UPDATE background_jobs
+            SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END,
+                finished_at = CASE WHEN attempts >= max_attempts THEN NOW() END,
+                locked_by = CASE WHEN attempts >= max_attempts THEN locked_by END,
+                run_at = NOW() + make_interval(secs => LEAST({JOB_MAX_BACKOFF_SECONDS},
+                                                             {JOB_RETRY_BASE_SECONDS} * power(2, attempts - 1))),
+                heartbeat_at = NULL, last_error = %s
+            WHERE job_id = %s AND locked_by = %s AND status = 'running'
+            RETURNING status;
+        """, (error, job['job_id'], WORKER_ID))
+        row = cur.fetchone()
+        cur.execute(f"NOTIFY {BACKGROUND_JOB_NOTIFY_CHANNEL};")
+    conn.commit()
+    return row[0] if row else None
+
+def run_job(conn, job):
+    handler = JOB_TYPES[job['job_type']][0]
+    print(f"[JOBS] {job['job_id']} ({job['job_type']}): attempt {job['attempts']}/{job['max_attempts']}")
+    started = time.monotonic()
+    heartbeat = JobHeartbeat(job['job_id'])
+    heartbeat.start()
+    try:
+        result = handler(conn, job['payload'])
+    except Exception as e:
+        conn.rollback()
+        error = f"{type(e).__name__}: {e}"
+        status = fail_job(conn, job, error)
+        print(f"[JOBS] {job['job_id']} ({job['job_type']}): {error} -> {status}")
+        return
+    finally:
+        heartbeat.stop()
+    finish_job(conn, job, result)
+    print(f"[JOBS] {job['job_id']} ({job['job_type']}): done in {time.monotonic() - started:.1f}s")
+
+def run_jobs(conn):
+    """Runs due jobs one after another until none can be claimed. Returns the number run."""
+    handled = 0
+    while True:
+        job = claim_job(conn)
+        if job is None:
+            return handled
+        run_job(conn, job)
+        handled += 1
+
+def job_runner(once=False):
+    conn = get_db_connection()
+    if conn is None:
+        print("ERROR: Database connection failed.")
+        return 1
+
+    listen_conn = None
+    if not once:
+        listen_conn = get_db_connection()
+        if listen_conn is None:
+            print("ERROR: Database connection failed.")
+            return 1
+        listen_conn.autocommit = True
+        listen_conn.cursor().execute(f"LISTEN {BACKGROUND_JOB_NOTIFY_CHANNEL};")
+
+    print(f"[JOBS] Runner {WORKER_ID} started ({', '.join(sorted(JOB_TYPES))}).")
+    try:
+        while True:
+            housekeep_jobs(conn)
+            handled = run_jobs(conn)
+            if handled:
+                print(f"[JOBS] Ran {handled} job(s).")
+            if once:
+                return 0
+            wait_for_notify(listen_conn, JOB_POLL_SECONDS)
+    except KeyboardInterrupt:
+        return 0  # A job interrupted here is retried once its heartbeat goes stale
+    finally:
+        conn.close()
+        if listen_conn:
+            listen_conn.close()
+
+
+def wait_for_notify(conn, timeout):
+    """Blocks until NOTIFY arrives on one of the worker's channels or the timeout expires."""
+    if select.select([conn], [], [], timeout) != ([], [], []):
+        conn.poll()
+        conn.notifies.clear()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="JobAssist document text extraction worker.")
+    parser.add_argument('--once', action='store_true', help="Process all pending documents, then exit.")
+    parser.add_argument('--jobs', action='store_true', help="Run queued background jobs instead (with --once: until none is due).")
+    args = parser.parse_args(argv)
+
+    if args.jobs:
+        return job_runner(once=args.once)
+
+    conn = get_db_connection()
+    if conn is None:
+        print("ERROR: Database connection failed.")
+        return 1
+
+    # A second connection in autocommit mode just for LISTEN
+    listen_conn = None
+    if not args.once:
+        listen_conn = get_db_connection()
+        if listen_conn is None:
+            print("ERROR: Database connection failed.")
+            return 1
+        listen_conn.autocommit = True
+        listen_conn.cursor().execute(f"LISTEN {EXTRACTION_NOTIFY_CHANNEL}; LISTEN {FILE_DELETION_NOTIFY_CHANNEL};")
+
+    print(f"[WORKER] Started with {EXTRACTION_WORKERS} extraction process(es).")
+    try:
+        with ProcessPoolExecutor(max_workers=EXTRACTION_WORKERS) as pool:
+            while True:
+                process_deletions(conn)
+                handled = process_pending(conn, pool)
+                if handled:
+                    print(f"[WORKER] Processed {handled} document(s).")
+                if args.once:
+                    return 0
+                wait_for_notify(listen_conn, EXTRACTION_POLL_SECONDS)
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        conn.close()
+        if listen_conn:
+            listen_conn.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())